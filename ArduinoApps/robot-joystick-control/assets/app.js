@@ -26,6 +26,10 @@ const autoParamsSection = document.getElementById('auto-params-section');
 const autoToggle = document.getElementById('auto-toggle');
 const autoStatusLabel = document.getElementById('auto-status-label');
 
+// Grabación de sesión
+const recToggle = document.getElementById('rec-toggle');
+const recStatusLabel = document.getElementById('rec-status-label');
+
 // Video elements
 const videoSection = document.getElementById('video-section');
 const videoIframe = document.getElementById('video-iframe');
@@ -89,7 +93,7 @@ function setMode(mode) {
     // Handle mode-specific UI with smooth transitions
     if (mode === 'manual') {
         showManualMode();
-    } else if (mode === 'auto') {
+    } else if (mode === 'auto' || mode === 'ia' || mode === 'knn') {
         showAutoMode();
     }
 
@@ -183,6 +187,11 @@ autoToggle.addEventListener('change', (e) => {
     autoStatusLabel.textContent = active ? 'ON' : 'OFF';
 });
 
+// Session Recording Toggle
+recToggle.addEventListener('change', (e) => {
+    socket.emit('toggle_rec', { active: e.target.checked });
+});
+
 // Update object lists button
 updateListsBtn.addEventListener('click', () => {
     const listA = listAInput.value.split(',').map(s => s.trim()).filter(s => s);
@@ -470,21 +479,49 @@ socket.on('status', (data) => {
     console.log('Server status:', data.message);
 });
 
-socket.on('mode_changed', (data) => {
-    currentMode = data.mode;
+function applyServerMode(mode) {
+    currentMode = mode;
     modeBtns.forEach(btn => {
-        btn.classList.toggle('active', btn.dataset.mode === data.mode);
+        btn.classList.toggle('active', btn.dataset.mode === mode);
     });
 
     // Clean control state
     resetControlState();
 
     // Update UI visibility with smooth transitions
-    if (data.mode === 'manual') {
+    if (mode === 'manual') {
         showManualMode();
-    } else if (data.mode === 'auto') {
+    } else if (mode === 'auto' || mode === 'ia' || mode === 'knn') {
         showAutoMode();
     }
+}
+
+socket.on('mode_changed', (data) => {
+    modeBtns.forEach(btn => btn.classList.remove('pending'));
+    applyServerMode(data.mode);
+});
+
+// El modelo del modo pedido sigue cargando: se vuelve al modo activo y el botón queda en espera
+socket.on('mode_pending', (data) => {
+    modeBtns.forEach(btn => btn.classList.toggle('pending', btn.dataset.mode === data.mode));
+    applyServerMode(data.activo);
+});
+
+// Estado del cargador de modelos: {modo: {estado, carga_ms, calentamiento_ms, error}}
+socket.on('modelos', (data) => {
+    modeBtns.forEach(btn => {
+        const m = data[btn.dataset.mode];
+        if (!m) return;
+        btn.classList.toggle('loading', m.estado === 'pendiente' || m.estado === 'cargando');
+        btn.classList.toggle('unavailable', m.estado === 'error');
+        if (m.estado === 'listo') {
+            btn.title = `Modelo listo (carga ${m.carga_ms} ms, calentamiento ${m.calentamiento_ms} ms)`;
+        } else if (m.estado === 'error') {
+            btn.title = `Modelo no disponible: ${m.error}`;
+        } else {
+            btn.title = 'Cargando modelo...';
+        }
+    });
 });
 
 socket.on('detection', (data) => {
@@ -500,6 +537,13 @@ socket.on('object_lists', (data) => {
     }
 });
 
+socket.on('rec_status', (data) => {
+    if (data.active !== undefined) {
+        recToggle.checked = data.active;
+        recStatusLabel.textContent = data.active ? `REC ${data.muestras || 0}` : 'REC';
+    }
+});
+
 socket.on('camera_status', (data) => {
     if (data.enabled !== undefined) {
         cameraToggle.checked = data.enabled;
@@ -2,6 +2,9 @@
 from .base import BaseController
 from .manual import ManualController
 from .auto import AutoController
+from .ia import IAController
+from .mini import MiniController
+from .knn import KNNController
 
-__all__ = ['BaseController', 'ManualController', 'AutoController']
+__all__ = ['BaseController', 'ManualController', 'AutoController', 'IAController', 'MiniController', 'KNNController']
 
@@ -0,0 +1,125 @@
+"""
+Controlador IA - Política aprendida (XGBoost) precompilada en una tabla 2-D
+
+El modelo de entrenamiento.py (cerebro_robot.pkl + escalador.pkl) se evalúa
+una sola vez sobre una malla densa de (dist_frontal, dist_derecho) y se guarda
+en data/cerebro_tabla.npz. En marcha sólo se carga la tabla (NumPy) y cada
+compute() es una interpolación bilineal sobre ella: xgboost, scikit-learn y
+joblib no se importan en el lazo de control.
+
+La tabla se compila fuera de la placa (`python -m controllers.ia` en la PC
+de entrenamiento) y se despliega junto con la app: requirements.txt no trae
+XGBoost ni scikit-learn, así que en el robot no se puede compilar.
+"""
+import os
+import time
+from typing import Tuple
+
+import numpy as np
+
+from .base import BaseController
+
+DIR_DATA = os.path.join(os.path.dirname(os.path.dirname(os.path.abspath(__file__))), 'data')
+TABLA = os.path.join(DIR_DATA, 'cerebro_tabla.npz')
+
+
+def compilar_tabla(modelo_path: str = os.path.join(DIR_DATA, 'cerebro_robot.pkl'),
+                   escalador_path: str = os.path.join(DIR_DATA, 'escalador.pkl'),
+                   destino: str = TABLA, paso: float = 1.0,
+                   f_max: float = 450.0, d_max: float = 450.0) -> dict:
+    """Evalúa el modelo en toda la malla con una sola llamada a predict() y guarda la tabla"""
+    import joblib  # Sólo al compilar; el controlador no lo necesita
+
+    modelo = joblib.load(modelo_path)
+    escalador = joblib.load(escalador_path)
+
+    f = np.arange(0.0, f_max + paso / 2, paso)
+    d = np.arange(0.0, d_max + paso / 2, paso)
+    ff, dd = np.meshgrid(f, d, indexing='ij')
+    X = np.column_stack([ff.ravel(), dd.ravel()])
+    # Mismo escalado que StandardScaler.transform() sobre (f_grid, d_grid)
+    X_scaled = (X - escalador.mean_) / escalador.scale_
+    pwm = np.asarray(modelo.predict(X_scaled), dtype=np.float32)
+
+    tabla = {
+        'izq': pwm[:, 0].reshape(len(f), len(d)),
+        'der': pwm[:, 1].reshape(len(f), len(d)),
+        'paso': np.float64(paso),
+        'f_max': np.float64(f[-1]),
+        'd_max': np.float64(d[-1]),
+    }
+    np.savez(destino, **tabla)
+    return tabla
+
+
+class IAController(BaseController):
+    """Política aprendida por interpolación bilineal sobre la tabla compilada"""
+
+    name: str = "ia"
+
+    def __init__(self, tabla_path: str = TABLA, max_pwm: int = 255):
+        self.max_pwm = max_pwm
+
+        t0 = time.perf_counter()
+        if not os.path.exists(tabla_path):
+            raise FileNotFoundError(
+                f"Falta {tabla_path}. Compílala en la PC de entrenamiento con "
+                "`python -m controllers.ia` (requiere joblib, xgboost y scikit-learn) "
+                "y copia data/cerebro_tabla.npz junto con la app antes de desplegar"
+            )
+        tabla = np.load(tabla_path)
+        self.paso = float(tabla['paso'])
+        self.f_max = float(tabla['f_max'])
+        self.d_max = float(tabla['d_max'])
+        self.nf, self.nd = tabla['izq'].shape
+        # Listas planas: indexar una lista es más barato que un escalar de NumPy
+        self._izq = tabla['izq'].ravel().tolist()
+        self._der = tabla['der'].ravel().tolist()
+        self._inv = 1.0 / self.paso
+        self.tiempo_carga = time.perf_counter() - t0
+
+    def _celda(self, v: float, v_max: float, n: int) -> Tuple[int, float]:
+        # Sin eco (-1) o fuera de rango se recorta al borde, como en f_grid/d_grid
+        if v < 0.0:
+            v = 0.0
+        elif v > v_max:
+            v = v_max
+        x = v * self._inv
+        i = int(x)
+        if i >= n - 1:
+            i = n - 2
+        return i, x - i
+
+    def compute(self, dist_frontal: float, dist_derecho: float) -> Tuple[int, int]:
+        """Interpolación bilineal de (pwm_izq, pwm_der) en la tabla"""
+        i, tf = self._celda(dist_frontal, self.f_max, self.nf)
+        j, td = self._celda(dist_derecho, self.d_max, self.nd)
+        k = i * self.nd + j
+        k2 = k + self.nd
+        w00 = (1.0 - tf) * (1.0 - td)
+        w01 = (1.0 - tf) * td
+        w10 = tf * (1.0 - td)
+        w11 = tf * td
+
+        t = self._izq
+        izq = w00 * t[k] + w01 * t[k + 1] + w10 * t[k2] + w11 * t[k2 + 1]
+        t = self._der
+        der = w00 * t[k] + w01 * t[k + 1] + w10 * t[k2] + w11 * t[k2 + 1]
+
+        m = self.max_pwm
+        return max(-m, min(m, int(round(izq)))), max(-m, min(m, int(round(der))))
+
+
+if __name__ == "__main__":
+    # Compila la tabla y mide el costo por llamada de compute()
+    tabla = compilar_tabla()
+    print(f"Tabla {tabla['izq'].shape} guardada en: {TABLA}")
+
+    ia = IAController()
+    rng = np.random.default_rng(0)
+    consultas = rng.uniform(-1.0, 450.0, size=(20000, 2)).tolist()
+    t0 = time.perf_counter()
+    for f, d in consultas:
+        ia.compute(f, d)
+    dt = (time.perf_counter() - t0) / len(consultas)
+    print(f"Carga: {ia.tiempo_carga * 1e3:.1f} ms | compute(): {dt * 1e6:.2f} µs/llamada")
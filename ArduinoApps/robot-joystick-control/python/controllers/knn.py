@@ -0,0 +1,290 @@
+"""
+Controlador KNN - Clonación de comportamiento por vecinos más cercanos
+
+Indexa las muestras crudas de recorrido_robot.csv en un KD-tree sobre
+(dist_frontal, dist_derecho) y responde compute() con el promedio de PWM de
+las k demostraciones más cercanas, ponderado por el inverso de la distancia.
+
+El índice se guarda en data/knn_indice.npz junto con el byte del CSV hasta el
+que se leyó. Al arrancar sólo se leen las filas nuevas del CSV (se graba en
+modo append); éstas van a un búfer que se recorre por fuerza bruta hasta que
+crece lo suficiente para reconstruir el árbol.
+
+actualizar() corre en otro hilo mientras el lazo llama a compute(): sincroniza
+una copia del índice y la publica con una sola asignación de una tupla
+(índice, pwm_izq, pwm_der), que compute() lee una vez por llamada.
+"""
+import heapq
+import os
+import time
+from typing import Tuple
+
+import numpy as np
+
+from .base import BaseController
+
+DIR_DATA = os.path.join(os.path.dirname(os.path.dirname(os.path.abspath(__file__))), 'data')
+CSV = os.path.join(DIR_DATA, 'recorrido_robot.csv')
+CACHE = os.path.join(DIR_DATA, 'knn_indice.npz')
+
+
+class KDTree:
+    """KD-tree 2-D estático con hojas de hasta `hoja` puntos"""
+
+    NODOS = ('dim', 'val', 'izq', 'der', 'ini', 'fin')
+
+    def __init__(self, puntos: np.ndarray, hoja: int = 16, nodos: dict = None):
+        """`nodos` (de nodos()) y puntos[orden] restauran un árbol guardado sin reconstruirlo"""
+        self.hoja = int(hoja)
+        if nodos is None:
+            self.orden = np.arange(len(puntos))
+            # Nodos en listas paralelas; dim = -1 marca una hoja con puntos [ini, fin)
+            self._dim, self._val, self._izq, self._der, self._ini, self._fin = [], [], [], [], [], []
+            if len(puntos):
+                self._construir(puntos, 0, len(puntos))
+        else:
+            self.orden = np.asarray(nodos['orden'])
+            self._dim, self._val, self._izq, self._der, self._ini, self._fin = (
+                np.asarray(nodos[n]).tolist() for n in self.NODOS)
+        p = puntos[self.orden]
+        self._x = p[:, 0].tolist() if len(p) else []
+        self._y = p[:, 1].tolist() if len(p) else []
+        self._indice = self.orden.tolist()
+
+    def nodos(self) -> dict:
+        """Arreglos del árbol para guardarlo en disco"""
+        arreglos = {n: np.asarray(getattr(self, f'_{n}')) for n in self.NODOS}
+        arreglos['orden'] = self.orden
+        return arreglos
+
+    def __len__(self):
+        return len(self._x)
+
+    def _nodo(self, dim, val, ini, fin):
+        for lista, v in zip((self._dim, self._val, self._izq, self._der, self._ini, self._fin),
+                            (dim, val, -1, -1, ini, fin)):
+            lista.append(v)
+        return len(self._dim) - 1
+
+    def _construir(self, puntos, ini, fin):
+        sub = puntos[self.orden[ini:fin]]
+        if fin - ini <= self.hoja:
+            return self._nodo(-1, 0.0, ini, fin)
+        # Se corta en la mediana del eje con mayor extensión
+        dim = int(np.argmax(sub.max(axis=0) - sub.min(axis=0)))
+        medio = (fin - ini) // 2
+        part = np.argpartition(sub[:, dim], medio)
+        self.orden[ini:fin] = self.orden[ini:fin][part]
+        n = self._nodo(dim, float(puntos[self.orden[ini + medio], dim]), ini, fin)
+        self._izq[n] = self._construir(puntos, ini, ini + medio)
+        self._der[n] = self._construir(puntos, ini + medio, fin)
+        return n
+
+    def consultar(self, x: float, y: float, k: int) -> list:
+        """Heap de (-d², índice) con los k más cercanos"""
+        mejores = []
+        if not self._dim:
+            return mejores
+        xs, ys, ind = self._x, self._y, self._indice
+        dims, vals, izqs, ders, inis, fins = self._dim, self._val, self._izq, self._der, self._ini, self._fin
+        pila = [(0, 0.0)]
+        while pila:
+            n, cota = pila.pop()
+            if len(mejores) == k and cota >= -mejores[0][0]:
+                continue
+            dim = dims[n]
+            if dim < 0:
+                for i in range(inis[n], fins[n]):
+                    dx = xs[i] - x
+                    dy = ys[i] - y
+                    d2 = dx * dx + dy * dy
+                    if len(mejores) < k:
+                        heapq.heappush(mejores, (-d2, ind[i]))
+                    elif d2 < -mejores[0][0]:
+                        heapq.heapreplace(mejores, (-d2, ind[i]))
+                continue
+            diff = (x if dim == 0 else y) - vals[n]
+            if diff < 0.0:
+                pila.append((ders[n], diff * diff))
+                pila.append((izqs[n], 0.0))
+            else:
+                pila.append((izqs[n], diff * diff))
+                pila.append((ders[n], 0.0))
+        return mejores
+
+
+def leer_filas(path: str, desde: int = 0) -> Tuple[np.ndarray, int]:
+    """Filas (dist_frontal, dist_derecho, pwm_izq, pwm_der) desde el byte `desde`; retorna también el byte final"""
+    with open(path, 'rb') as f:
+        f.seek(desde)
+        if desde == 0:
+            f.readline()  # Cabecera
+        inicio = f.tell()
+        crudo = f.read()
+    # Una última línea a medio escribir se deja para la próxima lectura
+    completo = crudo[:crudo.rfind(b'\n') + 1]
+    fin = inicio + len(completo)
+    if not completo.strip():
+        return np.empty((0, 4)), fin
+    filas = np.loadtxt(completo.decode('utf-8').splitlines(), delimiter=',', usecols=(1, 2, 3, 4), ndmin=2)
+    return filas, fin
+
+
+class IndiceDemostraciones:
+    """KD-tree de las demostraciones más un búfer de filas nuevas"""
+
+    def __init__(self, hoja: int = 16, reconstruir_cada: float = 0.1):
+        self.hoja = hoja
+        self.reconstruir_cada = reconstruir_cada   # fracción del árbol que dispara la reconstrucción
+        self.puntos = np.empty((0, 2))
+        self.pwm = np.empty((0, 2))
+        self.arbol = KDTree(self.puntos, hoja)
+        self._buf_x, self._buf_y = [], []
+        self.leido_hasta = 0                       # byte del CSV ya indexado
+        self.reconstrucciones = 0
+
+    def __len__(self):
+        return len(self.puntos)
+
+    def agregar(self, filas: np.ndarray):
+        """Agrega filas (N, 4); el árbol se reconstruye sólo si el búfer creció demasiado"""
+        if len(filas) == 0:
+            return
+        self.puntos = np.concatenate([self.puntos, filas[:, :2]])
+        self.pwm = np.concatenate([self.pwm, filas[:, 2:]])
+        self._buf_x.extend(filas[:, 0].tolist())
+        self._buf_y.extend(filas[:, 1].tolist())
+        if len(self._buf_x) > max(1024, self.reconstruir_cada * len(self.arbol)):
+            self.reconstruir()
+
+    def copia(self) -> 'IndiceDemostraciones':
+        """Copia que se puede sincronizar sin tocar a ésta (los arreglos y el árbol no se modifican en el lugar)"""
+        otro = IndiceDemostraciones.__new__(IndiceDemostraciones)
+        otro.__dict__.update(self.__dict__)
+        otro._buf_x, otro._buf_y = list(self._buf_x), list(self._buf_y)
+        return otro
+
+    def reconstruir(self):
+        self.arbol = KDTree(self.puntos, self.hoja)
+        self._buf_x, self._buf_y = [], []
+        self.reconstrucciones += 1
+
+    def vecinos(self, x: float, y: float, k: int) -> list:
+        """[(-d², índice)] de los k más cercanos entre el árbol y el búfer"""
+        mejores = self.arbol.consultar(x, y, k)
+        base = len(self.arbol)
+        for j, (bx, by) in enumerate(zip(self._buf_x, self._buf_y)):
+            dx = bx - x
+            dy = by - y
+            d2 = dx * dx + dy * dy
+            if len(mejores) < k:
+                heapq.heappush(mejores, (-d2, base + j))
+            elif d2 < -mejores[0][0]:
+                heapq.heapreplace(mejores, (-d2, base + j))
+        return mejores
+
+    def guardar(self, path: str):
+        np.savez(path, puntos=self.puntos, pwm=self.pwm, n_arbol=len(self.arbol),
+                 leido_hasta=self.leido_hasta, **self.arbol.nodos())
+
+    @classmethod
+    def cargar(cls, path: str, hoja: int = 16) -> 'IndiceDemostraciones':
+        z = np.load(path)
+        indice = cls(hoja)
+        indice.puntos = z['puntos']
+        indice.pwm = z['pwm']
+        n = int(z['n_arbol'])
+        indice.arbol = KDTree(indice.puntos[:n], hoja, nodos=z)
+        indice._buf_x = indice.puntos[n:, 0].tolist()
+        indice._buf_y = indice.puntos[n:, 1].tolist()
+        indice.leido_hasta = int(z['leido_hasta'])
+        return indice
+
+    def sincronizar(self, csv_path: str) -> int:
+        """Indexa las filas agregadas al CSV desde la última vez; retorna cuántas"""
+        if os.path.getsize(csv_path) < self.leido_hasta:
+            # El CSV se reemplazó: se indexa de cero
+            self.__init__(self.hoja, self.reconstruir_cada)
+        filas, self.leido_hasta = leer_filas(csv_path, self.leido_hasta)
+        self.agregar(filas)
+        return len(filas)
+
+
+class KNNController(BaseController):
+    """Promedio ponderado del PWM de las k demostraciones más cercanas"""
+
+    name: str = "knn"
+
+    def __init__(self, csv_path: str = CSV, cache_path: str = CACHE, k: int = 8, max_pwm: int = 255):
+        self.k = int(k)
+        self.max_pwm = max_pwm
+        self.csv_path = csv_path
+        self.cache_path = cache_path
+
+        t0 = time.perf_counter()
+        indice = IndiceDemostraciones.cargar(cache_path) if os.path.exists(cache_path) else IndiceDemostraciones()
+        self.nuevas = indice.sincronizar(csv_path)
+        if self.nuevas:
+            indice.guardar(cache_path)
+        self._publicar(indice)
+        self.tiempo_carga = time.perf_counter() - t0
+
+    @property
+    def indice(self) -> IndiceDemostraciones:
+        return self._estado[0]
+
+    def _publicar(self, indice: IndiceDemostraciones):
+        # Una sola asignación: compute() ve el estado viejo o el nuevo, nunca una mezcla
+        self._estado = (indice, indice.pwm[:, 0].tolist(), indice.pwm[:, 1].tolist())
+
+    def actualizar(self) -> int:
+        """Incorpora las filas nuevas del CSV (p. ej. tras una sesión de grabación)"""
+        indice = self.indice.copia()
+        n = indice.sincronizar(self.csv_path)
+        if n:
+            self._publicar(indice)
+            indice.guardar(self.cache_path)
+        return n
+
+    def compute(self, dist_frontal: float, dist_derecho: float) -> Tuple[int, int]:
+        """Promedio de PWM de los k vecinos con peso 1 / (distancia + 1 cm)"""
+        indice, pwm_izq, pwm_der = self._estado
+        vecinos = indice.vecinos(dist_frontal, dist_derecho, self.k)
+        if not vecinos:
+            return 0, 0
+        suma_w = izq = der = 0.0
+        for menos_d2, i in vecinos:
+            w = 1.0 / ((-menos_d2) ** 0.5 + 1.0)
+            suma_w += w
+            izq += w * pwm_izq[i]
+            der += w * pwm_der[i]
+
+        m = self.max_pwm
+        return max(-m, min(m, int(round(izq / suma_w)))), max(-m, min(m, int(round(der / suma_w))))
+
+
+if __name__ == "__main__":
+    # Construcción, carga desde caché y costo por consulta contra fuerza bruta
+    if os.path.exists(CACHE):
+        os.remove(CACHE)
+    t0 = time.perf_counter()
+    knn = KNNController()
+    print(f"Índice: {len(knn.indice)} demostraciones construido en {(time.perf_counter() - t0) * 1e3:.0f} ms")
+    knn = KNNController()
+    print(f"Carga desde caché: {knn.tiempo_carga * 1e3:.0f} ms")
+
+    rng = np.random.default_rng(0)
+    consultas = rng.uniform(-1.0, 450.0, size=(5000, 2))
+    t0 = time.perf_counter()
+    for f, d in consultas.tolist():
+        knn.compute(f, d)
+    dt = (time.perf_counter() - t0) / len(consultas)
+    print(f"compute(k={knn.k}): {dt * 1e6:.1f} µs/consulta (presupuesto del lazo: 20000 µs)")
+
+    p = knn.indice.puntos
+    errores = 0
+    for f, d in consultas[:500]:
+        exactos = np.sort(((p - (f, d)) ** 2).sum(axis=1))[:knn.k]
+        obtenidos = np.sort([-v for v, _ in knn.indice.vecinos(f, d, knn.k)])
+        errores += not np.allclose(exactos, obtenidos)
+    print(f"Verificación contra fuerza bruta: {500 - errores}/500 consultas exactas")
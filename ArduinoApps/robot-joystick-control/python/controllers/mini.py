@@ -0,0 +1,77 @@
+"""
+Controlador Mini - Política destilada en un modelo lineal por tramos, sólo NumPy
+
+destilacion.py ajusta por mínimos cuadrados los valores de una malla gruesa
+(10 cm) cuya interpolación bilineal reproduce las salidas de XGBoost, y los
+guarda como archivos .npy en data/cerebro_mini/ (unos 35 KB). Cargar son tres
+np.load(); compute() es la misma interpolación de IAController.
+"""
+import os
+import time
+
+import numpy as np
+
+from .ia import IAController
+
+DIR_MINI = os.path.join(os.path.dirname(os.path.dirname(os.path.abspath(__file__))), 'data', 'cerebro_mini')
+
+ARCHIVOS = ('nodos_izq', 'nodos_der', 'paso')
+
+
+def cargar_pesos(directorio: str = DIR_MINI) -> dict:
+    faltan = [f'{n}.npy' for n in ARCHIVOS if not os.path.exists(os.path.join(directorio, f'{n}.npy'))]
+    if faltan:
+        raise FileNotFoundError(
+            f"Faltan {', '.join(faltan)} en {directorio}. Genéralos en la PC de entrenamiento con "
+            "`python destilacion.py` y copia data/cerebro_mini/ junto con la app antes de desplegar"
+        )
+    return {n: np.load(os.path.join(directorio, f'{n}.npy')) for n in ARCHIVOS}
+
+
+def guardar_pesos(pesos: dict, directorio: str = DIR_MINI):
+    os.makedirs(directorio, exist_ok=True)
+    for n in ARCHIVOS:
+        np.save(os.path.join(directorio, f'{n}.npy'), np.asarray(pesos[n], dtype=np.float64))
+
+
+def base_bilineal(X: np.ndarray, paso: float, nf: int, nd: int) -> tuple:
+    """Índices planos (N, 4) de los nodos vecinos de cada punto y sus pesos bilineales (N, 4)"""
+    x = np.clip(X, 0.0, None) / paso
+    i = np.minimum(x[:, 0].astype(np.int64), nf - 2)
+    j = np.minimum(x[:, 1].astype(np.int64), nd - 2)
+    tf = np.minimum(x[:, 0] - i, 1.0)
+    td = np.minimum(x[:, 1] - j, 1.0)
+    k = i * nd + j
+    idx = np.stack([k, k + 1, k + nd, k + nd + 1], axis=1)
+    w = np.stack([(1 - tf) * (1 - td), (1 - tf) * td, tf * (1 - td), tf * td], axis=1)
+    return idx, w
+
+
+def evaluar(pesos: dict, X: np.ndarray) -> np.ndarray:
+    """Salida del modelo en PWM para un lote X (N, 2) de (dist_frontal, dist_derecho)"""
+    nf, nd = pesos['nodos_izq'].shape
+    idx, w = base_bilineal(X, float(pesos['paso']), nf, nd)
+    return np.stack([
+        (w * pesos['nodos_izq'].ravel()[idx]).sum(axis=1),
+        (w * pesos['nodos_der'].ravel()[idx]).sum(axis=1),
+    ], axis=1)
+
+
+class MiniController(IAController):
+    """Política destilada: interpolación bilineal sobre la malla gruesa de destilacion.py"""
+
+    name: str = "mini"
+
+    def __init__(self, directorio: str = DIR_MINI, max_pwm: int = 255):
+        self.max_pwm = max_pwm
+
+        t0 = time.perf_counter()
+        p = cargar_pesos(directorio)
+        self.paso = float(p['paso'])
+        self.nf, self.nd = p['nodos_izq'].shape
+        self.f_max = self.paso * (self.nf - 1)
+        self.d_max = self.paso * (self.nd - 1)
+        self._izq = p['nodos_izq'].ravel().tolist()
+        self._der = p['nodos_der'].ravel().tolist()
+        self._inv = 1.0 / self.paso
+        self.tiempo_carga = time.perf_counter() - t0
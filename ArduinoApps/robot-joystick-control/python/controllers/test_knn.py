@@ -0,0 +1,59 @@
+"""Pruebas de knn.py: KD-tree contra fuerza bruta y publicación de actualizar()."""
+import numpy as np
+
+from .knn import IndiceDemostraciones, KDTree, KNNController
+
+
+def escribir_csv(path, filas, cabecera=True):
+    with open(path, 'a') as f:
+        if cabecera:
+            f.write('timestamp,dist_frontal,dist_derecho,pwm_izq,pwm_der\n')
+        for fila in filas.tolist():
+            f.write('2025-12-29T00:22:24.638346,' + ','.join(map(repr, fila)) + '\n')
+
+
+def test_kdtree_igual_a_fuerza_bruta():
+    rng = np.random.default_rng(1)
+    puntos = rng.uniform(0.0, 400.0, size=(3000, 2))
+    arbol = KDTree(puntos, hoja=8)
+    for x, y in rng.uniform(-10.0, 410.0, size=(200, 2)).tolist():
+        k = 5
+        exactos = np.sort(((puntos - (x, y)) ** 2).sum(axis=1))[:k]
+        obtenidos = np.sort([-d2 for d2, _ in arbol.consultar(x, y, k)])
+        assert np.allclose(exactos, obtenidos)
+        # Los índices devueltos apuntan a los puntos de esas distancias
+        for d2, i in arbol.consultar(x, y, k):
+            assert np.isclose(-d2, ((puntos[i] - (x, y)) ** 2).sum())
+
+
+def test_arbol_mas_bufer_igual_a_fuerza_bruta():
+    rng = np.random.default_rng(2)
+    indice = IndiceDemostraciones(hoja=8)
+    # Lotes chicos: quedan en el búfer sin reconstruir el árbol
+    for _ in range(3):
+        indice.agregar(rng.uniform(0.0, 200.0, size=(300, 4)))
+    assert len(indice._buf_x) > 0
+    for x, y in rng.uniform(0.0, 200.0, size=(100, 2)).tolist():
+        exactos = np.sort(((indice.puntos - (x, y)) ** 2).sum(axis=1))[:8]
+        obtenidos = np.sort([-d2 for d2, _ in indice.vecinos(x, y, 8)])
+        assert np.allclose(exactos, obtenidos)
+
+
+def test_actualizar_no_toca_el_indice_publicado(tmp_path):
+    rng = np.random.default_rng(3)
+    csv = tmp_path / 'recorrido.csv'
+    escribir_csv(csv, np.round(rng.uniform(0.0, 200.0, size=(500, 4)), 2))
+    knn = KNNController(str(csv), str(tmp_path / 'indice.npz'))
+
+    # Lo que vería una llamada a compute() en curso
+    indice, pwm_izq, pwm_der = knn._estado
+    puntos, buf = indice.puntos, list(indice._buf_x)
+
+    escribir_csv(csv, np.round(rng.uniform(0.0, 200.0, size=(200, 4)), 2), cabecera=False)
+    assert knn.actualizar() == 200
+
+    assert indice.puntos is puntos and indice._buf_x == buf
+    assert len(pwm_izq) == len(pwm_der) == 500
+    nuevo, nuevo_izq, _ = knn._estado
+    assert nuevo is not indice and len(nuevo) == len(nuevo_izq) == 700
+    assert knn.actualizar() == 0
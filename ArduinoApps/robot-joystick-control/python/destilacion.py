@@ -0,0 +1,92 @@
+"""
+Destilación - Ajusta un modelo lineal por tramos (sólo NumPy) a la política de XGBoost.
+
+El maestro es la tabla densa de controllers/ia.py (XGBoost evaluado cada 1 cm).
+El alumno es una malla gruesa con interpolación bilineal cuyos nodos se ajustan
+por mínimos cuadrados a todos los puntos del maestro. Se guarda como .npy en
+data/cerebro_mini/ y sólo se acepta si su error contra el maestro queda dentro
+de la tolerancia. Correr después de entrenamiento.py.
+
+Una MLP 2-64-64-2 entrenada con Adam quedó muy por encima de esta tolerancia
+(la política de árboles tiene escalones), por eso el alumno es por tramos.
+"""
+import json
+import os
+import sys
+
+import numpy as np
+
+from controllers.ia import TABLA, compilar_tabla
+from controllers.mini import DIR_MINI, base_bilineal, evaluar, guardar_pesos
+
+# Error aceptado contra el maestro, en unidades de PWM
+TOLERANCIA_MEDIA = 4.0
+TOLERANCIA_P95 = 12.0
+
+
+def cargar_maestro(tabla_path: str = TABLA) -> tuple:
+    """Puntos (dist_frontal, dist_derecho) y PWM del maestro sobre toda la malla"""
+    if not os.path.exists(tabla_path):
+        compilar_tabla(destino=tabla_path)
+    tabla = np.load(tabla_path)
+    paso = float(tabla['paso'])
+    nf, nd = tabla['izq'].shape
+    ff, dd = np.meshgrid(np.arange(nf) * paso, np.arange(nd) * paso, indexing='ij')
+    X = np.column_stack([ff.ravel(), dd.ravel()])
+    Y = np.column_stack([tabla['izq'].ravel(), tabla['der'].ravel()]).astype(np.float64)
+    return X, Y
+
+
+def ajustar(X: np.ndarray, Y: np.ndarray, paso: float = 10.0, ridge: float = 1e-6) -> dict:
+    """Valores de los nodos que minimizan el error cuadrático de la interpolación bilineal"""
+    nf = int(np.ceil(X[:, 0].max() / paso)) + 1
+    nd = int(np.ceil(X[:, 1].max() / paso)) + 1
+    n = nf * nd
+    idx, w = base_bilineal(X, paso, nf, nd)
+
+    # Ecuaciones normales: cada punto aporta a 4x4 pares de nodos
+    ata = np.zeros(n * n)
+    aty = np.zeros((n, 2))
+    for a in range(4):
+        for b in range(4):
+            ata += np.bincount(idx[:, a] * n + idx[:, b], w[:, a] * w[:, b], minlength=n * n)
+        for c in range(2):
+            aty[:, c] += np.bincount(idx[:, a], w[:, a] * Y[:, c], minlength=n)
+    ata = ata.reshape(n, n)
+    ata[np.diag_indices(n)] += ridge
+    nodos = np.linalg.solve(ata, aty)
+
+    return {
+        'nodos_izq': nodos[:, 0].reshape(nf, nd),
+        'nodos_der': nodos[:, 1].reshape(nf, nd),
+        'paso': np.float64(paso),
+    }
+
+
+def error_contra_maestro(pesos: dict, X: np.ndarray, Y: np.ndarray) -> dict:
+    """Error absoluto en PWM sobre toda la malla del maestro"""
+    err = np.abs(evaluar(pesos, X) - Y)
+    return {
+        'media': float(err.mean()),
+        'p95': float(np.percentile(err, 95)),
+        'max': float(err.max()),
+    }
+
+
+if __name__ == "__main__":
+    X, Y = cargar_maestro()
+    print(f"Maestro: {len(X)} puntos de la tabla de XGBoost")
+
+    pesos = ajustar(X, Y)
+    err = error_contra_maestro(pesos, X, Y)
+    print(f"Alumno: malla {pesos['nodos_izq'].shape} cada {float(pesos['paso']):.0f} cm")
+    print(f"Error contra el maestro (PWM): media={err['media']:.2f} p95={err['p95']:.2f} max={err['max']:.2f}")
+
+    if err['media'] > TOLERANCIA_MEDIA or err['p95'] > TOLERANCIA_P95:
+        print(f"Fuera de tolerancia (media <= {TOLERANCIA_MEDIA}, p95 <= {TOLERANCIA_P95}); no se guarda")
+        sys.exit(1)
+
+    guardar_pesos(pesos)
+    with open(os.path.join(DIR_MINI, 'error.json'), 'w') as f:
+        json.dump(err, f, indent=2)
+    print(f"Modelo destilado guardado en: {DIR_MINI}")
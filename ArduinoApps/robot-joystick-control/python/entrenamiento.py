@@ -1,41 +1,233 @@
 """
-Entrenamiento del modelo IA - Entrena XGBoost con los datos procesados.
+Entrenamiento del modelo IA - Búsqueda de hiperparámetros de XGBoost y entrenamiento final.
+
+Validación por tiempo: el recorrido se corta en PLIEGUES tramos consecutivos.
+Para cada tramo se arma el mapa de celdas (como procesamiento_datos.py) con el
+resto del recorrido, sin las muestras a menos de MARGEN segundos del tramo, y
+se mide el error en PWM sobre las muestras crudas del tramo. Las matrices ya
+escaladas de todos los pliegues se calculan una vez y quedan en
+data/pliegues.npz; cada prueba sólo las abre.
+
+Las pruebas corren en un pool de procesos. Cada trabajador queda fijado a su
+porción de núcleos (os.sched_setaffinity) y XGBoost usa sólo esa porción, en
+lugar de que cada ajuste pida n_jobs=-1 y compitan por todos.
+
+Salida: data/busqueda_hiperparametros.csv con error de validación, tiempo de
+ajuste y costo de inferencia por prueba; y el mejor modelo reentrenado sobre
+datos_mejorados.csv (cerebro_robot.pkl + escalador.pkl + tabla del controlador IA).
+
+El costo de inferencia se mide en la máquina donde corre la búsqueda, no en la
+placa: `predict_us_host` sólo sirve para comparar combinaciones entre sí
+(`orden_predict`, 1 = la más barata), no como tiempo esperado en el robot.
 """
+import itertools
+import json
+import multiprocessing
 import os
-import pandas as pd
+import time
+from concurrent.futures import ProcessPoolExecutor, as_completed
+
+import numpy as np
 from xgboost import XGBRegressor
 from sklearn.preprocessing import StandardScaler
 import joblib
 
+from controllers.ia import compilar_tabla
+from procesamiento_datos import AgregadoCeldas
+from utils import columnas
+
 # Directorio de datos
 DIR_DATA = os.path.join(os.path.dirname(os.path.abspath(__file__)), 'data')
+RECORRIDO = os.path.join(DIR_DATA, 'recorrido_robot.csv')
+MAPA = os.path.join(DIR_DATA, 'datos_mejorados.csv')
+PLIEGUES_CACHE = os.path.join(DIR_DATA, 'pliegues.npz')
+RESULTADOS = os.path.join(DIR_DATA, 'busqueda_hiperparametros.csv')
+
+# Espacio de búsqueda (producto cartesiano)
+ESPACIO = {
+    'n_estimators': [200, 500, 1000],
+    'max_depth': [4, 6, 8],
+    'learning_rate': [0.03, 0.05, 0.1],
+    'reg_lambda': [1, 5],
+}
+PLIEGUES = 4                  # Tramos de tiempo para validación
+MARGEN = 2.0                  # Segundos excluidos del entrenamiento a cada lado del tramo
+NUCLEOS_POR_TRABAJADOR = 2
+
+COLUMNAS = ('dist_frontal', 'dist_derecho', 'pwm_izq', 'pwm_der')
+
+# Estado de cada trabajador (lo llena _iniciar_trabajador)
+_pliegues = None
+_nucleos = 1
+
+
+def construir_pliegues(recorrido: str = RECORRIDO, pliegues: int = PLIEGUES, margen: float = MARGEN,
+                       cache: str = PLIEGUES_CACHE) -> str:
+    """Calcula (o reutiliza) las matrices escaladas de cada pliegue; retorna la ruta del .npz"""
+    meta = {'bytes': os.path.getsize(recorrido), 'pliegues': pliegues, 'margen': margen}
+    if os.path.exists(cache):
+        with np.load(cache) as z:
+            if json.loads(str(z['meta'])) == meta:
+                return cache
+
+    cols = columnas.cargar(recorrido)
+    orden = np.argsort(cols['t_ns'], kind='stable')
+    t = cols['t_ns'][orden] * 1e-9
+    filas = np.column_stack([cols[c][orden].astype(np.float64) for c in COLUMNAS])
+
+    arreglos = {'meta': json.dumps(meta)}
+    for k, val in enumerate(np.array_split(np.arange(len(t)), pliegues)):
+        t0, t1 = t[val[0]] - margen, t[val[-1]] + margen
+        entrenar = (t < t0) | (t > t1)
+
+        agregado = AgregadoCeldas()
+        agregado.acumular(filas[entrenar])
+        mapa = agregado.mapa()
+        X, y = mapa[:, :2], mapa[:, 2:]
+        # Mismo escalado que StandardScaler (desviación poblacional)
+        media = X.mean(axis=0)
+        escala = X.std(axis=0)
+        escala[escala == 0.0] = 1.0
+
+        arreglos[f'X_{k}'] = (X - media) / escala
+        arreglos[f'y_{k}'] = y
+        arreglos[f'Xv_{k}'] = (filas[val, :2] - media) / escala
+        arreglos[f'yv_{k}'] = filas[val, 2:]
+    np.savez(cache, **arreglos)
+    return cache
+
+
+def repartir_nucleos(por_trabajador: int = NUCLEOS_POR_TRABAJADOR) -> list:
+    """Porciones disjuntas de los núcleos disponibles, una por trabajador"""
+    if hasattr(os, 'sched_getaffinity'):
+        nucleos = sorted(os.sched_getaffinity(0))
+    else:
+        nucleos = list(range(os.cpu_count() or 1))
+    por_trabajador = max(1, min(por_trabajador, len(nucleos)))
+    n = len(nucleos) // por_trabajador
+    return [nucleos[i * por_trabajador:(i + 1) * por_trabajador] for i in range(n)]
+
+
+def _iniciar_trabajador(cache: str, porciones):
+    """Fija el proceso a una porción de núcleos y abre los pliegues una sola vez"""
+    global _pliegues, _nucleos
+    nucleos = porciones.get()
+    if hasattr(os, 'sched_setaffinity'):
+        os.sched_setaffinity(0, nucleos)
+    _nucleos = len(nucleos)
+    z = np.load(cache)
+    _pliegues = [tuple(z[f'{n}_{k}'] for n in ('X', 'y', 'Xv', 'yv'))
+                 for k in range(sum(1 for f in z.files if f.startswith('X_')))]
+
+
+def costo_inferencia(modelo, repeticiones: int = 200) -> float:
+    """Mediana en µs de predict() sobre una sola muestra en esta máquina (lo que costaría sin la tabla compilada)"""
+    x = np.zeros((1, 2))
+    tiempos = []
+    for _ in range(repeticiones):
+        t0 = time.perf_counter()
+        modelo.predict(x)
+        tiempos.append(time.perf_counter() - t0)
+    return float(np.median(tiempos) * 1e6)
+
+
+def evaluar(params: dict) -> dict:
+    """Ajusta y valida una combinación en todos los pliegues (corre dentro del trabajador)"""
+    errores = []
+    t_ajuste = 0.0
+    for X, y, Xv, yv in _pliegues:
+        modelo = XGBRegressor(**params, n_jobs=_nucleos)
+        t0 = time.perf_counter()
+        modelo.fit(X, y)
+        t_ajuste += time.perf_counter() - t0
+        errores.append(float(np.abs(modelo.predict(Xv) - yv).mean()))
+
+    return {
+        **params,
+        'mae_val': float(np.mean(errores)),
+        'mae_val_std': float(np.std(errores)),
+        't_ajuste_s': t_ajuste / len(_pliegues),
+        'predict_us_host': costo_inferencia(modelo),
+        # Un árbol por salida y por ronda; cada muestra recorre a lo sumo max_depth nodos por árbol
+        'nodos_por_muestra': 2 * params['n_estimators'] * params['max_depth'],
+    }
+
+
+def buscar(espacio: dict = ESPACIO, cache: str = PLIEGUES_CACHE) -> list:
+    """Corre todas las combinaciones en paralelo; resultados ordenados por error de validación"""
+    combinaciones = [dict(zip(espacio, v)) for v in itertools.product(*espacio.values())]
+    porciones = repartir_nucleos()
+    cola = multiprocessing.Queue()
+    for p in porciones:
+        cola.put(p)
+
+    print(f"{len(combinaciones)} combinaciones en {len(porciones)} procesos "
+          f"de {len(porciones[0])} núcleos")
+    resultados = []
+    with ProcessPoolExecutor(max_workers=len(porciones), initializer=_iniciar_trabajador,
+                             initargs=(cache, cola)) as pool:
+        futuros = [pool.submit(evaluar, p) for p in combinaciones]
+        for i, fut in enumerate(as_completed(futuros), 1):
+            r = fut.result()
+            resultados.append(r)
+            print(f"  [{i}/{len(futuros)}] {r['n_estimators']} árboles, prof {r['max_depth']}, "
+                  f"lr {r['learning_rate']}, λ {r['reg_lambda']}: MAE {r['mae_val']:.2f} PWM "
+                  f"({r['t_ajuste_s']:.2f} s)")
+    # Los µs son del host: sólo se reportan como orden relativo entre combinaciones
+    por_costo = sorted(resultados, key=lambda r: r['predict_us_host'])
+    for i, r in enumerate(por_costo, 1):
+        r['orden_predict'] = i
+    resultados.sort(key=lambda r: r['mae_val'])
+    return resultados
+
+
+def guardar_resultados(resultados: list, path: str = RESULTADOS):
+    campos = list(resultados[0])
+    with open(path, 'w') as f:
+        f.write(','.join(campos) + '\n')
+        for r in resultados:
+            f.write(','.join(str(r[c]) for c in campos) + '\n')
+
+
+if __name__ == "__main__":
+    cache = construir_pliegues()
+    resultados = buscar(cache=cache)
+    guardar_resultados(resultados)
+
+    print(f"\n{'árboles':>8} {'prof':>5} {'lr':>6} {'λ':>4} {'MAE val':>8} {'±':>6} "
+          f"{'ajuste s':>9} {'orden predict':>13} {'nodos':>7}")
+    for r in resultados[:10]:
+        print(f"{r['n_estimators']:>8} {r['max_depth']:>5} {r['learning_rate']:>6} {r['reg_lambda']:>4} "
+              f"{r['mae_val']:>8.2f} {r['mae_val_std']:>6.2f} {r['t_ajuste_s']:>9.2f} "
+              f"{r['orden_predict']:>13} {r['nodos_por_muestra']:>7}")
+    print(f"Tabla completa en: {RESULTADOS}")
+
+    # Cargar el mapa purificado (directorio columnar por memmap; el CSV si no está vigente)
+    mapa = columnas.cargar(MAPA, tipos={})
 
-# Cargar el mapa purificado
-df = pd.read_csv(os.path.join(DIR_DATA, 'datos_mejorados.csv'))
+    X = np.column_stack([mapa['f_grid'], mapa['d_grid']])
+    y = np.column_stack([mapa['pwm_izq'], mapa['pwm_der']])
 
-X = df[['f_grid', 'd_grid']]
-y = df[['pwm_izq', 'pwm_der']]
+    scaler = StandardScaler()
+    X_scaled = scaler.fit_transform(X)
 
-scaler = StandardScaler()
-X_scaled = scaler.fit_transform(X)
+    # La mejor combinación, ahora con todos los núcleos y todo el mapa
+    mejor = {k: resultados[0][k] for k in ESPACIO}
+    modelo = XGBRegressor(**mejor, n_jobs=-1)
 
-# XGBoost configurado para GENERALIZAR (no memorizar)
-modelo = XGBRegressor(
-    n_estimators=500,
-    learning_rate=0.05,
-    max_depth=6,          # Profundidad moderada para que "entienda" y no solo "copie"
-    reg_lambda=1,         # Penaliza respuestas extremas
-    n_jobs=-1
-)
+    print(f"\nEntrenando con el mapa de situaciones: {mejor}")
+    modelo.fit(X_scaled, y)
 
-print("Entrenando con el mapa de situaciones...")
-modelo.fit(X_scaled, y)
+    # Guardar en carpeta data/
+    joblib.dump(modelo, os.path.join(DIR_DATA, 'cerebro_robot.pkl'))
+    joblib.dump(scaler, os.path.join(DIR_DATA, 'escalador.pkl'))
 
-# Guardar en carpeta data/
-joblib.dump(modelo, os.path.join(DIR_DATA, 'cerebro_robot.pkl'))
-joblib.dump(scaler, os.path.join(DIR_DATA, 'escalador.pkl'))
+    # Verificación rápida
+    score = modelo.score(X_scaled, y)
+    print(f"Precisión sobre el mapa: {score:.4f} | MAE de validación: {resultados[0]['mae_val']:.2f} PWM")
+    print(f"Modelo guardado en: {DIR_DATA}")
 
-# Verificación rápida
-score = modelo.score(X_scaled, y)
-print(f"Precisión sobre el mapa: {score:.4f}")
-print(f"Modelo guardado en: {DIR_DATA}")
+    # Tabla para IAController: el robot no carga XGBoost en marcha, así que en
+    # marcha el costo es el mismo para cualquier combinación (una bilineal)
+    tabla = compilar_tabla()
+    print(f"Tabla del controlador IA: {tabla['izq'].shape}")
@@ -0,0 +1,176 @@
+"""
+Identificación del sistema - Modelo de dinámica a partir de recorrido_robot.csv.
+
+Ajusta por mínimos cuadrados (con regularización ridge) un modelo discreto
+
+    x[t+1] = x[t] + W · φ[t]
+    φ[t]   = [x[t-n+1..t], u[t-n+1..t], 1]
+
+donde x = (dist_frontal, dist_derecho) y u = (pwm_izq, pwm_der). Las ventanas
+deslizantes se arman de una vez con NumPy sobre todo el log; se descartan las
+que cruzan una lectura sin eco (-1 / fuera de rango), un salto imposible para
+el robot (rebotes del ultrasonido) o un hueco de tiempo.
+"""
+import os
+
+import numpy as np
+
+from utils import columnas
+
+# Directorio de datos
+DIR_DATA = os.path.join(os.path.dirname(os.path.abspath(__file__)), 'data')
+
+COLUMNAS = ('dist_frontal', 'dist_derecho', 'pwm_izq', 'pwm_der')
+DIST_MAX = 400.0  # Alcance útil del HC-SR04 (cm)
+
+
+def cargar_recorrido(path: str) -> tuple:
+    """Lee el recorrido (columnar si está vigente). Retorna (t en segundos desde el inicio, datos (N, 4) float64)"""
+    cols = columnas.cargar(path)
+    t = (cols['t_ns'] - cols['t_ns'][0]) * 1e-9
+    datos = np.column_stack([cols[c].astype(np.float64) for c in COLUMNAS])
+    return t, datos
+
+
+def ventanas(t: np.ndarray, datos: np.ndarray, ventana: int = 3, hueco: float = 3.0,
+             salto_max: float = 10.0) -> tuple:
+    """
+    Construye (Φ, Δx) con todas las ventanas válidas del log.
+    Una ventana es válida si sus distancias y la siguiente están en (0, DIST_MAX],
+    ninguna cambia más de `salto_max` cm entre filas y ningún intervalo supera
+    `hueco` veces la mediana del período.
+    """
+    n = int(ventana)
+    dist = datos[:, :2]
+    pwm = datos[:, 2:]
+
+    ok = np.all((dist > 0.0) & (dist <= DIST_MAX), axis=1)
+    dt = np.diff(t)
+    ok_dt = dt <= hueco * np.median(dt)
+
+    # La fila t necesita x[t-n+1..t+1] válidos y sin huecos entre ellos
+    suave = np.all(np.abs(np.diff(dist, axis=0)) <= salto_max, axis=1)
+    sano = ok[:-1] & ok[1:] & ok_dt & suave
+    cuenta = np.convolve(sano.astype(np.int64), np.ones(n, dtype=np.int64), mode='valid')
+    idx = np.flatnonzero(cuenta == n) + n - 1          # índice t de cada ventana válida
+
+    vd = np.lib.stride_tricks.sliding_window_view(dist, n, axis=0)    # (N-n+1, 2, n)
+    vu = np.lib.stride_tricks.sliding_window_view(pwm, n, axis=0)
+    filas = idx - (n - 1)
+    phi = np.concatenate([
+        vd[filas].reshape(len(idx), -1),
+        vu[filas].reshape(len(idx), -1),
+        np.ones((len(idx), 1)),
+    ], axis=1)
+    delta = dist[idx + 1] - dist[idx]
+    return phi, delta, idx
+
+
+class ModeloDinamico:
+    """Modelo lineal de ventana n: predice las distancias del próximo ciclo"""
+
+    def __init__(self, ventana: int = 3, ridge: float = 1e-3):
+        self.ventana = int(ventana)
+        self.ridge = float(ridge)
+        self.W = None          # (2, 4n + 1)
+        self.periodo = None    # mediana del período del log (s)
+        self.reporte = {}
+
+    def ajustar(self, t: np.ndarray, datos: np.ndarray, fraccion_prueba: float = 0.2) -> dict:
+        """Ajusta con el inicio del log y reporta el error sobre el tramo final"""
+        phi, delta, idx = ventanas(t, datos, self.ventana)
+        corte = int(len(idx) * (1.0 - fraccion_prueba))
+        self.W = self._resolver(phi[:corte], delta[:corte])
+        self.periodo = float(np.median(np.diff(t)))
+        self.reporte = {
+            'ventanas': len(idx),
+            'entrenamiento': self._errores(phi[:corte], delta[:corte]),
+            'prueba': self._errores(phi[corte:], delta[corte:]),
+        }
+        # Coeficientes finales con todo el log
+        self.W = self._resolver(phi, delta)
+        return self.reporte
+
+    def _resolver(self, phi: np.ndarray, delta: np.ndarray) -> np.ndarray:
+        # Ecuaciones normales con las columnas escaladas (PWM ~100, distancias ~10)
+        escala = np.maximum(np.abs(phi).max(axis=0), 1e-9)
+        a = phi / escala
+        ata = a.T @ a
+        ata[np.diag_indices_from(ata)] += self.ridge * len(a)
+        w = np.linalg.solve(ata, a.T @ delta)
+        return (w / escala[:, None]).T
+
+    def _errores(self, phi: np.ndarray, delta: np.ndarray) -> dict:
+        """RMSE de un paso del modelo y del modelo de persistencia (Δx = 0) en cm"""
+        if len(phi) == 0:
+            return {}
+        resid = delta - phi @ self.W.T
+        rmse = np.sqrt(np.mean(resid ** 2, axis=0))
+        base = np.sqrt(np.mean(delta ** 2, axis=0))
+        return {
+            'rmse_frontal': float(rmse[0]),
+            'rmse_derecho': float(rmse[1]),
+            'persistencia_frontal': float(base[0]),
+            'persistencia_derecho': float(base[1]),
+        }
+
+    def predict(self, estado: np.ndarray, pwm) -> np.ndarray:
+        """
+        Distancias (dist_frontal, dist_derecho) del próximo ciclo.
+
+        estado: (..., ventana, 4) con las últimas filas [dist_frontal, dist_derecho,
+        pwm_izq, pwm_der], la más reciente al final; su PWM se reemplaza por `pwm`
+        (..., 2), el comando a aplicar ahora. Acepta lotes para evaluar muchos
+        estados o comandos a la vez.
+        """
+        estado = np.asarray(estado, dtype=np.float64)
+        u = np.array(estado[..., 2:], dtype=np.float64)
+        u[..., -1, :] = pwm
+        d = estado[..., :2]
+        # Mismo orden que ventanas(): por canal, de la más vieja a la más nueva
+        phi = np.concatenate([
+            np.swapaxes(d, -1, -2).reshape(*d.shape[:-2], -1),
+            np.swapaxes(u, -1, -2).reshape(*u.shape[:-2], -1),
+            np.ones(d.shape[:-2] + (1,)),
+        ], axis=-1)
+        return d[..., -1, :] + phi @ self.W.T
+
+    def simular(self, estado: np.ndarray, pwms: np.ndarray) -> np.ndarray:
+        """Rollout en lazo abierto: aplica pwms (k, 2) y retorna las k distancias predichas (k, 2)"""
+        estado = np.array(estado, dtype=np.float64)
+        salida = np.empty((len(pwms), 2))
+        for i, u in enumerate(pwms):
+            x = self.predict(estado, u)
+            estado[-1, 2:] = u
+            estado = np.roll(estado, -1, axis=0)
+            estado[-1, :2] = x
+            salida[i] = x
+        return salida
+
+    def guardar(self, path: str):
+        np.savez(path, W=self.W, ventana=self.ventana, ridge=self.ridge, periodo=self.periodo)
+
+    @classmethod
+    def cargar(cls, path: str) -> 'ModeloDinamico':
+        z = np.load(path)
+        modelo = cls(int(z['ventana']), float(z['ridge']))
+        modelo.W = z['W']
+        modelo.periodo = float(z['periodo'])
+        return modelo
+
+
+if __name__ == "__main__":
+    t, datos = cargar_recorrido(os.path.join(DIR_DATA, 'recorrido_robot.csv'))
+    print(f"Muestras totales: {len(t)} | período mediano: {np.median(np.diff(t)) * 1e3:.1f} ms")
+
+    for n in (1, 2, 3, 5):
+        r = ModeloDinamico(ventana=n).ajustar(t, datos)
+        p = r['prueba']
+        print(f"ventana={n}: {r['ventanas']} ventanas | RMSE prueba frontal={p['rmse_frontal']:.3f} cm "
+              f"(persistencia {p['persistencia_frontal']:.3f}) derecho={p['rmse_derecho']:.3f} cm "
+              f"(persistencia {p['persistencia_derecho']:.3f})")
+
+    modelo = ModeloDinamico(ventana=3)
+    modelo.ajustar(t, datos)
+    modelo.guardar(os.path.join(DIR_DATA, 'modelo_dinamica.npz'))
+    print(f"Modelo guardado en: {DIR_DATA}")
@@ -2,12 +2,22 @@
 Control de Robot con Joystick - Aplicación Principal
 Orquesta controladores (Manual, Automático) y maneja comunicación WebSocket
 """
+import os
+import threading
 from datetime import datetime, UTC
 from arduino.app_utils import App, Bridge, Logger
 from arduino.app_bricks.web_ui import WebUI
 from arduino.app_bricks.video_objectdetection import VideoObjectDetection
 
-from controllers import ManualController, AutoController
+from controllers import ManualController, AutoController, IAController, MiniController, KNNController
+from controllers.mini import DIR_MINI
+from utils import ControlRuntime, JoystickCoalescer, ModelLoader, SessionRecorder, leer_sesion, exportar_csv
+from utils.loader import LISTO, ERROR
+from utils.recorder import nombre_sesion
+
+DIR_DATA = os.path.join(os.path.dirname(os.path.abspath(__file__)), "data")
+DIR_SESIONES = os.path.join(DIR_DATA, "sesiones")
+CSV_RECORRIDO = os.path.join(DIR_DATA, "recorrido_robot.csv")
 
 logger = Logger("robot-joystick-control")
 web_ui = WebUI()
@@ -22,17 +32,27 @@ controllers = {
     "auto": AutoController()
 }
 
+# Modos aprendidos: se cargan en segundo plano y se agregan a `controllers` al quedar listos
+modelos = ModelLoader()
+# Política aprendida: el modelo destilado (destilacion.py) si existe; si no, la tabla
+# compilada de XGBoost (o se compila una vez desde cerebro_robot.pkl)
+modelos.registrar("ia", lambda: MiniController() if os.path.isdir(DIR_MINI) else IAController())
+# Vecinos más cercanos sobre las grabaciones crudas (índice en caché, sólo lee filas nuevas)
+modelos.registrar("knn", KNNController)
+
 active_mode = "manual"
 active_controller = controllers["manual"]
+modo_pendiente = None  # Modo pedido antes de que su modelo estuviera listo
 
 # Estado
 ultimo_pwm_izq = 0
 ultimo_pwm_der = 0
 auto_active = False
 ciclos_ui = 0  # Contador para limitar actualizaciones de UI
+grabador = None  # SessionRecorder mientras REC está activo
 all_detected_objects = {}
 
-logger.info("Controladores disponibles: manual, auto")
+logger.info(f"Controladores disponibles: {', '.join(controllers)} (en carga: {', '.join(modelos.resumen())})")
 
 
 def on_detect_objects(detections: dict):
@@ -55,14 +75,53 @@ def on_detect_objects(detections: dict):
 detection_stream.on_detect_all(on_detect_objects)
 
 
+def al_cambiar_modelo(nombre: str, estado: str):
+    """Publica el estado del cargador; un modelo listo entra a los modos disponibles"""
+    global modo_pendiente
+    if estado == LISTO:
+        controllers[nombre] = modelos.obtener(nombre)
+        m = modelos.resumen()[nombre]
+        logger.info(f"Modelo {nombre} listo: carga {m['carga_ms']} ms, calentamiento {m['calentamiento_ms']} ms")
+    elif estado == ERROR:
+        logger.warning(f"Modelo {nombre} no disponible: {modelos.resumen()[nombre]['error']}")
+        if modo_pendiente == nombre:
+            modo_pendiente = None
+            web_ui.send_message("mode_changed", {"mode": active_mode})
+    web_ui.send_message("modelos", modelos.resumen())
+
+
+modelos.al_cambiar(al_cambiar_modelo)
+
+
 def set_mode(mode: str) -> bool:
     """Cambia el modo de control del robot"""
-    global active_mode, active_controller, auto_active
+    global active_mode, active_controller, auto_active, ultimo_pwm_izq, ultimo_pwm_der, modo_pendiente
 
+    if mode not in controllers and modelos.listo(mode):
+        controllers[mode] = modelos.obtener(mode)
     if mode not in controllers:
-        logger.warning(f"Modo desconocido: {mode}")
+        if mode in modelos:
+            # Modelo aún cargando: el cambio queda en espera (el último pedido gana)
+            modo_pendiente = mode
+
+            def avisar_espera(estado):
+                # Bajo el lock del cargador: el aviso sale antes que el mode_changed del
+                # cambio diferido, y no sale si el modelo ya estaba listo
+                logger.info(f"Modo {mode} en espera: modelo {estado}")
+                web_ui.send_message("mode_pending", {"mode": mode, "activo": active_mode})
+
+            if modelos.cuando_listo(mode, lambda _: modo_pendiente == mode and set_mode(mode), avisar_espera):
+                # Si el modelo quedó listo entretanto, el cambio ya se hizo aquí mismo
+                return active_mode == mode
+            modo_pendiente = None
+            web_ui.send_message("mode_changed", {"mode": active_mode})
+        logger.warning(f"Modo no disponible: {mode}")
         return False
+    modo_pendiente = None
 
+    if active_mode == "manual" and mode != "manual":
+        logger.info(joystick.texto())
+    joystick.descartar()
     active_controller.on_deactivate()
     Bridge.notify("detener")
 
@@ -70,6 +129,7 @@ def set_mode(mode: str) -> bool:
     active_controller = controllers[mode]
     active_controller.on_activate()
     auto_active = False
+    ultimo_pwm_izq = ultimo_pwm_der = 0
 
     logger.info(f"Modo cambiado a: {mode}")
     web_ui.send_message("mode_changed", {"mode": mode})
@@ -92,7 +152,7 @@ def al_recibir_distancias(d_frontal: float, d_derecho: float):
         except Exception as e:
             logger.warning(f"Error enviando sensores: {e}")
 
-    if active_mode == "auto" and auto_active:
+    if active_mode != "manual" and auto_active:
         try:
             pwm_izq, pwm_der = active_controller.compute(d_frontal, d_derecho)
             ultimo_pwm_izq, ultimo_pwm_der = pwm_izq, pwm_der
@@ -105,19 +165,31 @@ def al_recibir_distancias(d_frontal: float, d_derecho: float):
                     "derecho": pwm_der
                 })
         except Exception as e:
-            logger.warning(f"Error en controlador auto: {e}")
+            logger.warning(f"Error en controlador {active_mode}: {e}")
+
+    # Muestra con el PWM aplicado (joystick o controlador); sólo copia a los búferes
+    g = grabador
+    if g is not None:
+        g.record(d_frontal, d_derecho, ultimo_pwm_izq, ultimo_pwm_der)
+        if ciclos_ui % 50 == 0:
+            web_ui.send_message("rec_status", {"active": True, "muestras": g.grabadas})
 
 
 def on_joystick_move(sid, data):
-    """Maneja entrada del joystick desde la interfaz web"""
+    """Maneja entrada del joystick desde la interfaz web: sólo guarda el último vector"""
+    if active_mode != "manual":
+        return
+
+    joystick.recibir(data.get("x", 0), data.get("y", 0))
+
+
+def despachar_joystick(x: int, y: int):
+    """Envía el vector del joystick al Arduino (hilo del coalescedor, a lo sumo 50 Hz)"""
     global ultimo_pwm_izq, ultimo_pwm_der
 
     if active_mode != "manual":
         return
 
-    x = data.get("x", 0)
-    y = data.get("y", 0)
-
     manual = controllers["manual"]
     pwm_izq, pwm_der = manual.process_joystick(x, y)
     ultimo_pwm_izq, ultimo_pwm_der = pwm_izq, pwm_der
@@ -141,6 +213,8 @@ def on_girar(sid, data):
 
     direccion = data.get("dir")
     accion = data.get("action")
+    # Un vector de joystick pendiente no debe pisar el giro
+    joystick.descartar()
 
     manual = controllers["manual"]
     pwm_izq, pwm_der = manual.process_turn(direccion, accion)
@@ -170,16 +244,46 @@ def on_change_mode(sid, data):
 
 def on_toggle_auto(sid, data):
     """Activa/desactiva el controlador automático"""
-    global auto_active
+    global auto_active, ultimo_pwm_izq, ultimo_pwm_der
     auto_active = data.get("active", False)
     estado = "ACTIVADO" if auto_active else "DESACTIVADO"
     logger.info(f"Control automático: {estado}")
 
     if not auto_active:
+        ultimo_pwm_izq = ultimo_pwm_der = 0
         Bridge.notify("detener")
         web_ui.send_message("motores", {"izquierdo": 0, "derecho": 0})
 
 
+def exportar_sesion(path: str):
+    """Agrega la sesión al CSV de recorrido y actualiza el índice KNN (fuera del lazo de control)"""
+    try:
+        n = exportar_csv(leer_sesion(path), CSV_RECORRIDO)
+        logger.info(f"Sesión exportada: {n} muestras -> {CSV_RECORRIDO}")
+        if "knn" in controllers:
+            controllers["knn"].actualizar()
+    except Exception as e:
+        logger.warning(f"Error exportando sesión {path}: {e}")
+
+
+def on_toggle_rec(sid, data):
+    """Inicia/detiene la grabación de la sesión"""
+    global grabador
+    activo = data.get("active", False)
+
+    if activo and grabador is None:
+        grabador = SessionRecorder(nombre_sesion(DIR_SESIONES))
+        logger.info(f"Grabando sesión en: {grabador.path}")
+    elif not activo and grabador is not None:
+        g, grabador = grabador, None
+        g.close()
+        logger.info(f"Sesión detenida: {g.stats()}")
+        threading.Thread(target=exportar_sesion, args=(g.path,), daemon=True).start()
+
+    web_ui.send_message("rec_status", {"active": grabador is not None,
+                                       "muestras": grabador.grabadas if grabador else 0})
+
+
 def on_set_object_lists(sid, data):
     """Actualiza listas de objetos para el controlador automático"""
     list_a = data.get("list_a", [])
@@ -215,11 +319,24 @@ def on_console_message(sid, data):
 
 
 # Registrar callbacks
-Bridge.provide("distancias", al_recibir_distancias)
+# Los eventos del joystick se coalescen: sólo el último vector, a lo sumo 50 Hz, sin
+# duplicados; el vector sostenido se refresca cada 0.2 s mientras el navegador siga enviando
+joystick = JoystickCoalescer(despachar_joystick, hz=50, banda=4, refresco=0.2, vigencia=0.5)
+joystick.start()
+# Bridge sólo deja la muestra más nueva en el buzón; el control corre en su propio
+# hilo, una vez por muestra. El sketch manda una cada ~25 ms (dos lecturas y
+# delay(20)); una muestra que esperó más de medio intervalo se descarta
+PERIODO_SKETCH_S = 0.025
+runtime = ControlRuntime(al_recibir_distancias, periodo=PERIODO_SKETCH_S, max_edad=PERIODO_SKETCH_S / 2,
+                         nombre="distancias", log=logger.warning)
+runtime.start()
+Bridge.provide("distancias", runtime.recibir)
+modelos.start()
 web_ui.on_message("joystick", on_joystick_move)
 web_ui.on_message("girar", on_girar)
 web_ui.on_message("change_mode", on_change_mode)
 web_ui.on_message("toggle_auto", on_toggle_auto)
+web_ui.on_message("toggle_rec", on_toggle_rec)
 web_ui.on_message("set_object_lists", on_set_object_lists)
 web_ui.on_message("override_th", on_override_confidence)
 web_ui.on_message("toggle_camera", on_toggle_camera)
@@ -230,10 +347,14 @@ web_ui.on_message("console_message", on_console_message)
 def on_connect(sid):
     """Maneja nueva conexión de cliente"""
     logger.info(f"Cliente conectado: {sid}")
+    logger.info(f"{runtime.texto()} | {joystick.texto()}")
     web_ui.send_message("status", {"message": "Conectado al robot"})
     web_ui.send_message("mode_changed", {"mode": active_mode})
+    web_ui.send_message("modelos", modelos.resumen())
     web_ui.send_message("object_lists", controllers["auto"].get_object_lists())
     web_ui.send_message("camera_status", {"enabled": camera_enabled})
+    web_ui.send_message("rec_status", {"active": grabador is not None,
+                                       "muestras": grabador.grabadas if grabador else 0})
 
 
 if __name__ == "__main__":
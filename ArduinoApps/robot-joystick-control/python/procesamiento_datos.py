@@ -1,33 +1,196 @@
 """
 Procesamiento de datos - Prepara los datos de entrenamiento.
 Agrupa datos por celdas de distancia y calcula promedios.
+
+La agregación es incremental: por cada celda de 5 cm se guardan la suma de PWM
+y la cantidad de muestras en data/agregado_celdas.npz (junto a
+datos_mejorados.csv), con el byte hasta el que se leyó cada grabación. Cada
+corrida sólo lee lo agregado a los CSV desde la anterior, por bloques de
+tamaño fijo, y lo acumula con np.bincount: el tiempo depende de los datos
+nuevos y la memoria del tamaño del bloque, no del total grabado.
+
+También acepta grabaciones columnares (utils/columnas.py) o sesiones .rec; en
+ésas lo leído se cuenta en filas. El mapa se escribe como CSV y además como
+directorio columnar (data/datos_mejorados/) que entrenamiento.py abre sin parsear.
+
+Uso: python procesamiento_datos.py [grabacion.csv | directorio | sesion.rec ...]   (por defecto data/recorrido_robot.csv)
 """
 import os
-import pandas as pd
+import sys
+
+import numpy as np
+
+from utils import columnas
 
 # Directorio de datos
 DIR_DATA = os.path.join(os.path.dirname(os.path.abspath(__file__)), 'data')
+RECORRIDO = os.path.join(DIR_DATA, 'recorrido_robot.csv')
+MAPA = os.path.join(DIR_DATA, 'datos_mejorados.csv')
+AGREGADO = os.path.join(DIR_DATA, 'agregado_celdas.npz')
+
+PASO = 5.0                 # Tamaño de celda en cm
+BLOQUE = 8 * 1024 * 1024   # Bytes de CSV por lectura
+FILAS_BLOQUE = 1 << 20     # Filas por bloque en grabaciones columnares
+
+
+def leer_bloques(path: str, desde: int = 0, bloque: int = BLOQUE):
+    """Genera (filas (N, 4), byte_fin) desde el byte `desde`, un bloque de líneas completas a la vez"""
+    with open(path, 'rb') as f:
+        f.seek(desde)
+        if desde == 0:
+            f.readline()  # Cabecera
+        pos = f.tell()
+        resto = b''
+        while True:
+            crudo = f.read(bloque)
+            if not crudo:
+                break
+            crudo = resto + crudo
+            corte = crudo.rfind(b'\n') + 1
+            # Una última línea a medio escribir se deja para la próxima corrida
+            resto = crudo[corte:]
+            lineas = crudo[:corte].decode('utf-8').splitlines()
+            pos += corte
+            if not lineas:
+                continue
+            # timestamp,dist_frontal,dist_derecho,pwm_izq,pwm_der: la marca de tiempo no se usa
+            campos = [l.split(',', 1)[1] for l in lineas if l]
+            filas = np.array(','.join(campos).split(','), dtype=np.float64).reshape(-1, 4)
+            yield filas, pos
+
+
+class AgregadoCeldas:
+    """Sumas y cuentas de PWM por celda (f_grid, d_grid) en una malla que crece según los datos"""
+
+    def __init__(self, paso: float = PASO):
+        self.paso = float(paso)
+        self.origen = np.zeros(2, dtype=np.int64)      # índice de celda de la fila/columna 0
+        self.sumas = np.zeros((0, 0, 2))
+        self.cuentas = np.zeros((0, 0), dtype=np.int64)
+        self.leido = {}                                # grabación -> byte ya acumulado
+
+    @property
+    def muestras(self) -> int:
+        return int(self.cuentas.sum())
+
+    def _ampliar(self, lo: np.ndarray, hi: np.ndarray):
+        """Agranda la malla para cubrir los índices de celda [lo, hi]"""
+        if self.cuentas.size:
+            lo = np.minimum(lo, self.origen)
+            hi = np.maximum(hi, self.origen + self.cuentas.shape - 1)
+        forma = tuple((hi - lo + 1).tolist())
+        if forma == self.cuentas.shape and np.array_equal(lo, self.origen):
+            return
+        a, b = (self.origen - lo).tolist()
+        sumas = np.zeros(forma + (2,))
+        cuentas = np.zeros(forma, dtype=np.int64)
+        nf, nd = self.cuentas.shape
+        sumas[a:a + nf, b:b + nd] = self.sumas
+        cuentas[a:a + nf, b:b + nd] = self.cuentas
+        self.sumas, self.cuentas, self.origen = sumas, cuentas, lo
+
+    def acumular(self, filas: np.ndarray):
+        """Agrega filas (dist_frontal, dist_derecho, pwm_izq, pwm_der)"""
+        filas = filas[np.isfinite(filas).all(axis=1)]
+        if len(filas) == 0:
+            return
+        # Redondeo a la celda más cercana, como (d / 5).round() * 5
+        celdas = np.round(filas[:, :2] / self.paso).astype(np.int64)
+        self._ampliar(celdas.min(axis=0), celdas.max(axis=0))
+        nf, nd = self.cuentas.shape
+        k = (celdas[:, 0] - self.origen[0]) * nd + (celdas[:, 1] - self.origen[1])
+        n = nf * nd
+        self.cuentas += np.bincount(k, minlength=n).reshape(nf, nd)
+        self.sumas[..., 0] += np.bincount(k, filas[:, 2], minlength=n).reshape(nf, nd)
+        self.sumas[..., 1] += np.bincount(k, filas[:, 3], minlength=n).reshape(nf, nd)
+
+    def procesar(self, path: str, bloque: int = BLOQUE) -> int:
+        """Acumula lo agregado a la grabación desde la última vez; retorna cuántas filas"""
+        clave = os.path.abspath(path)
+        desde = self.leido.get(clave, 0)
+        if os.path.isdir(path) or path.endswith('.rec'):
+            return self._procesar_columnas(path, clave, desde)
+        if os.path.getsize(path) < desde:
+            # La grabación se reemplazó: sus sumas viejas no se pueden restar
+            raise ValueError(f"{path} es más corto que lo ya acumulado; borrar {AGREGADO} y reprocesar")
+        n = 0
+        for filas, fin in leer_bloques(path, desde, bloque):
+            self.acumular(filas)
+            self.leido[clave] = fin
+            n += len(filas)
+        return n
+
+    def _procesar_columnas(self, path: str, clave: str, desde: int) -> int:
+        cols = columnas.cargar(path, convertir_si_falta=False)
+        total = len(cols['dist_frontal'])
+        if total < desde:
+            raise ValueError(f"{path} tiene menos filas que las ya acumuladas; borrar {AGREGADO} y reprocesar")
+        # Sólo se tocan las filas nuevas del memmap, un bloque a la vez
+        for i in range(desde, total, FILAS_BLOQUE):
+            j = min(i + FILAS_BLOQUE, total)
+            self.acumular(np.column_stack([
+                cols[c][i:j].astype(np.float64) for c in ('dist_frontal', 'dist_derecho', 'pwm_izq', 'pwm_der')
+            ]))
+            self.leido[clave] = j
+        return total - desde
+
+    def mapa(self) -> np.ndarray:
+        """Filas (f_grid, d_grid, pwm_izq, pwm_der) de las celdas con datos, ordenadas como groupby"""
+        i, j = np.nonzero(self.cuentas)
+        c = self.cuentas[i, j]
+        return np.column_stack([
+            (i + self.origen[0]) * self.paso,
+            (j + self.origen[1]) * self.paso,
+            self.sumas[i, j, 0] / c,
+            self.sumas[i, j, 1] / c,
+        ])
+
+    def guardar(self, path: str = AGREGADO):
+        tmp = path + '.tmp.npz'
+        np.savez(tmp, sumas=self.sumas, cuentas=self.cuentas, origen=self.origen,
+                 paso=np.float64(self.paso),
+                 archivos=np.array(list(self.leido), dtype=str),
+                 bytes=np.array(list(self.leido.values()), dtype=np.int64))
+        os.replace(tmp, path)  # Nunca queda un estado a medio escribir
+
+    @classmethod
+    def cargar(cls, path: str = AGREGADO) -> 'AgregadoCeldas':
+        z = np.load(path)
+        agregado = cls(float(z['paso']))
+        agregado.sumas = z['sumas']
+        agregado.cuentas = z['cuentas']
+        agregado.origen = z['origen']
+        agregado.leido = dict(zip(z['archivos'].tolist(), z['bytes'].tolist()))
+        return agregado
+
+
+def guardar_mapa(filas: np.ndarray, path: str = MAPA):
+    """Escribe el mapa como CSV y como directorio columnar junto a él"""
+    nombres = ('f_grid', 'd_grid', 'pwm_izq', 'pwm_der')
+    with open(path, 'w') as f:
+        f.write(','.join(nombres) + '\n')
+        for fila in filas.tolist():
+            f.write(','.join(map(repr, fila)) + '\n')
+    columnas.guardar(dict(zip(nombres, filas.T)), columnas.ruta_columnar(path), origen=path)
+
 
-# 1. Cargar el dataset con todas las situaciones
-df = pd.read_csv(os.path.join(DIR_DATA, 'recorrido_robot.csv'))
+if __name__ == "__main__":
+    grabaciones = sys.argv[1:] or [RECORRIDO]
 
-# 2. Agrupar por "Celdas de Situación"
-# Redondeamos a cada 5cm para crear grupos de situaciones similares
-df['f_grid'] = (df['dist_frontal'] / 5).round() * 5
-df['d_grid'] = (df['dist_derecho'] / 5).round() * 5
+    # 1. Estado acumulado de corridas anteriores
+    agregado = AgregadoCeldas.cargar() if os.path.exists(AGREGADO) else AgregadoCeldas()
 
-print(f"Muestras totales: {len(df)}")
+    # 2. Sólo las filas nuevas de cada grabación, redondeadas a celdas de 5 cm
+    for path in grabaciones:
+        n = agregado.procesar(path)
+        print(f"{os.path.basename(path)}: {n} filas nuevas")
+    agregado.guardar()
 
-# 3. Crear el Consenso
-# Para cada "celda" de distancia, calculamos la respuesta PROMEDIO
-df_mapa = df.groupby(['f_grid', 'd_grid']).agg({
-    'pwm_izq': 'mean',
-    'pwm_der': 'mean'
-}).reset_index()
+    print(f"Muestras totales: {agregado.muestras}")
 
-# 4. Limpieza de seguridad
-df_mapa = df_mapa.dropna()
+    # 3. Crear el Consenso: la respuesta PROMEDIO de cada celda
+    mapa = agregado.mapa()
 
-# 5. Guardar el mapa de navegación
-df_mapa.to_csv(os.path.join(DIR_DATA, 'datos_mejorados.csv'), index=False)
-print(f"Situaciones únicas aprendidas: {len(df_mapa)}")
+    # 4. Guardar el mapa de navegación
+    guardar_mapa(mapa)
+    print(f"Situaciones únicas aprendidas: {len(mapa)}")
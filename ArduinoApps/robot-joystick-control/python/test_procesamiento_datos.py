@@ -0,0 +1,69 @@
+"""Pruebas de procesamiento_datos.py: agregado incremental contra recálculo completo."""
+import numpy as np
+
+from procesamiento_datos import AgregadoCeldas
+
+
+def escribir_csv(path, filas, cabecera=True):
+    with open(path, 'a') as f:
+        if cabecera:
+            f.write('timestamp,dist_frontal,dist_derecho,pwm_izq,pwm_der\n')
+        for fila in filas.tolist():
+            f.write('2025-12-29T00:22:24.638346,' + ','.join(map(repr, fila)) + '\n')
+
+
+def recalculo(filas, paso=5.0):
+    """Promedio por celda con un diccionario, como el groupby original"""
+    celdas = {}
+    for f, d, pi, pd in filas.tolist():
+        clave = (round(f / paso) * paso, round(d / paso) * paso)
+        s = celdas.setdefault(clave, [0.0, 0.0, 0])
+        s[0] += pi
+        s[1] += pd
+        s[2] += 1
+    return np.array([(f, d, s[0] / s[2], s[1] / s[2]) for (f, d), s in sorted(celdas.items())])
+
+
+def filas_aleatorias(rng, n, centro):
+    return np.column_stack([
+        np.round(rng.normal(centro, 30.0, size=(n, 2)), 2),
+        rng.integers(-255, 256, size=(n, 2)),
+    ]).astype(np.float64)
+
+
+def test_incremental_igual_a_recalculo(tmp_path):
+    rng = np.random.default_rng(4)
+    csv = str(tmp_path / 'recorrido.csv')
+    estado = str(tmp_path / 'agregado.npz')
+    lotes = [filas_aleatorias(rng, 700, c) for c in (50.0, 120.0, 10.0)]
+
+    for k, lote in enumerate(lotes):
+        escribir_csv(csv, lote, cabecera=(k == 0))
+        # Cada corrida parte del estado guardado y lee sólo lo nuevo, en bloques chicos
+        agregado = AgregadoCeldas.cargar(estado) if k else AgregadoCeldas()
+        assert agregado.procesar(csv, bloque=997) == len(lote)
+        agregado.guardar(estado)
+
+    todas = np.concatenate(lotes)
+    assert agregado.muestras == len(todas)
+    assert np.allclose(agregado.mapa(), recalculo(todas))
+
+    completo = AgregadoCeldas()
+    completo.procesar(csv)
+    assert np.allclose(completo.mapa(), agregado.mapa())
+
+
+def test_linea_a_medio_escribir_queda_para_la_proxima(tmp_path):
+    rng = np.random.default_rng(5)
+    csv = str(tmp_path / 'recorrido.csv')
+    filas = filas_aleatorias(rng, 10, 60.0)
+    escribir_csv(csv, filas)
+    with open(csv, 'a') as f:
+        f.write('2025-12-29T00:22:25.000000,61.0,')
+
+    agregado = AgregadoCeldas()
+    assert agregado.procesar(csv) == 10
+    with open(csv, 'a') as f:
+        f.write('12.0,100,-100\n')
+    assert agregado.procesar(csv) == 1
+    assert np.allclose(agregado.mapa(), recalculo(np.vstack([filas, [61.0, 12.0, 100, -100]])))
@@ -1,5 +1,7 @@
 # Utils module
-# Currently empty - recorder functionality removed
-
-__all__ = []
+from .runtime import ControlRuntime, Mailbox
+from .coalescer import JoystickCoalescer
+from .loader import ModelLoader
+from .recorder import SessionRecorder, leer_sesion, exportar_csv
 
+__all__ = ["ControlRuntime", "Mailbox", "JoystickCoalescer", "ModelLoader", "SessionRecorder", "leer_sesion", "exportar_csv"]
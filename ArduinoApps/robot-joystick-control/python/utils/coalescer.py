@@ -0,0 +1,143 @@
+"""
+Coalescedor del joystick: limita los comandos al Arduino a una tasa fija.
+
+Cada evento del socket sólo deja el vector (x, y) más nuevo en un Mailbox;
+un hilo lo despacha a lo sumo `hz` veces por segundo. Los eventos que llegan
+entre dos despachos se pisan (coalescidos) y un vector dentro de la banda
+muerta del último enviado no se reenvía (duplicado), salvo cada `refresco` s
+o para llegar exactamente a (0, 0).
+
+El refresco del watchdog del Arduino también corre por tiempo: mientras el
+último vector enviado no sea (0, 0), el hilo lo reenvía cada `refresco` s
+aunque no llegue ningún evento. Sólo lo hace si el navegador mandó algo en los
+últimos `vigencia` s; si deja de mandar eventos, el refresco se corta y el
+watchdog detiene el robot como antes.
+
+descartar() y el envío toman el mismo lock, y cada vector lleva la
+generación en que llegó: un envío en curso termina antes de que descartar()
+vuelva, y un vector anterior a descartar() ya no se envía. Así nada llega al
+sketch después del "detener" que sigue a descartar().
+"""
+import threading
+import time
+
+from .runtime import Mailbox
+
+
+class JoystickCoalescer:
+    def __init__(self, enviar, hz=50.0, banda=4, refresco=0.2, vigencia=0.5, nombre="joystick"):
+        self.enviar = enviar                # enviar(x, y): Bridge.notify + UI
+        self.periodo = 1.0 / float(hz)
+        self.banda = int(banda)             # diferencia máxima por eje que cuenta como igual
+        self.refresco = float(refresco)     # reenvío de un vector sostenido (watchdog 500 ms)
+        self.vigencia = float(vigencia)     # sin eventos por más que esto, no se refresca
+        self.nombre = nombre
+        self.buzon = Mailbox()
+        self.ultimo = None                  # último vector enviado
+        self.t_envio = 0.0
+        self.t_evento = 0.0                 # último evento recibido del navegador
+        self.recibidas = 0
+        self.enviadas = 0
+        self.duplicadas = 0
+        self.descartadas = 0
+        self.refrescos = 0
+        self._lock = threading.Lock()
+        self._generacion = 0
+        self._parar = threading.Event()
+        self._hilo = None
+
+    def recibir(self, x, y):
+        """Desde el handler del socket: sólo guarda el vector."""
+        self.recibidas += 1
+        self.t_evento = time.perf_counter()
+        self.buzon.put((self._generacion, int(x), int(y)))
+
+    def descartar(self):
+        """
+        Olvida el vector pendiente y el último enviado (cambio de modo, giro,
+        stop). Al volver, ningún vector recibido antes puede enviarse.
+        """
+        # La generación cambia antes de esperar el lock: si el hilo lo toma
+        # primero, ya no envía lo que quedaba pendiente
+        self._generacion += 1
+        with self._lock:
+            if self.buzon.take(0) is not None:
+                self.descartadas += 1
+            self.ultimo = None
+
+    def _duplicado(self, x, y, ahora):
+        u = self.ultimo
+        if u is None or ahora - self.t_envio >= self.refresco:
+            return False
+        if (x, y) == (0, 0):
+            return u == (0, 0)
+        return abs(x - u[0]) <= self.banda and abs(y - u[1]) <= self.banda
+
+    def _enviar(self, x, y, ahora):
+        # Con self._lock tomado
+        try:
+            self.enviar(x, y)
+        finally:
+            self.ultimo = (x, y)
+            self.t_envio = ahora
+            self.enviadas += 1
+
+    def _refrescar(self, ahora):
+        # Con self._lock tomado
+        u = self.ultimo
+        if u is None or u == (0, 0):
+            return
+        if ahora - self.t_envio >= self.refresco and ahora - self.t_evento < self.vigencia:
+            self.refrescos += 1
+            self._enviar(u[0], u[1], ahora)
+
+    def _bucle(self):
+        while not self._parar.is_set():
+            item = self.buzon.take(self.periodo)
+            ahora = time.perf_counter()
+            with self._lock:
+                if item is None:
+                    self._refrescar(ahora)
+                    continue
+                (generacion, x, y), _ = item
+                if generacion != self._generacion:
+                    # Llegó antes de un descartar() que ya lo sacó del buzón
+                    self.descartadas += 1
+                    continue
+                if self._duplicado(x, y, ahora):
+                    self.duplicadas += 1
+                    continue
+                self._enviar(x, y, ahora)
+            # Tasa máxima: lo que llegue mientras tanto se pisa en el buzón
+            espera = self.t_envio + self.periodo - time.perf_counter()
+            if espera > 0:
+                self._parar.wait(espera)
+
+    def start(self):
+        if self._hilo is None:
+            self._parar.clear()
+            self._hilo = threading.Thread(target=self._bucle, name=self.nombre, daemon=True)
+            self._hilo.start()
+        return self
+
+    def stop(self):
+        if self._hilo is not None:
+            self._parar.set()
+            self._hilo.join()
+            self._hilo = None
+
+    def stats(self):
+        return {
+            "recibidas": self.recibidas,
+            "enviadas": self.enviadas,
+            "coalescidas": self.buzon.sobrescritas,
+            "duplicadas": self.duplicadas,
+            "descartadas": self.descartadas,
+            "refrescos": self.refrescos,
+        }
+
+    def texto(self):
+        s = self.stats()
+        return (f"JOYSTICK recibidas={s['recibidas']} enviadas={s['enviadas']} "
+                f"coalescidas={s['coalescidas']} duplicadas={s['duplicadas']} "
+                f"descartadas={s['descartadas']} refrescos={s['refrescos']}")
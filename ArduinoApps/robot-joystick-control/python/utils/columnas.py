@@ -0,0 +1,121 @@
+"""
+Columnas - Grabaciones en disco como un directorio de arreglos .npy tipados
+
+recorrido_robot.csv se convierte a data/recorrido_robot/ con un .npy por
+columna (t_ns int64 en ns desde epoch, distancias float32, PWM int16) y un
+meta.json con el tamaño del archivo de origen. cargar() abre el directorio con
+np.load(mmap_mode='r'): no se parsea ni se copia nada hasta que se tocan los
+datos. Si el directorio no existe o quedó viejo (el CSV creció), se lee el
+CSV como antes y opcionalmente se reconvierte.
+"""
+import json
+import os
+
+import numpy as np
+
+DTYPES = {
+    't_ns': np.int64,
+    'dist_frontal': np.float32,
+    'dist_derecho': np.float32,
+    'pwm_izq': np.int16,
+    'pwm_der': np.int16,
+}
+META = 'meta.json'
+
+
+def ruta_columnar(path: str) -> str:
+    """data/recorrido_robot.csv -> data/recorrido_robot/"""
+    return os.path.splitext(os.path.abspath(path))[0]
+
+
+def leer_csv(path: str, tipos: dict = DTYPES, hasta: int = -1) -> dict:
+    """Columnas de un CSV; `timestamp` ISO pasa a t_ns y el resto toma el tipo de `tipos` (float64 si no está)"""
+    with open(path, 'rb') as f:
+        crudo = f.read(hasta)
+    # Una última línea a medio escribir se ignora
+    lineas = crudo[:crudo.rfind(b'\n') + 1].decode('utf-8').splitlines()
+    nombres = lineas[0].split(',')
+    filas = [l.split(',') for l in lineas[1:] if l]
+    valores = list(zip(*filas)) if filas else [()] * len(nombres)
+
+    columnas = {}
+    for nombre, col in zip(nombres, valores):
+        if nombre == 'timestamp':
+            marcas = np.array(col, dtype='datetime64[ns]')
+            columnas['t_ns'] = marcas.view(np.int64)
+        else:
+            tipo = tipos.get(nombre, np.float64)
+            columnas[nombre] = np.array(col, dtype=np.float64).astype(tipo)
+    return columnas
+
+
+def guardar(columnas: dict, destino: str, origen: str = None, bytes_origen: int = None):
+    """Escribe un .npy por columna; `origen` y su tamaño se anotan para detectar cuándo queda viejo"""
+    os.makedirs(destino, exist_ok=True)
+    meta_path = os.path.join(destino, META)
+    if os.path.exists(meta_path):
+        os.remove(meta_path)
+    for nombre, valores in columnas.items():
+        np.save(os.path.join(destino, f'{nombre}.npy'), np.ascontiguousarray(valores))
+    meta = {
+        'columnas': list(columnas),
+        'filas': int(len(next(iter(columnas.values())))) if columnas else 0,
+    }
+    if origen is not None:
+        meta['origen'] = os.path.basename(origen)
+        meta['bytes'] = os.path.getsize(origen) if bytes_origen is None else int(bytes_origen)
+    # El meta se escribe al final: sin él el directorio no se considera válido
+    with open(meta_path, 'w') as f:
+        json.dump(meta, f, indent=2)
+
+
+def convertir(origen: str, destino: str = None, tipos: dict = DTYPES) -> str:
+    """Convierte un CSV o una sesión .rec a directorio columnar; retorna la ruta"""
+    destino = destino or ruta_columnar(origen)
+    # Tamaño antes de leer: si el CSV crece mientras tanto, el directorio ya nace viejo
+    tam = os.path.getsize(origen)
+    if origen.endswith('.rec'):
+        from .recorder import leer_sesion
+        columnas = leer_sesion(origen)
+    else:
+        columnas = leer_csv(origen, tipos, hasta=tam)
+    guardar(columnas, destino, origen, tam)
+    return destino
+
+
+def vigente(directorio: str, origen: str = None) -> bool:
+    """True si el directorio está completo y (si se da) corresponde al tamaño actual de `origen`"""
+    meta_path = os.path.join(directorio, META)
+    if not os.path.exists(meta_path):
+        return False
+    if origen is None:
+        return True
+    with open(meta_path) as f:
+        meta = json.load(f)
+    return os.path.exists(origen) and meta.get('bytes') == os.path.getsize(origen)
+
+
+def abrir(directorio: str) -> dict:
+    """Columnas del directorio como memmap de sólo lectura"""
+    with open(os.path.join(directorio, META)) as f:
+        meta = json.load(f)
+    return {n: np.load(os.path.join(directorio, f'{n}.npy'), mmap_mode='r') for n in meta['columnas']}
+
+
+def cargar(path: str, tipos: dict = DTYPES, convertir_si_falta: bool = True) -> dict:
+    """
+    Columnas de una grabación. `path` puede ser el CSV, una sesión .rec o el
+    directorio columnar. Para un CSV se usa su directorio si está vigente; si no,
+    se lee el CSV (y se deja convertido para la próxima vez).
+    """
+    if os.path.isdir(path):
+        return abrir(path)
+    directorio = ruta_columnar(path)
+    if vigente(directorio, path):
+        return abrir(directorio)
+    if convertir_si_falta:
+        return abrir(convertir(path, directorio, tipos))
+    if path.endswith('.rec'):
+        from .recorder import leer_sesion
+        return leer_sesion(path)
+    return leer_csv(path, tipos)
@@ -0,0 +1,126 @@
+"""
+Cargador de modelos - Carga y calienta controladores pesados en segundo plano
+
+main.py registra una fábrica por modo aprendido y arranca el cargador antes
+de App.run(): la WebUI, el Bridge y el modo manual quedan disponibles de
+inmediato mientras un hilo construye cada controlador (unpickle, compilar
+tablas, índices) y lo calienta con algunas llamadas a compute(). Cada modelo
+pasa por pendiente -> cargando -> listo | error, con sus tiempos de carga y
+calentamiento para la UI.
+"""
+import threading
+import time
+from typing import Callable, Dict
+
+PENDIENTE = "pendiente"
+CARGANDO = "cargando"
+LISTO = "listo"
+ERROR = "error"
+
+# Puntos (dist_frontal, dist_derecho) para el calentamiento
+PUNTOS_CALENTAMIENTO = [(f, d) for f in (5.0, 20.0, 60.0, 150.0, 400.0) for d in (5.0, 15.0, 40.0, 120.0)]
+
+
+class ModelLoader:
+    """Construye controladores registrados en un hilo y avisa cuando cada uno está listo"""
+
+    def __init__(self):
+        self._fabricas: Dict[str, Callable] = {}
+        self._modelos = {}
+        self._estado = {}
+        self._metricas = {}
+        self._esperando: Dict[str, list] = {}
+        self._al_cambiar = []
+        self._lock = threading.Lock()
+        self._hilo = None
+        self.t_inicio = None
+
+    def registrar(self, nombre: str, fabrica: Callable):
+        """`fabrica()` retorna el controlador; se llama en el hilo del cargador"""
+        self._fabricas[nombre] = fabrica
+        self._estado[nombre] = PENDIENTE
+        self._metricas[nombre] = {"carga_ms": None, "calentamiento_ms": None, "error": None}
+
+    def al_cambiar(self, callback: Callable):
+        """callback(nombre, estado) en cada cambio de estado de un modelo"""
+        self._al_cambiar.append(callback)
+
+    def start(self):
+        self.t_inicio = time.perf_counter()
+        self._hilo = threading.Thread(target=self._cargar_todos, name="cargador", daemon=True)
+        self._hilo.start()
+
+    def join(self, timeout: float = None):
+        if self._hilo is not None:
+            self._hilo.join(timeout)
+
+    # --- Consultas ---
+
+    def __contains__(self, nombre: str) -> bool:
+        return nombre in self._fabricas
+
+    def estado(self, nombre: str) -> str:
+        return self._estado.get(nombre)
+
+    def listo(self, nombre: str) -> bool:
+        return self._estado.get(nombre) == LISTO
+
+    def obtener(self, nombre: str):
+        return self._modelos.get(nombre)
+
+    def resumen(self) -> dict:
+        """Estado y métricas de todos los modelos (para la UI)"""
+        return {n: {"estado": self._estado[n], **self._metricas[n]} for n in self._fabricas}
+
+    def cuando_listo(self, nombre: str, callback: Callable, al_esperar: Callable = None) -> bool:
+        """
+        callback(controlador) en cuanto el modelo esté listo (ya, si lo está).
+        Si el pedido queda en espera se llama al_esperar(estado) bajo el lock,
+        así que corre antes que callback aunque el modelo termine justo ahora;
+        si el modelo ya estaba listo no se llama. Retorna False si el modelo no
+        existe o falló al cargar.
+        """
+        with self._lock:
+            estado = self._estado.get(nombre)
+            if estado in (PENDIENTE, CARGANDO):
+                self._esperando.setdefault(nombre, []).append(callback)
+                if al_esperar is not None:
+                    al_esperar(estado)
+                return True
+        if estado == LISTO:
+            callback(self._modelos[nombre])
+            return True
+        return False
+
+    # --- Hilo del cargador ---
+
+    def _cambiar(self, nombre: str, estado: str):
+        with self._lock:
+            self._estado[nombre] = estado
+            esperando = self._esperando.pop(nombre, []) if estado in (LISTO, ERROR) else []
+        for cb in self._al_cambiar:
+            cb(nombre, estado)
+        if estado == LISTO:
+            for cb in esperando:
+                cb(self._modelos[nombre])
+
+    def _cargar_todos(self):
+        for nombre, fabrica in self._fabricas.items():
+            self._cambiar(nombre, CARGANDO)
+            m = self._metricas[nombre]
+            try:
+                t0 = time.perf_counter()
+                modelo = fabrica()
+                t1 = time.perf_counter()
+                # Primeras llamadas: toca tablas e índices antes del primer ciclo real
+                for f, d in PUNTOS_CALENTAMIENTO:
+                    modelo.compute(f, d)
+                t2 = time.perf_counter()
+            except Exception as e:
+                m["error"] = str(e)
+                self._cambiar(nombre, ERROR)
+                continue
+            m["carga_ms"] = round((t1 - t0) * 1e3, 1)
+            m["calentamiento_ms"] = round((t2 - t1) * 1e3, 2)
+            self._modelos[nombre] = modelo
+            self._cambiar(nombre, LISTO)
@@ -0,0 +1,184 @@
+"""
+Grabador de sesiones - Muestras de sensores y PWM aplicado en bloques columnares
+
+record() sólo escribe cinco valores en bloques preasignados (int64 ns, float32
+distancias, int16 PWM). Al llenarse un bloque pasa a un hilo escritor que lo
+vuelca entero al archivo; la memoria queda fija en `bloques` x `filas_por_bloque`
+filas sin importar la duración de la sesión. Si el escritor se atrasa y no hay
+bloques libres, las muestras se descartan y se cuentan en `perdidas`.
+
+Formato del archivo (.rec): cabecera b"RECS" + versión, y luego trozos
+    b"BLK" + n (uint32) + t_ns[n] + frontal[n] + derecho[n] + pwm_izq[n] + pwm_der[n]
+con cada columna contigua en little-endian.
+"""
+import os
+import queue
+import struct
+import threading
+import time
+from datetime import datetime
+
+import numpy as np
+
+MAGIA = b"RECS"
+VERSION = 1
+_BLOQUE = struct.Struct("<3sI")
+
+# (nombre, dtype) en el orden en que se escriben
+COLUMNAS = (
+    ("t_ns", np.dtype("<i8")),
+    ("dist_frontal", np.dtype("<f4")),
+    ("dist_derecho", np.dtype("<f4")),
+    ("pwm_izq", np.dtype("<i2")),
+    ("pwm_der", np.dtype("<i2")),
+)
+
+
+class SessionRecorder:
+    """Grabación de una sesión en un archivo .rec con escritura en segundo plano"""
+
+    def __init__(self, path: str, filas_por_bloque: int = 4096, bloques: int = 4):
+        self.path = path
+        self.filas = int(filas_por_bloque)
+        self._bloques = [
+            tuple(np.zeros(self.filas, dtype=dt) for _, dt in COLUMNAS) for _ in range(int(bloques))
+        ]
+        self._libres = queue.Queue()
+        for i in range(1, len(self._bloques)):
+            self._libres.put(i)
+        self._llenos = queue.Queue()
+        self._actual = 0
+        self._n = 0
+        self._lock = threading.Lock()
+        self._cerrado = False
+
+        self.grabadas = 0
+        self.perdidas = 0
+        self.escritas = 0
+
+        directorio = os.path.dirname(path)
+        if directorio:
+            os.makedirs(directorio, exist_ok=True)
+        self._f = open(path, "wb")
+        self._f.write(MAGIA + struct.pack("<B", VERSION))
+        self._hilo = threading.Thread(target=self._escritor, name="grabador", daemon=True)
+        self._hilo.start()
+
+    # --- Lado del lazo de control ---
+
+    def record(self, dist_frontal: float, dist_derecho: float, pwm_izq: int, pwm_der: int):
+        """Sin efecto después de close(), aunque otro hilo todavía tenga la referencia"""
+        with self._lock:
+            if self._cerrado:
+                return
+            if self._actual is None and not self._tomar_bloque():
+                self.perdidas += 1
+                return
+            t, f, d, i, r = self._bloques[self._actual]
+            n = self._n
+            t[n] = time.time_ns()
+            f[n] = dist_frontal
+            d[n] = dist_derecho
+            i[n] = pwm_izq
+            r[n] = pwm_der
+            self._n = n + 1
+            self.grabadas += 1
+            if self._n == self.filas:
+                self._entregar()
+
+    def _tomar_bloque(self) -> bool:
+        try:
+            self._actual = self._libres.get_nowait()
+        except queue.Empty:
+            return False
+        self._n = 0
+        return True
+
+    def _entregar(self):
+        """Pasa el bloque actual al escritor y toma uno libre si hay"""
+        self._llenos.put((self._actual, self._n))
+        self._actual = None
+        self._tomar_bloque()
+
+    # --- Lado del escritor ---
+
+    def _escritor(self):
+        while True:
+            item = self._llenos.get()
+            if item is None:
+                break
+            idx, n = item
+            self._f.write(_BLOQUE.pack(b"BLK", n))
+            for col in self._bloques[idx]:
+                self._f.write(col[:n].tobytes())
+            self._f.flush()
+            self.escritas += n
+            self._libres.put(idx)
+
+    def close(self):
+        """Vuelca el bloque parcial, espera al escritor y cierra el archivo"""
+        with self._lock:
+            # Bajo el mismo lock que record(): después de esto ninguna muestra entra
+            if self._cerrado:
+                return
+            self._cerrado = True
+            if self._actual is not None and self._n:
+                self._llenos.put((self._actual, self._n))
+                self._actual = None
+            self._llenos.put(None)
+        self._hilo.join()
+        self._f.close()
+
+    def __enter__(self):
+        return self
+
+    def __exit__(self, *exc):
+        self.close()
+
+    def stats(self) -> dict:
+        return {"grabadas": self.grabadas, "escritas": self.escritas, "perdidas": self.perdidas}
+
+
+def leer_sesion(path: str) -> dict:
+    """Columnas de un archivo .rec como arreglos NumPy (se concatenan los trozos)"""
+    with open(path, "rb") as f:
+        datos = f.read()
+    if datos[:4] != MAGIA:
+        raise ValueError(f"{path}: no es un archivo de sesión")
+    partes = {nombre: [] for nombre, _ in COLUMNAS}
+    pos = 5
+    while pos + _BLOQUE.size <= len(datos):
+        etiqueta, n = _BLOQUE.unpack_from(datos, pos)
+        if etiqueta != b"BLK":
+            raise ValueError(f"{path}: trozo inválido en el byte {pos}")
+        pos += _BLOQUE.size
+        largo = sum(n * dt.itemsize for _, dt in COLUMNAS)
+        if pos + largo > len(datos):
+            break  # Trozo a medio escribir (corte de energía)
+        for nombre, dt in COLUMNAS:
+            partes[nombre].append(np.frombuffer(datos, dtype=dt, count=n, offset=pos))
+            pos += n * dt.itemsize
+    return {
+        nombre: np.concatenate(partes[nombre]) if partes[nombre] else np.empty(0, dtype=dt)
+        for nombre, dt in COLUMNAS
+    }
+
+
+def exportar_csv(sesion: dict, csv_path: str) -> int:
+    """Agrega una sesión al CSV de recorrido con el formato de recorrido_robot.csv"""
+    nuevo = not os.path.exists(csv_path) or os.path.getsize(csv_path) == 0
+    # Hora local sin zona y con microsegundos, como las filas ya grabadas
+    marcas = [datetime.fromtimestamp(s).replace(microsecond=us).isoformat(timespec="microseconds")
+              for s, us in (divmod(t // 1000, 1_000_000) for t in sesion["t_ns"].tolist())]
+    with open(csv_path, "a") as f:
+        if nuevo:
+            f.write("timestamp,dist_frontal,dist_derecho,pwm_izq,pwm_der\n")
+        for t, df, dd, pi, pd in zip(marcas,
+                                     sesion["dist_frontal"].tolist(), sesion["dist_derecho"].tolist(),
+                                     sesion["pwm_izq"].tolist(), sesion["pwm_der"].tolist()):
+            f.write(f"{t},{round(df, 2)},{round(dd, 2)},{pi},{pd}\n")
+    return len(sesion["t_ns"])
+
+
+def nombre_sesion(directorio: str) -> str:
+    return os.path.join(directorio, datetime.now().strftime("sesion_%Y%m%d_%H%M%S.rec"))
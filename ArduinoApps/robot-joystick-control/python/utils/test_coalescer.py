@@ -0,0 +1,88 @@
+"""Pruebas de coalescer.py: descartar() contra un envío en curso y refresco por tiempo."""
+import threading
+import time
+
+from .coalescer import JoystickCoalescer
+
+
+def esperar(condicion, timeout=1.0):
+    fin = time.perf_counter() + timeout
+    while not condicion() and time.perf_counter() < fin:
+        time.sleep(0.002)
+    return condicion()
+
+
+def test_nada_se_envia_despues_de_descartar():
+    salida = []
+    en_curso = threading.Event()
+    liberar = threading.Event()
+
+    def enviar(x, y):
+        salida.append((x, y))
+        if len(salida) == 1:
+            en_curso.set()
+            liberar.wait(1.0)
+
+    co = JoystickCoalescer(enviar, hz=1000, refresco=10.0).start()
+    try:
+        co.recibir(100, 0)
+        assert en_curso.wait(1.0)
+        # Un vector pendiente mientras el primero sigue en enviar()
+        co.recibir(120, 0)
+
+        def detener():
+            co.descartar()
+            salida.append("detener")
+
+        hilo = threading.Thread(target=detener)
+        hilo.start()
+        time.sleep(0.02)
+        # descartar() espera a que termine el envío en curso
+        assert salida == [(100, 0)]
+        liberar.set()
+        hilo.join(1.0)
+        time.sleep(0.05)
+        assert salida == [(100, 0), "detener"]
+        assert co.descartadas == 1
+    finally:
+        co.stop()
+
+
+def test_vector_anterior_a_descartar_no_se_envia():
+    salida = []
+    co = JoystickCoalescer(lambda x, y: salida.append((x, y)), refresco=10.0)
+    # Tomado del buzón justo antes de descartar(): su generación ya no vale
+    co.recibir(80, 80)
+    item = co.buzon.take(0)
+    co.descartar()
+    co.buzon.put(item[0])
+    co.start()
+    try:
+        time.sleep(0.05)
+        assert salida == [] and co.descartadas == 1
+    finally:
+        co.stop()
+
+
+def test_refresco_por_tiempo_mientras_hay_eventos():
+    salida = []
+    co = JoystickCoalescer(lambda x, y: salida.append((x, y)), hz=200, refresco=0.03, vigencia=0.15).start()
+    try:
+        co.recibir(150, 20)
+        # Sin más eventos: se reenvía el mismo vector por tiempo...
+        assert esperar(lambda: co.refrescos >= 2)
+        assert set(salida) == {(150, 20)}
+        # ...hasta que pasa la vigencia del último evento
+        time.sleep(0.2)
+        n = len(salida)
+        time.sleep(0.1)
+        assert len(salida) == n
+
+        # Parado en (0, 0) no hay nada que refrescar
+        co.recibir(0, 0)
+        assert esperar(lambda: salida[-1] == (0, 0))
+        n = len(salida)
+        time.sleep(0.1)
+        assert len(salida) == n
+    finally:
+        co.stop()
@@ -0,0 +1,45 @@
+"""Pruebas de loader.py: aviso de espera de cuando_listo() contra un modelo que termina de cargar."""
+import threading
+
+from .loader import LISTO, ModelLoader
+
+
+class Modelo:
+    def compute(self, f, d):
+        return 0, 0
+
+
+def test_aviso_de_espera_antes_del_cambio():
+    liberar = threading.Event()
+    eventos = []
+
+    def fabrica():
+        liberar.wait(1.0)
+        return Modelo()
+
+    modelos = ModelLoader()
+    modelos.registrar("ia", fabrica)
+    modelos.start()
+    try:
+        assert modelos.cuando_listo("ia", lambda m: eventos.append("listo"), lambda e: eventos.append(("espera", e)))
+    finally:
+        liberar.set()
+        modelos.join(1.0)
+    assert eventos[0][0] == "espera" and eventos[1:] == ["listo"]
+
+    # Ya cargado: callback en el acto y sin aviso de espera
+    eventos.clear()
+    assert modelos.estado("ia") == LISTO
+    assert modelos.cuando_listo("ia", lambda m: eventos.append("listo"), lambda e: eventos.append("espera"))
+    assert eventos == ["listo"]
+
+
+def test_sin_modelo_o_con_error():
+    modelos = ModelLoader()
+    modelos.registrar("knn", lambda: 1 / 0)
+    modelos.start()
+    modelos.join(1.0)
+    avisos = []
+    assert not modelos.cuando_listo("knn", lambda m: None, avisos.append)
+    assert not modelos.cuando_listo("otro", lambda m: None, avisos.append)
+    assert avisos == []
@@ -0,0 +1,94 @@
+"""Pruebas de recorder.py: ida y vuelta de una sesión, exportación al CSV de recorrido y record() tras close()."""
+import os
+import threading
+import time
+from datetime import datetime
+
+import numpy as np
+
+from .recorder import SessionRecorder, exportar_csv, leer_sesion
+
+
+def grabar(path, n, filas_por_bloque=16):
+    # Bloques de sobra: ninguna muestra se descarta aunque el escritor se atrase
+    with SessionRecorder(str(path), filas_por_bloque=filas_por_bloque, bloques=n // filas_por_bloque + 2) as rec:
+        for k in range(n):
+            rec.record(k * 0.5, 100.0 - k * 0.25, k % 256 - 128, -(k % 200))
+    return rec
+
+
+def test_ida_y_vuelta(tmp_path):
+    path = tmp_path / "sesion.rec"
+    rec = grabar(path, 500)
+    assert rec.stats() == {"grabadas": 500, "escritas": 500, "perdidas": 0}
+
+    sesion = leer_sesion(str(path))
+    k = np.arange(500)
+    assert np.array_equal(sesion["dist_frontal"], (k * 0.5).astype(np.float32))
+    assert np.array_equal(sesion["dist_derecho"], (100.0 - k * 0.25).astype(np.float32))
+    assert np.array_equal(sesion["pwm_izq"], k % 256 - 128)
+    assert np.array_equal(sesion["pwm_der"], -(k % 200))
+    assert np.all(np.diff(sesion["t_ns"]) >= 0)
+
+
+def test_trozo_cortado_se_ignora(tmp_path):
+    path = tmp_path / "sesion.rec"
+    grabar(path, 40)                       # Dos trozos de 16 y uno de 8
+    with open(path, "r+b") as f:
+        f.truncate(os.path.getsize(path) - 3)
+    assert len(leer_sesion(str(path))["t_ns"]) == 32
+
+
+def test_exportar_csv_en_hora_local(tmp_path):
+    path = tmp_path / "sesion.rec"
+    grabar(path, 20)
+    sesion = leer_sesion(str(path))
+    csv = tmp_path / "recorrido.csv"
+    assert exportar_csv(sesion, str(csv)) == 20
+    assert exportar_csv(sesion, str(csv)) == 20
+
+    lineas = csv.read_text().splitlines()
+    assert lineas[0] == "timestamp,dist_frontal,dist_derecho,pwm_izq,pwm_der"
+    assert len(lineas) == 41
+    marca, resto = lineas[1].split(",", 1)
+    # Mismo formato que recorrido_robot.csv: hora local, sin zona, con microsegundos
+    assert len(marca) == 26 and "+" not in marca and not marca.endswith("Z")
+    esperado = datetime.fromtimestamp(int(sesion["t_ns"][0]) // 1000 / 1e6)
+    assert abs((datetime.fromisoformat(marca) - esperado).total_seconds()) < 1e-5
+    assert resto == "0.0,100.0,-128,0"
+
+
+def test_record_despues_de_close_no_hace_nada(tmp_path):
+    path = tmp_path / "sesion.rec"
+    rec = grabar(path, 20)
+    tam = os.path.getsize(path)
+    # Como el lazo de control con una referencia vieja tras on_toggle_rec
+    rec.record(1.0, 2.0, 3, 4)
+    rec.close()
+    assert rec.stats() == {"grabadas": 20, "escritas": 20, "perdidas": 0}
+    assert os.path.getsize(path) == tam
+
+
+def test_close_concurrente_con_record(tmp_path):
+    path = tmp_path / "sesion.rec"
+    rec = SessionRecorder(str(path), filas_por_bloque=16, bloques=64)
+    parar = threading.Event()
+
+    def lazo():
+        k = 0
+        while not parar.is_set():
+            rec.record(k, k, k % 100, -(k % 100))
+            k += 1
+
+    hilo = threading.Thread(target=lazo)
+    hilo.start()
+    while rec.grabadas < 200:
+        time.sleep(0.001)
+    rec.close()
+    parar.set()
+    hilo.join()
+
+    # Todo lo aceptado antes de close() quedó en el archivo, y nada después
+    s = rec.stats()
+    assert s["escritas"] == s["grabadas"]
+    assert len(leer_sesion(str(path))["t_ns"]) == s["grabadas"]
@@ -1,8 +1,13 @@
+import atexit
+import os
 import sys
+import time
 from arduino.app_utils import App, Bridge
 
 from controller import WallFollowerP
+from recorder import Recorder
 from runner import RunPause
+from runtime import ControlRuntime
 from tuner import TwiddleTuner
 
 print("\n\n\n\n\n\n\n\n")
@@ -45,6 +50,10 @@ controller = WallFollowerP(
 runpause = RunPause(run_seconds=10.0, pause_seconds=10.0)
 runpause.start()
 
+DIR_REGISTROS = os.path.join(os.path.dirname(os.path.abspath(__file__)), "registros")
+recorder = Recorder(os.path.join(DIR_REGISTROS, time.strftime("distancias_%Y%m%d_%H%M%S.bin")))
+atexit.register(recorder.close)
+
 _prev_phase = runpause.phase
 _run_started = False
 
@@ -56,6 +65,7 @@ def al_recibir_distancias(dC, dR):
 
     if tuner.finished:
         send_motors(0, 0)
+        recorder.record(dC, dR, 0, 0, "fin")
         best_params, best_cost = tuner.best()
         print("\n=== TERMINADO ===")
         print(f"MEJOR: {label(best_params)} | best_cost={best_cost:.3f}")
@@ -66,6 +76,7 @@ def al_recibir_distancias(dC, dR):
 
     if runpause.phase == "pause":
         send_motors(0, 0)
+        recorder.record(dC, dR, 0, 0, "pausa")
 
         if _prev_phase != "pause":
             if _run_started:
@@ -77,6 +88,7 @@ def al_recibir_distancias(dC, dR):
 
                 controller.reset()
                 print(f"\n[PAUSA {runpause.pause_s:.0f}s] siguiente: {label(tuner.params)}  (sum_deltas={sum(tuner.deltas):.3f})")
+                print(runtime.texto())
                 sys.stdout.flush()
 
         _prev_phase = "pause"
@@ -91,7 +103,16 @@ def al_recibir_distancias(dC, dR):
     pwm_izq, pwm_der, mode, info = controller.step(dC, dR, tuner.params)
     send_motors(pwm_izq, pwm_der)
     tuner.observe(mode, info, pwm_izq, pwm_der)
-
-Bridge.provide("distancias", al_recibir_distancias)
+    recorder.record(dC, dR, pwm_izq, pwm_der, mode)
+
+# Bridge sólo deja la muestra más nueva en el buzón; el control corre en su propio
+# hilo, una vez por muestra. El sketch manda una cada ~150 ms (dos medianas de 3
+# lecturas con delay(10) más dos delay(50)); una muestra que esperó más de medio
+# intervalo se descarta
+PERIODO_SKETCH_S = 0.15
+runtime = ControlRuntime(al_recibir_distancias, periodo=PERIODO_SKETCH_S, max_edad=PERIODO_SKETCH_S / 2)
+runtime.start()
+atexit.register(runtime.stop)
+Bridge.provide("distancias", runtime.recibir)
 
 App.run()
@@ -0,0 +1,101 @@
+"""
+Archivo persistente de RUNs de ajuste (SQLite) con arranque en caliente.
+
+Cada entrada de `history` se guarda con el setpoint, la velocidad base y la
+fecha. Al iniciar una sesión nueva, TwiddleTuner puede partir de los mejores
+vecinos ya explorados para el mismo setpoint y base, con deltas reducidos.
+Los RUN abortados por el modo carrera se guardan marcados (su costo es
+parcial) y no cuentan para mejores() ni warm_start().
+"""
+import json
+import sqlite3
+import time
+
+_COLUMNAS = ("kp", "kd", "corr_max", "zona_muerta")
+
+
+class TuningArchive:
+    def __init__(self, path):
+        self.path = path
+        # El callback de Bridge corre en otro hilo que el que abre el archivo
+        self.db = sqlite3.connect(path, check_same_thread=False)
+        self.db.executescript("""
+            CREATE TABLE IF NOT EXISTS runs (
+                id INTEGER PRIMARY KEY,
+                fecha TEXT NOT NULL,
+                setpoint REAL NOT NULL,
+                base INTEGER NOT NULL,
+                kp REAL, kd REAL, corr_max REAL, zona_muerta REAL,
+                params TEXT NOT NULL,
+                cost REAL, mae REAL, osc REAL, sat REAL, bad INTEGER,
+                abortado INTEGER NOT NULL DEFAULT 0
+            );
+            CREATE INDEX IF NOT EXISTS idx_runs_params ON runs (setpoint, base, kp, kd, corr_max, zona_muerta);
+            CREATE INDEX IF NOT EXISTS idx_runs_cost ON runs (setpoint, base, cost);
+        """)
+        # Archivos creados antes de la columna `abortado`
+        columnas = [fila[1] for fila in self.db.execute("PRAGMA table_info(runs)")]
+        if "abortado" not in columnas:
+            with self.db:
+                self.db.execute("ALTER TABLE runs ADD COLUMN abortado INTEGER NOT NULL DEFAULT 0")
+
+    def agregar(self, entradas, setpoint, fecha=None, abortados=None):
+        """
+        Guarda entradas (params, cost, mae, osc, sat, bad) de history en una
+        transacción. `abortados`: una marca por entrada (TwiddleTuner.abortado()).
+        """
+        fecha = fecha or time.strftime("%Y-%m-%dT%H:%M:%S")
+        if abortados is None:
+            abortados = [False] * len(entradas)
+        filas = []
+        for (params, cost, mae, osc, sat, bad), abortado in zip(entradas, abortados):
+            filas.append((
+                fecha, float(setpoint), int(params["base"]),
+                *(float(params.get(k, 0.0)) for k in _COLUMNAS),
+                json.dumps(params, sort_keys=True),
+                # Se acota el costo para que un inf no domine AVG()
+                min(float(cost), 1e12), float(mae), float(osc), float(sat), int(bad), int(bool(abortado)),
+            ))
+        with self.db:
+            self.db.executemany(
+                "INSERT INTO runs (fecha, setpoint, base, kp, kd, corr_max, zona_muerta, params, cost, mae, osc, sat, bad, abortado) "
+                "VALUES (?, ?, ?, ?, ?, ?, ?, ?, ?, ?, ?, ?, ?, ?)",
+                filas,
+            )
+
+    def mejores(self, setpoint, base, k=5, tol_setpoint=1.0, tol_base=10):
+        """
+        Los k parámetros con menor costo promedio (sobre sus repeticiones) para un
+        setpoint y base cercanos, sin los RUN abortados. Devuelve [(params, costo_promedio, n_runs), ...].
+        """
+        filas = self.db.execute(
+            "SELECT params, AVG(cost) AS c, COUNT(*) FROM runs "
+            "WHERE setpoint BETWEEN ? AND ? AND base BETWEEN ? AND ? AND abortado = 0 "
+            "GROUP BY base, kp, kd, corr_max, zona_muerta "
+            "ORDER BY c ASC LIMIT ?",
+            (setpoint - tol_setpoint, setpoint + tol_setpoint, base - tol_base, base + tol_base, int(k)),
+        ).fetchall()
+        return [(json.loads(p), c, n) for p, c, n in filas]
+
+    def warm_start(self, tuner, setpoint, k=5, encoger=0.5, minimo=0.1):
+        """
+        Siembra el tuner con el mejor vecino archivado. El delta de cada llave es
+        la dispersión de esa llave entre los k mejores, acotada entre
+        minimo*delta y encoger*delta originales. Devuelve False si no hay vecinos.
+        """
+        vecinos = self.mejores(setpoint, int(tuner.base_params["base"]), k)
+        if not vecinos:
+            return False
+
+        base_params = dict(tuner.base_params)
+        base_params.update(vecinos[0][0])
+        deltas = []
+        for key, d in zip(tuner.keys, tuner.deltas):
+            vals = [float(p[key]) for p, _, _ in vecinos if key in p]
+            spread = (max(vals) - min(vals)) if vals else d
+            deltas.append(max(minimo * d, min(encoger * d, spread)))
+        tuner.sembrar(base_params, deltas)
+        return True
+
+    def close(self):
+        self.db.close()
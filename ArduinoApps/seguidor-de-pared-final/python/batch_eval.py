@@ -0,0 +1,312 @@
+"""
+Evaluación vectorizada de candidatos de SweepTuner.
+
+Todos los candidatos (kp, kd, corr_max, zona_muerta, ...) avanzan a la vez como
+arreglos de NumPy, ya sea contra una traza grabada de distancias (lazo
+abierto) o contra el simulador (lazo cerrado, un robot por candidato).
+Cada candidato recibe la misma tupla (cost, mae, osc, sat, bad) que
+SweepTuner._score().
+"""
+import itertools
+import math
+
+import numpy as np
+
+from simulator import subpasos
+
+# Pesos de SweepTuner._score(): cost = mae + 2*osc + 10*sat + 50*bad
+PESOS_SWEEP = (2.0, 10.0, 50.0)
+
+_CLAVES = ("base", "kp", "kd", "corr_max", "zona_muerta", "obst_izq", "obst_der", "busc_izq", "busc_der")
+_DEFAULTS = {"kd": 0.0, "obst_izq": -80, "obst_der": 80, "busc_izq": 140, "busc_der": 80}
+
+
+def grid(base_params, **ejes):
+    """Producto cartesiano de valores sobre base_params, listo para SweepTuner."""
+    claves = list(ejes)
+    candidatos = []
+    for valores in itertools.product(*(ejes[k] for k in claves)):
+        p = dict(base_params)
+        p.update(zip(claves, valores))
+        candidatos.append(p)
+    return candidatos
+
+
+def _columnas(candidatos):
+    """Convierte la lista de dicts en columnas con las mismas conversiones que step()."""
+    cols = {}
+    for k in _CLAVES:
+        vals = [p.get(k, _DEFAULTS.get(k)) for p in candidatos]
+        if k in ("kp", "kd", "zona_muerta"):
+            cols[k] = np.array(vals, dtype=np.float64)
+        else:
+            cols[k] = np.array([int(v) for v in vals], dtype=np.int64)
+    return cols
+
+
+def _pwm_ok(cols, error, derivative):
+    """Ley PD de WallFollowerP.step() para todos los candidatos a la vez."""
+    ajuste = np.trunc(cols["kp"] * error + cols["kd"] * derivative).astype(np.int64)
+    ajuste = np.clip(ajuste, -cols["corr_max"], cols["corr_max"])
+    ajuste = np.where(np.abs(error) <= cols["zona_muerta"], 0, ajuste)
+    pwm_izq = np.clip(cols["base"] + ajuste, 0, 255)
+    pwm_der = np.clip(cols["base"] - ajuste, 0, 255)
+    return pwm_izq, pwm_der
+
+
+def _saturado(pwm_izq, pwm_der):
+    return (pwm_izq <= 5) | (pwm_izq >= 250) | (pwm_der <= 5) | (pwm_der >= 250)
+
+
+def _score(sum_abs_e, sum_abs_de, sat, n, bad, pesos):
+    """Versión vectorizada de SweepTuner._score(); devuelve un arreglo (N, 5)."""
+    w_osc, w_sat, w_bad = pesos
+    n_safe = np.maximum(n, 1)
+    mae = sum_abs_e / n_safe
+    osc = sum_abs_de / n_safe
+    sat_r = sat / n_safe
+    cost = mae + w_osc * osc + w_sat * sat_r + w_bad * bad
+    vacio = n == 0
+    out = np.column_stack([cost, mae, osc, sat_r, bad.astype(np.float64)])
+    out[vacio, 0:3] = 1e9
+    out[vacio, 3] = 1.0
+    return out
+
+
+def evaluar_traza(candidatos, dC, dR, controller, pesos=PESOS_SWEEP, bloque=512):
+    """
+    Evalúa candidatos contra una traza grabada (lazo abierto).
+
+    Como la traza no reacciona a los motores, el filtro, el error y la derivada
+    son idénticos para todos los candidatos: se calculan una sola vez y sólo la
+    ley PD (y por tanto la saturación) se evalúa como matriz candidatos x muestras.
+    """
+    cols = _columnas(candidatos)
+    N = len(candidatos)
+    dC = np.asarray(dC, dtype=np.float64)
+    dR = np.asarray(dR, dtype=np.float64)
+
+    # Pasada única con la misma lógica de estado que WallFollowerP.step()
+    alpha = controller.alpha
+    ok = np.zeros(len(dC), dtype=bool)
+    err = np.zeros(len(dC))
+    der = np.zeros(len(dC))
+    dR_f = None
+    prev = None
+    for t in range(len(dC)):
+        if dC[t] <= controller.obst:
+            continue
+        if dR[t] >= controller.sin_pared:
+            prev = None
+            continue
+        if dR_f is None:
+            dR_f = dR[t]
+        dR_f = alpha * dR_f + (1.0 - alpha) * dR[t]
+        e = dR_f - controller.setpoint
+        if prev is None:
+            prev = e
+        ok[t] = True
+        err[t] = e
+        der[t] = e - prev
+        prev = e
+
+    e_ok = err[ok]
+    d_ok = der[ok]
+    n = np.full(N, len(e_ok), dtype=np.int64)
+    bad = np.full(N, int((~ok).sum()), dtype=np.int64)
+    sum_abs_e = np.full(N, np.abs(e_ok).sum())
+    sum_abs_de = np.full(N, np.abs(np.diff(e_ok)).sum())
+
+    sat = np.zeros(N, dtype=np.int64)
+    c2 = {k: v[:, None] for k, v in cols.items()}
+    for i in range(0, len(e_ok), bloque):
+        pi, pd = _pwm_ok(c2, e_ok[None, i:i + bloque], d_ok[None, i:i + bloque])
+        sat += _saturado(pi, pd).sum(axis=1)
+
+    return _score(sum_abs_e, sum_abs_de, sat, n, bad, pesos)
+
+
+class _SimLote:
+    """RobotSim replicado N veces; reutiliza la pista y constantes de un RobotSim."""
+
+    def __init__(self, sim, n):
+        self.sim = sim
+        self.n = n
+        self.seg = np.array(sim.pista.segmentos, dtype=np.float64)
+
+    def reset(self, x, y, theta):
+        n = self.n
+        self.x = np.full(n, x)
+        self.y = np.full(n, y)
+        self.theta = np.full(n, theta)
+        self.v_izq = np.zeros(n)
+        self.v_der = np.zeros(n)
+        self.choque = np.zeros(n, dtype=bool)
+
+    def _rayo(self, ox, oy, ang):
+        dx = np.cos(ang)
+        dy = np.sin(ang)
+        mejor_t = np.full(self.n, np.inf)
+        mejor_cos = np.zeros(self.n)
+        for x1, y1, x2, y2 in self.seg:
+            sx = x2 - x1
+            sy = y2 - y1
+            den = dx * sy - dy * sx
+            with np.errstate(divide="ignore", invalid="ignore"):
+                qx = x1 - ox
+                qy = y1 - oy
+                t = (qx * sy - qy * sx) / den
+                u = (qx * dy - qy * dx) / den
+            hit = (den != 0.0) & (t > 0.0) & (u >= 0.0) & (u <= 1.0) & (t < mejor_t)
+            mejor_t = np.where(hit, t, mejor_t)
+            mejor_cos = np.where(hit, np.abs(den) / math.hypot(sx, sy), mejor_cos)
+        sin_eco = ~np.isfinite(mejor_t) | (mejor_cos < self.sim.cos_max) | (mejor_t > self.sim.alcance)
+        return mejor_t, sin_eco
+
+    def _medir(self, ox, oy, ang, z, u):
+        # Números aleatorios comunes: todos los candidatos ven el mismo ruido
+        s = self.sim
+        d, sin_eco = self._rayo(ox, oy, ang)
+        d = np.where(sin_eco, 0.0, d)
+        d = np.maximum(2.0, d + z * (s.ruido_base + s.ruido_rel * d))
+        return np.where(sin_eco | (u < s.prob_sin_eco), s.sin_eco, d)
+
+    def leer_sensores(self, rng):
+        s = self.sim
+        z = rng.standard_normal(2)
+        u = rng.random(2)
+        c = np.cos(self.theta)
+        sn = np.sin(self.theta)
+        dC = self._medir(self.x + s.off_f * c, self.y + s.off_f * sn, self.theta, z[0], u[0])
+        dR = self._medir(self.x + s.off_r * sn, self.y - s.off_r * c, self.theta - math.pi / 2, z[1], u[1])
+        return dC, dR
+
+    def _vel_objetivo(self, pwm):
+        s = self.sim
+        pwm = np.clip(pwm, -255, 255).astype(np.float64)
+        mag = np.maximum(np.abs(pwm) - s.pwm_muerto, 0.0)
+        return np.sign(pwm) * mag * s.k_vel
+
+    def aplicar(self, pwm_izq, pwm_der):
+        # Mismos subpasos que RobotSim.aplicar()
+        s = self.sim
+        n = subpasos(s.periodo)
+        h = s.periodo / n
+        a = 1.0 - math.exp(-h / s.tau)
+        obj_izq = self._vel_objetivo(pwm_izq)
+        obj_der = self._vel_objetivo(pwm_der)
+        for _ in range(n):
+            self.v_izq += (obj_izq - self.v_izq) * a
+            self.v_der += (obj_der - self.v_der) * a
+            mueve = ~self.choque
+            v = 0.5 * (self.v_izq + self.v_der) * mueve
+            w = (self.v_der - self.v_izq) / s.ancho_ejes * mueve
+            self.x += v * np.cos(self.theta) * h
+            self.y += v * np.sin(self.theta) * h
+            self.theta += w * h
+
+            dmin = np.full(self.n, np.inf)
+            for x1, y1, x2, y2 in self.seg:
+                sx = x2 - x1
+                sy = y2 - y1
+                u = np.clip(((self.x - x1) * sx + (self.y - y1) * sy) / (sx * sx + sy * sy), 0.0, 1.0)
+                dmin = np.minimum(dmin, np.hypot(self.x - (x1 + u * sx), self.y - (y1 + u * sy)))
+            nuevo = mueve & (dmin < s.radio)
+            self.choque |= nuevo
+            self.v_izq[nuevo] = 0.0
+            self.v_der[nuevo] = 0.0
+
+
+def evaluar_simulado(candidatos, sim, controller, segundos=6.0, episodios=1, pesos=PESOS_SWEEP, semilla=None):
+    """
+    Evalúa candidatos en lazo cerrado: un robot simulado por candidato.
+
+    Cada episodio parte de la misma pose aleatoria para todos los candidatos y
+    usa el mismo ruido de sensores, así las diferencias de costo se deben sólo
+    a los parámetros. Con varios episodios se promedian las tuplas, igual que
+    las repeticiones de TwiddleTuner.
+    """
+    cols = _columnas(candidatos)
+    N = len(candidatos)
+    rng = np.random.default_rng(semilla)
+    lote = _SimLote(sim, N)
+    alpha = controller.alpha
+    pasos = int(round(segundos / sim.periodo))
+    total = np.zeros((N, 5))
+
+    for _ in range(episodios):
+        sim.reset_aleatorio(controller.setpoint)
+        lote.reset(sim.x, sim.y, sim.theta)
+
+        dR_f = np.full(N, np.nan)
+        prev_error = np.full(N, np.nan)
+        prev_e = np.full(N, np.nan)
+        sum_abs_e = np.zeros(N)
+        sum_abs_de = np.zeros(N)
+        sat = np.zeros(N, dtype=np.int64)
+        n = np.zeros(N, dtype=np.int64)
+        bad = np.zeros(N, dtype=np.int64)
+
+        for _ in range(pasos):
+            dC, dR = lote.leer_sensores(rng)
+
+            # --- WallFollowerP.step() ---
+            obst = dC <= controller.obst
+            busc = ~obst & (dR >= controller.sin_pared)
+            ok = ~obst & ~busc
+            prev_error[busc] = np.nan
+
+            dR_f = np.where(ok & np.isnan(dR_f), dR, dR_f)
+            dR_f = np.where(ok, alpha * dR_f + (1.0 - alpha) * dR, dR_f)
+            error = dR_f - controller.setpoint
+            derivative = error - np.where(np.isnan(prev_error), error, prev_error)
+            prev_error = np.where(ok, error, prev_error)
+
+            pi, pd = _pwm_ok(cols, np.where(ok, error, 0.0), np.where(ok, derivative, 0.0))
+            pwm_izq = np.select([obst, busc], [cols["obst_izq"], cols["busc_izq"]], pi)
+            pwm_der = np.select([obst, busc], [cols["obst_der"], cols["busc_der"]], pd)
+
+            # --- SweepTuner.observe() ---
+            bad += ~ok
+            n += ok
+            sum_abs_e += np.where(ok, np.abs(error), 0.0)
+            sum_abs_de += np.where(ok & ~np.isnan(prev_e), np.abs(error - prev_e), 0.0)
+            prev_e = np.where(ok, error, prev_e)
+            sat += ok & _saturado(pwm_izq, pwm_der)
+
+            lote.aplicar(pwm_izq, pwm_der)
+
+        total += _score(sum_abs_e, sum_abs_de, sat, n, bad, pesos)
+
+    return total / episodios
+
+
+if __name__ == "__main__":
+    import time
+    from controller import WallFollowerP
+    from simulator import RobotSim
+
+    base_params = {
+        "base": 150, "kp": 1.5, "kd": 10.0, "corr_max": 100, "zona_muerta": 1.0,
+        "obst_izq": -80, "obst_der": 80, "busc_izq": 140, "busc_der": 80,
+    }
+    candidatos = grid(
+        base_params,
+        kp=np.linspace(0.5, 15.0, 16),
+        kd=np.linspace(0.0, 60.0, 13),
+        corr_max=(20, 60, 100, 150),
+        zona_muerta=(0.0, 1.0, 2.0),
+    )
+    controller = WallFollowerP(setpoint_derecha=15.0, distancia_obstaculo=15.0)
+    sim = RobotSim(sin_eco=400.0, semilla=1)
+
+    t0 = time.perf_counter()
+    res = evaluar_simulado(candidatos, sim, controller, segundos=6.0, episodios=2, semilla=1)
+    dt = time.perf_counter() - t0
+    print(f"{len(candidatos)} candidatos x 2 episodios en {dt:.2f}s")
+
+    for i in np.argsort(res[:, 0])[:5]:
+        p = candidatos[i]
+        cost, mae, osc, sat, bad = res[i]
+        print(f"kp={p['kp']:.2f} kd={p['kd']:.1f} corr={p['corr_max']} zona={p['zona_muerta']:.1f} | "
+              f"costo={cost:.3f} mae={mae:.2f} osc={osc:.2f} sat={sat:.2f} bad={bad:.0f}")
@@ -0,0 +1,108 @@
+"""
+Micro-benchmark del paso del controlador.
+
+Mide el costo por llamada de WallFollowerP.step() con el dict de parámetros
+(conversión en cada paso), con PDParams ya convertido y con la ley tabulada
+de WallFollowerLUT (más su informe de precisión), sobre una traza del
+simulador. step() pasa por la máquina de estados (guardas y contabilidad de
+tiempos) antes de la acción del modo; la máquina se mide también sola, con
+acciones vacías, con la tabla del seguidor y con estados extra. Por último,
+el costo por ciclo de WallFollowerMPC (p50/p99 contra su presupuesto y la
+muestra de ~150 ms del sketch); conviene correrlo en la placa.
+"""
+import time
+
+from controller import TRANSICIONES, PDParams, WallFollowerP
+from mpc import WallFollowerMPC
+from simulator import RobotSim
+from statemachine import StateMachine
+
+PARAMS = {
+    "base": 150, "kp": 1.5, "kd": 10.0, "corr_max": 100, "zona_muerta": 1.0,
+    "obst_izq": -80, "obst_der": 80, "busc_izq": 140, "busc_der": 80,
+}
+
+
+def traza(n=5000, semilla=1):
+    sim = RobotSim(sin_eco=400.0, semilla=semilla)
+    ctrl = WallFollowerP(distancia_obstaculo=15.0)
+    sim.reset_aleatorio()
+    muestras = []
+    for _ in range(n):
+        dC, dR = sim.leer_sensores()
+        muestras.append((dC, dR))
+        pwm_izq, pwm_der, _, _ = ctrl.step(dC, dR, PARAMS)
+        sim.aplicar(pwm_izq, pwm_der)
+        if sim.choque:
+            sim.reset_aleatorio()
+    return muestras
+
+
+def medir(ctrl, params, muestras, repeticiones=20):
+    """Mejor tiempo por paso (µs) entre varias pasadas completas por la traza."""
+    mejor = float("inf")
+    step = ctrl.step
+    for _ in range(repeticiones):
+        ctrl.reset()
+        t0 = time.perf_counter()
+        for dC, dR in muestras:
+            step(dC, dR, params)
+        mejor = min(mejor, time.perf_counter() - t0)
+    return mejor / len(muestras) * 1e6
+
+
+def maquina(extra=0):
+    """Tabla del seguidor más `extra` estados con sus propias salidas (p. ej. giros en esquina)."""
+    nada = lambda dC, dR, ctx: None
+    estados = {"ok": nada, "obst": nada, "buscar": nada}
+    transiciones = list(TRANSICIONES)
+    for i in range(extra):
+        estados[f"e{i}"] = nada
+        transiciones.insert(0, (f"e{i}", ("t", ">=", 0.5), "ok"))
+    return StateMachine(estados, transiciones, umbrales={"obst": 15.0, "sin_pared": 300.0}, inicial="ok")
+
+
+def medir_ciclos(ctrl, params, muestras):
+    """Tiempos por ciclo (s) ordenados de una pasada por la traza."""
+    ctrl.reset()
+    tiempos = []
+    for dC, dR in muestras:
+        t0 = time.perf_counter()
+        ctrl.step(dC, dR, params)
+        tiempos.append(time.perf_counter() - t0)
+    tiempos.sort()
+    return tiempos
+
+
+if __name__ == "__main__":
+    muestras = traza()
+    ctrl = WallFollowerP(distancia_obstaculo=15.0)
+
+    t_dict = medir(ctrl, PARAMS, muestras)
+    t_bound = medir(ctrl, PDParams(PARAMS), muestras)
+
+    print(f"step(dict)      : {t_dict:6.2f} µs/paso")
+    print(f"step(PDParams)  : {t_bound:6.2f} µs/paso  ({t_dict / t_bound:.1f}x)")
+
+    t0 = time.perf_counter()
+    lut = ctrl.compilar(PARAMS)
+    t_compilar = time.perf_counter() - t0
+    t_lut = medir(lut, None, muestras)
+    informe = lut.informe_precision(muestras)
+    print(f"LUT             : {t_lut:6.2f} µs/paso  ({t_bound / t_lut:.2f}x de PDParams) | "
+          f"{informe['celdas']} celdas en {t_compilar * 1e3:.0f} ms")
+    print(f"  precisión: {informe['exactas']:.1%} exactas, dif media {informe['dif_media_pwm']:.2f} PWM, "
+          f"máx {informe['dif_max_pwm']} PWM, derivada fuera de tabla {informe['derivada_fuera_de_tabla']}, "
+          f"borde de zona muerta {informe['borde_zona_muerta']}")
+
+    t_fsm = medir(maquina(), None, muestras)
+    t_fsm_10 = medir(maquina(extra=10), None, muestras)
+    print(f"máquina (3 est.): {t_fsm:6.2f} µs/paso")
+    print(f"máquina (13 est.): {t_fsm_10:6.2f} µs/paso")
+
+    mpc = WallFollowerMPC(distancia_obstaculo=15.0)
+    tiempos = medir_ciclos(mpc, PDParams(PARAMS), muestras)
+    p50 = tiempos[len(tiempos) // 2] * 1e3
+    p99 = tiempos[int(len(tiempos) * 0.99)] * 1e3
+    print(f"MPC ({mpc.niveles ** 2} secuencias x {mpc.horizonte} pasos): p50={p50:.2f} ms p99={p99:.2f} ms "
+          f"max={tiempos[-1] * 1e3:.2f} ms | presupuesto={mpc.presupuesto * 1e3:.0f} ms | {mpc.texto()}")
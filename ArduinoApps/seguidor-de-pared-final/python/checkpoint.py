@@ -0,0 +1,148 @@
+"""
+Checkpoint a prueba de cortes para TwiddleTuner.
+
+Tras cada end_run() se agrega una línea JSON a un archivo write-ahead con el
+estado de la búsqueda y las entradas nuevas de `history`. Cada tantas líneas
+el log se compacta en una instantánea que se reemplaza de forma atómica
+(archivo temporal + fsync + os.replace). Al arrancar se carga la instantánea
+y se reaplican las líneas completas del log; una línea cortada se ignora.
+
+Cada línea lleva un número de secuencia (`seq`) y la posición de sus
+entradas en `history` (`desde`); la instantánea guarda el `seq` de la última
+línea que incluye. Si el corte llega después de os.replace() pero antes de
+vaciar el log, las líneas viejas ya cubiertas se saltan en vez de duplicar
+el historial.
+"""
+import json
+import os
+
+
+class TunerCheckpoint:
+    def __init__(self, path, fsync_cada=1, compactar_cada=50):
+        self.path = path                        # instantánea
+        self.wal = path + ".wal"                # log de cambios
+        self.fsync_cada = max(1, int(fsync_cada))
+        self.compactar_cada = max(1, int(compactar_cada))
+        os.makedirs(os.path.dirname(os.path.abspath(path)), exist_ok=True)
+        self._f = None
+        self._pendientes = 0
+        self._lineas = 0
+        self._hist_guardado = 0
+        self._seq = 0                           # última línea escrita
+
+    # --- Escritura ---
+
+    def guardar(self, tuner):
+        """Registra el estado tras end_run(); se llama una vez por RUN."""
+        if self._f is None:
+            self._f = open(self.wal, "a", encoding="utf-8")
+        if len(tuner.history) < self._hist_guardado:
+            self._hist_guardado = 0             # el tuner se reinició con start()
+        nuevas = tuner.history[self._hist_guardado:]
+        self._seq += 1
+        linea = json.dumps(
+            {"seq": self._seq, "desde": self._hist_guardado, "estado": tuner.estado(), "hist": nuevas},
+            separators=(",", ":"),
+        )
+        self._f.write(linea + "\n")
+        self._hist_guardado = len(tuner.history)
+        self._lineas += 1
+        self._pendientes += 1
+
+        if self._pendientes >= self.fsync_cada:
+            self.sync()
+        if self._lineas >= self.compactar_cada:
+            self.compactar(tuner)
+
+    def sync(self):
+        if self._f is not None and self._pendientes:
+            self._f.flush()
+            os.fsync(self._f.fileno())
+            self._pendientes = 0
+
+    def compactar(self, tuner):
+        """Escribe la instantánea completa de forma atómica y vacía el log."""
+        tmp = self.path + ".tmp"
+        with open(tmp, "w", encoding="utf-8") as f:
+            json.dump({"seq": self._seq, "estado": tuner.estado(), "hist": tuner.history}, f, separators=(",", ":"))
+            f.flush()
+            os.fsync(f.fileno())
+        os.replace(tmp, self.path)
+        self._fsync_dir()
+
+        if self._f is not None:
+            self._f.close()
+        self._f = open(self.wal, "w", encoding="utf-8")
+        self._f.flush()
+        os.fsync(self._f.fileno())
+        self._pendientes = 0
+        self._lineas = 0
+        self._hist_guardado = len(tuner.history)
+
+    def _fsync_dir(self):
+        try:
+            fd = os.open(os.path.dirname(os.path.abspath(self.path)), os.O_RDONLY)
+        except OSError:
+            return
+        try:
+            os.fsync(fd)
+        except OSError:
+            pass
+        finally:
+            os.close(fd)
+
+    def close(self):
+        self.sync()
+        if self._f is not None:
+            self._f.close()
+            self._f = None
+
+    # --- Recuperación ---
+
+    def cargar(self, tuner):
+        """Reanuda el tuner desde disco. Devuelve False si no hay nada guardado."""
+        estado = None
+        history = []
+        seq = 0
+        if os.path.exists(self.path):
+            with open(self.path, encoding="utf-8") as f:
+                snap = json.load(f)
+            estado = snap["estado"]
+            history = list(snap["hist"])
+            seq = snap.get("seq", 0)
+
+        if os.path.exists(self.wal):
+            with open(self.wal, encoding="utf-8") as f:
+                for linea in f:
+                    if not linea.endswith("\n"):
+                        break                   # escritura interrumpida
+                    try:
+                        reg = json.loads(linea)
+                    except ValueError:
+                        break
+                    if "seq" in reg:
+                        if reg["seq"] <= seq:
+                            continue            # ya está en la instantánea
+                        seq = reg["seq"]
+                        # `desde` < len(history) sólo si el tuner se reinició con start()
+                        del history[reg["desde"]:]
+                    estado = reg["estado"]
+                    history.extend(reg["hist"])
+
+        if estado is None:
+            return False
+        tuner.cargar_estado(estado, history)
+        self._seq = seq
+        # Se compacta de inmediato para partir de un log limpio
+        self.compactar(tuner)
+        return True
+
+    def borrar(self):
+        """Descarta el checkpoint para empezar una sesión nueva."""
+        self.close()
+        for p in (self.path, self.wal, self.path + ".tmp"):
+            if os.path.exists(p):
+                os.remove(p)
+        self._hist_guardado = 0
+        self._lineas = 0
+        self._seq = 0
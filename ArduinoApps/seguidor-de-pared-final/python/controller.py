@@ -1,3 +1,33 @@
+import numpy as np
+
+from statemachine import StateMachine
+
+# Modos del seguidor; se evalúan en orden y gana la primera guarda que se cumple
+TRANSICIONES = (
+    ("*", ("dC", "<=", "obst"), "obst"),
+    ("*", ("dR", ">=", "sin_pared"), "buscar"),
+    ("*", None, "ok"),
+)
+
+
+class PDParams:
+    """Parámetros de WallFollowerP convertidos una sola vez por RUN."""
+
+    __slots__ = ("base", "kp", "kd", "corr_max", "zona_muerta", "obst_izq", "obst_der", "busc_izq", "busc_der")
+
+    def __init__(self, params):
+        self.base = int(params["base"])
+        self.kp = float(params["kp"])
+        self.kd = float(params.get("kd", 0.0))
+        self.corr_max = int(params["corr_max"])
+        self.zona_muerta = float(params["zona_muerta"])
+
+        self.obst_izq = int(params.get("obst_izq", -80))
+        self.obst_der = int(params.get("obst_der", 80))
+        self.busc_izq = int(params.get("busc_izq", 140))
+        self.busc_der = int(params.get("busc_der", 80))
+
+
 class WallFollowerP:
     def __init__(self, setpoint_derecha=15.0, distancia_obstaculo=20.0, sin_pared_umbral=300.0, filtro_alpha=0.7):
         self.setpoint = float(setpoint_derecha)
@@ -6,6 +36,12 @@ class WallFollowerP:
         self.alpha = float(filtro_alpha)
         self.dR_f = None
         self.prev_error = None
+        self.fsm = StateMachine(
+            {"ok": self._seguir, "obst": self._obstaculo, "buscar": self._buscar},
+            TRANSICIONES,
+            umbrales={"obst": self.obst, "sin_pared": self.sin_pared},
+            inicial="ok",
+        )
 
     @staticmethod
     def clip(x, lo, hi):
@@ -14,26 +50,23 @@ class WallFollowerP:
     def reset(self):
         self.dR_f = None
         self.prev_error = None
+        self.fsm.reset()
 
     def step(self, dC, dR, params):
-        base = int(params["base"])
-        kp = float(params["kp"])
-        kd = float(params.get("kd", 0.0))
-        corr_max = int(params["corr_max"])
-        zona = float(params["zona_muerta"])
+        # Acepta el dict de parámetros o, mejor, un PDParams ya convertido
+        p = params if params.__class__ is PDParams else PDParams(params)
+        return self.fsm.step(dC, dR, p)
 
-        obst_izq = int(params.get("obst_izq", -80))
-        obst_der = int(params.get("obst_der", 80))
-        busc_izq = int(params.get("busc_izq", 140))
-        busc_der = int(params.get("busc_der", 80))
+    # --- Acciones de los estados ---
 
-        if dC <= self.obst:
-            return obst_izq, obst_der, "obst", None
+    def _obstaculo(self, dC, dR, p):
+        return p.obst_izq, p.obst_der, "obst", None
 
-        if dR >= self.sin_pared:
-            self.prev_error = None 
-            return busc_izq, busc_der, "buscar", None
+    def _buscar(self, dC, dR, p):
+        self.prev_error = None
+        return p.busc_izq, p.busc_der, "buscar", None
 
+    def _seguir(self, dC, dR, p):
         if self.dR_f is None:
             self.dR_f = dR
         self.dR_f = self.alpha * self.dR_f + (1.0 - self.alpha) * dR
@@ -46,13 +79,186 @@ class WallFollowerP:
         derivative = error - self.prev_error
         self.prev_error = error
 
-        if abs(error) <= zona:
+        if abs(error) <= p.zona_muerta:
             ajuste = 0
         else:
-            ajuste = int(kp * error + kd * derivative)
-            ajuste = self.clip(ajuste, -corr_max, corr_max)
+            ajuste = int(p.kp * error + p.kd * derivative)
+            if ajuste > p.corr_max: ajuste = p.corr_max
+            elif ajuste < -p.corr_max: ajuste = -p.corr_max
+
+        # Todo es int a partir de aquí: recorte en línea sin llamadas a clip()
+        pwm_izq = p.base + ajuste
+        pwm_der = p.base - ajuste
+        if pwm_izq > 255: pwm_izq = 255
+        elif pwm_izq < 0: pwm_izq = 0
+        if pwm_der > 255: pwm_der = 255
+        elif pwm_der < 0: pwm_der = 0
+
+        return pwm_izq, pwm_der, "ok", (self.dR_f, error, derivative, ajuste)
+
+    def compilar(self, params, **kwargs):
+        """Copia de este controlador con la ley PD tabulada para `params` (dict o PDParams)."""
+        return WallFollowerLUT(self, params, **kwargs)
+
+
+class WallFollowerLUT(WallFollowerP):
+    """
+    WallFollowerP con la ley PD tabulada para parámetros fijos.
 
-        pwm_izq = int(self.clip(base + ajuste, 0, 255))
-        pwm_der = int(self.clip(base - ajuste, 0, 255))
+    En el modo "ok" el estado es entero: dR entra al filtro exponencial en
+    punto fijo (unidades de `fino` cm, alpha como A / 2**BITS_FILTRO) y la
+    derivada es la resta de dos estados. El estado y el salto indexan listas
+    con la fila y la columna de la celda (error, derivada) y los valores de
+    `info`; la celda da (pwm_izq, pwm_der, ajuste) ya recortados. Sólo queda
+    una multiplicación de punto flotante para cuantizar la entrada. La zona
+    muerta se decide con el error fino, no por celda.
+
+    dC sólo decide el modo, así que no necesita eje: las guardas de la
+    máquina de estados se evalúan igual que en WallFollowerP, pero el paso
+    completo corre en una sola clausura sin llamar a la acción del estado.
+
+    La tabla se arma con NumPy al compilar. Fuera de [-der_max, der_max] la
+    derivada se recorta; der_max es el salto máximo del filtro o, si es
+    menor, la derivada desde la que la salida satura para cualquier error, así
+    que el recorte no cambia el resultado. Las celdas de derivada son más finas
+    que las de error porque kd suele ser varias veces kp.
+    """
+
+    SUBDIVISION = 16      # unidades del estado por celda más chica
+    BITS_FILTRO = 12
+
+    def __init__(self, base, params, paso_error=0.5, paso_der=0.125):
+        super().__init__(base.setpoint, base.obst, base.sin_pared, base.alpha)
+        p = params if params.__class__ is PDParams else PDParams(params)
+        self.params = p
+        self.paso_error = float(paso_error)
+        self.paso_der = float(paso_der)
+        fino = min(self.paso_error, self.paso_der) / self.SUBDIVISION   # cm por unidad del estado
+        self._escala = 1.0 / fino
+        self._max_fino = int(self.sin_pared * self._escala)
+        self._a = round(self.alpha * (1 << self.BITS_FILTRO))
+
+        # Filas: error de cada celda de dR_f en [0, sin_pared]
+        e = np.arange(int(self.sin_pared / self.paso_error) + 2) * self.paso_error - self.setpoint
+        der_max = (1.0 - self.alpha) * self.sin_pared
+        if p.kd > 0.0:
+            der_max = min(der_max, (p.corr_max + p.kp * np.abs(e).max()) / p.kd)
+        else:
+            der_max = 0.0
+        self.nd = int(der_max / self.paso_der) + 1
+        d = np.arange(-self.nd, self.nd + 1) * self.paso_der
+
+        # Misma ley que _seguir(): int() trunca hacia cero. La última fila es la zona muerta
+        aj = np.clip(np.trunc(p.kp * e[:, None] + p.kd * d[None, :]), -p.corr_max, p.corr_max)
+        aj = np.vstack([aj, np.zeros((1, aj.shape[1]))])
+        self.celdas = aj.size
+        salidas = [
+            (max(0, min(255, p.base + a)), max(0, min(255, p.base - a)), a)
+            for a in range(-p.corr_max, p.corr_max + 1)
+        ]
+        # Las celdas comparten las tuplas de salida: la lista sólo guarda referencias
+        self._tabla = [salidas[k] for k in (aj.astype(np.int64) + p.corr_max).ravel().tolist()]
+
+        # Por estado del filtro: (desplazamiento de la fila, dR_f, error)
+        ancho = 2 * self.nd + 1
+        v = np.arange(self._max_fino + 1) * fino
+        error = v - self.setpoint
+        fila = np.where(np.abs(error) <= p.zona_muerta, len(e), np.round(v / self.paso_error).astype(np.int64))
+        self._filas = list(zip((fila * ancho).tolist(), v.tolist(), error.tolist()))
+        # Por salto del estado (desde -max_fino): (columna, derivada)
+        salto = np.arange(-self._max_fino, self._max_fino + 1) * fino
+        columna = np.clip(np.round(salto / self.paso_der).astype(np.int64), -self.nd, self.nd) + self.nd
+        self._columnas = list(zip(columna.tolist(), salto.tolist()))
+        self._compilar_paso()
+
+    def _compilar_paso(self):
+        """step() como clausura: constantes y estado en variables locales en lugar de atributos."""
+        m = self.fsm
+        guardas, ciclos, entrar = m._guardas, m.ciclos, m.entrar
+        p = self.params
+        obst = (p.obst_izq, p.obst_der, "obst", None)
+        buscar = (p.busc_izq, p.busc_der, "buscar", None)
+        tabla, filas, columnas = self._tabla, self._filas, self._columnas
+        escala = self._escala
+        bits, a = self.BITS_FILTRO, self._a
+        # b * r + redondeo con r = dR * escala, en una sola multiplicación
+        kb = ((1 << bits) - a) * escala
+        kr = 1 << (bits - 1)
+        off = self._max_fino
+        actual = m.actual
+        f = previo = None
+
+        def step(dC, dR, params=None):
+            nonlocal actual, f, previo
+            s = guardas[actual](dC, dR, m)
+            if s != actual:
+                entrar(s)
+                actual = s
+            ciclos[s] += 1
+            if s == 1:
+                return obst
+            if s == 2:
+                previo = None
+                return buscar
+
+            # En "ok" la guarda ya garantiza dR < sin_pared
+            if dR < 0.0: dR = 0.0
+            if f is None:
+                f = int(dR * escala + 0.5)
+            f = (a * f + int(dR * kb + kr)) >> bits
+            fila, dR_f, error = filas[f]
+            col, derivative = columnas[off if previo is None else f - previo + off]
+            previo = f
+            pwm_izq, pwm_der, ajuste = tabla[fila + col]
+            return pwm_izq, pwm_der, "ok", (dR_f, error, derivative, ajuste)
+
+        self.step = step
+
+    def reset(self):
+        # reset() de la máquina reemplaza sus listas de contadores: se vuelve a compilar el paso
+        self.fsm.reset()
+        self._compilar_paso()
 
-        return pwm_izq, pwm_der, "ok", (self.dR_f, error, derivative, ajuste)
\ No newline at end of file
+    def informe_precision(self, muestras):
+        """
+        Compara con WallFollowerP sobre una traza [(dC, dR), ...] recorrida por
+        ambos desde reset(): mismas entradas, cada uno con su propio estado.
+        Cuenta también los pasos con la derivada fuera de la tabla (ahí la
+        salida ya satura) y da la cota de la cuantización: media celda de
+        error y de derivada por sus ganancias, más 1 por el truncado de int().
+        Los pasos en que el error cae a distinto lado del borde de la zona
+        muerta (el filtro entero difiere del exacto en menos de una unidad
+        fina) se cuentan aparte y no entran en la cota.
+        """
+        exacto = WallFollowerP(self.setpoint, self.obst, self.sin_pared, self.alpha)
+        self.reset()
+        iguales = modos = fuera = borde = n = 0
+        max_dif = suma_dif = 0
+        d_max = self.nd * self.paso_der
+        zona = self.params.zona_muerta
+        for dC, dR in muestras:
+            izq, der, modo, info = self.step(dC, dR)
+            izq_e, der_e, modo_e, info_e = exacto.step(dC, dR, self.params)
+            n += 1
+            modos += modo == modo_e
+            if info_e is not None and abs(info_e[2]) > d_max:
+                fuera += 1
+            if info is not None and info_e is not None and (abs(info[1]) <= zona) != (abs(info_e[1]) <= zona):
+                borde += 1
+                continue
+            dif = max(abs(izq - izq_e), abs(der - der_e))
+            iguales += dif == 0
+            suma_dif += dif
+            max_dif = max(max_dif, dif)
+        self.reset()
+        return {
+            "celdas": self.celdas,
+            "muestras": n,
+            "exactas": iguales / n if n else 1.0,
+            "mismo_modo": modos / n if n else 1.0,
+            "dif_media_pwm": suma_dif / (n - borde) if n > borde else 0.0,
+            "dif_max_pwm": max_dif,
+            "derivada_fuera_de_tabla": fuera,
+            "borde_zona_muerta": borde,
+            "cota_pwm": (self.params.kp * self.paso_error + self.params.kd * self.paso_der) / 2.0 + 1.0,
+        }
@@ -0,0 +1,135 @@
+"""
+Instrumentación de latencia y jitter del lazo de control.
+
+Histogramas en streaming con cubetas logarítmicas fijas (memoria constante)
+para el intervalo entre notificaciones `distancias`, el tiempo del handler y
+la latencia sensor -> Bridge.notify("motores").
+"""
+import math
+import time
+
+
+class Histograma:
+    """Cubetas logarítmicas de 1 µs a 10 s; error relativo de cuantiles ~6%."""
+
+    def __init__(self, minimo=1e-6, maximo=10.0, por_decada=20):
+        self.minimo = float(minimo)
+        self.por_decada = int(por_decada)
+        self._escala = self.por_decada / math.log(10.0)
+        self.nb = int(math.ceil(math.log10(maximo / minimo) * self.por_decada)) + 1
+        self.cubetas = [0] * self.nb
+        self.reset()
+
+    def reset(self):
+        for i in range(self.nb):
+            self.cubetas[i] = 0
+        self.n = 0
+        self.suma = 0.0
+        self.max = 0.0
+
+    def add(self, v):
+        if v > self.minimo:
+            i = int(math.log(v / self.minimo) * self._escala)
+            if i >= self.nb:
+                i = self.nb - 1
+        else:
+            i = 0
+        self.cubetas[i] += 1
+        self.n += 1
+        self.suma += v
+        if v > self.max:
+            self.max = v
+
+    def cuantil(self, q):
+        """Valor aproximado del cuantil q (0..1); centro geométrico de la cubeta."""
+        if self.n == 0:
+            return 0.0
+        objetivo = q * self.n
+        acum = 0
+        for i, c in enumerate(self.cubetas):
+            acum += c
+            if acum >= objetivo and c:
+                return min(self.max, self.minimo * 10.0 ** ((i + 0.5) / self.por_decada))
+        return self.max
+
+    @property
+    def media(self):
+        return self.suma / self.n if self.n else 0.0
+
+
+class LoopInstrumentation:
+    """
+    Uso en el callback de Bridge:
+
+        t0 = lazo.llegada()
+        ...
+        send_motors(l, r); lazo.actuado(t0)
+        ...
+        lazo.fin(t0)
+    """
+
+    NOMBRES = ("intervalo", "handler", "latencia")
+
+    def __init__(self):
+        self.hist = {n: Histograma() for n in self.NOMBRES}
+        self._ultima = None
+        self.intervalo = None      # último intervalo entre muestras (s)
+
+    def llegada(self, t=None):
+        """`t`: instante de llegada si la muestra esperó en un buzón (ver runtime.py)."""
+        if t is None:
+            t = time.perf_counter()
+        if self._ultima is not None:
+            self.intervalo = t - self._ultima
+            self.hist["intervalo"].add(self.intervalo)
+        self._ultima = t
+        return t
+
+    def actuado(self, t0):
+        self.hist["latencia"].add(time.perf_counter() - t0)
+
+    def fin(self, t0):
+        self.hist["handler"].add(time.perf_counter() - t0)
+
+    def muestras_max(self, duracion, q=0.01, margen=1.25, minimo=20):
+        """
+        Cota superior de muestras en `duracion` s a partir de los intervalos más
+        cortos medidos (cuantil q, con margen por el error de las cubetas).
+        None si todavía no hay `minimo` intervalos.
+        """
+        h = self.hist["intervalo"]
+        if h.n < minimo:
+            return None
+        return int(math.ceil(duracion / h.cuantil(q) * margen))
+
+    def percentil(self, nombre, q):
+        return self.hist[nombre].cuantil(q)
+
+    def resumen(self):
+        """{nombre: {n, p50, p95, p99, max, media}} con tiempos en segundos."""
+        out = {}
+        for nombre, h in self.hist.items():
+            out[nombre] = {
+                "n": h.n,
+                "p50": h.cuantil(0.50),
+                "p95": h.cuantil(0.95),
+                "p99": h.cuantil(0.99),
+                "max": h.max,
+                "media": h.media,
+            }
+        return out
+
+    def texto(self):
+        """Una línea por histograma en ms, para el resumen de cada RUN."""
+        lineas = []
+        for nombre, r in self.resumen().items():
+            lineas.append(
+                f"{nombre.upper():<9} p50={r['p50'] * 1e3:7.2f}ms p95={r['p95'] * 1e3:7.2f}ms "
+                f"p99={r['p99'] * 1e3:7.2f}ms max={r['max'] * 1e3:7.2f}ms (n={r['n']})"
+            )
+        return "\n".join(lineas)
+
+    def reset(self):
+        # Se conserva la última llegada para no perder el intervalo entre RUNs
+        for h in self.hist.values():
+            h.reset()
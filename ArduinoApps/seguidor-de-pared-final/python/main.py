@@ -1,9 +1,18 @@
-import sys
+import atexit
+import math
+import os
 import time
 from arduino.app_utils import App, Bridge
 
+from archive import TuningArchive
+from checkpoint import TunerCheckpoint
 from controller import WallFollowerP
+from latency import LoopInstrumentation
+from mpc import WallFollowerMPC
+from recorder import Recorder
 from runner import RunPause
+from runtime import ControlRuntime
+from telemetry import Telemetry, consola
 from tuner import TwiddleTuner
 
 # --- Configuración Visual y Monitoreo ---
@@ -13,20 +22,15 @@ def label(p):
     return f"kp={p['kp']:.2f} kd={p['kd']:.2f} base={p['base']} corr={int(p['corr_max'])}"
 
 def imprimir_cabecera():
-    print("\n" + "="*95)
+    telemetria.mensaje("\n" + "="*95)
     # Columnas: Ciclo, Distancia, Error, Derivada, Ajuste, Motores, Visualización
-    print(f"{'CICLO':<6} | {'DIST':<6} | {'ERR':<7} | {'DERIV':<7} | {'ADJ':<6} | {'PWM_I':<6} | {'PWM_D':<6} | {'GRAFICO (Setpoint |)'}")
-    print("-" * 95)
+    telemetria.mensaje(f"{'CICLO':<6} | {'DIST':<6} | {'ERR':<7} | {'DERIV':<7} | {'ADJ':<6} | {'PWM_I':<6} | {'PWM_D':<6} | {'GRAFICO (Setpoint |)'}")
+    telemetria.mensaje("-" * 95)
+
+def formato_ciclo(reg):
+    """Se ejecuta en el hilo de telemetría, fuera del callback de control."""
+    ciclo, dist_f, error, derivative, ajuste, pwm_izq, pwm_der, mode = reg
 
-def log_ciclo(info, pwm_izq, pwm_der, mode):
-    global _ciclo
-    _ciclo += 1
-    
-    if info is not None:
-        dist_f, error, derivative, ajuste = info
-    else:
-        dist_f, error, derivative, ajuste = 0, 0, 0, 0
-    
     # Representación visual rápida de la posición respecto al muro
     # El centro '|' es 15cm. 'R' es el robot.
     barra = [" "] * 15
@@ -36,7 +40,22 @@ def log_ciclo(info, pwm_izq, pwm_der, mode):
     barra[idx_robot] = "R"
     visual = "".join(barra)
 
-    print(f"{_ciclo:<6} | {dist_f:>6.1f} | {error:>7.2f} | {derivative:>7.2f} | {ajuste:>6} | {pwm_izq:>6} | {pwm_der:>6} | [{visual}] {mode}")
+    return f"{ciclo:<6} | {dist_f:>6.1f} | {error:>7.2f} | {derivative:>7.2f} | {ajuste:>6} | {pwm_izq:>6} | {pwm_der:>6} | [{visual}] {mode}"
+
+def log_ciclo(info, pwm_izq, pwm_der, mode):
+    global _ciclo
+    _ciclo += 1
+    
+    if info is not None:
+        dist_f, error, derivative, ajuste = info
+    else:
+        dist_f, error, derivative, ajuste = 0, 0, 0, 0
+
+    # Sólo se copia el registro al búfer; el formato y la escritura van en otro hilo
+    telemetria.push(_ciclo, dist_f, error, derivative, ajuste, pwm_izq, pwm_der, mode)
+
+# Consola a 10 Hz; se pueden agregar telemetry.archivo(...) o telemetry.websocket(...)
+telemetria = Telemetry(formato_ciclo, sinks=[consola()], capacidad=2048, campos=8, periodo=0.1)
 
 # --- Parámetros Iniciales ---
 base_params = {
@@ -49,6 +68,14 @@ base_params = {
     "busc_izq": 140, "busc_der": 80,
 }
 
+# Duración de cada RUN y cota inicial de muestras para el modo carrera. El sketch
+# manda una muestra cada ~150 ms (dos medianas de 3 lecturas con delay(10) más
+# dos delay(50)): ~7 Hz. Se parte de un período mínimo de 0.12 s y, tras cada
+# RUN, la cota se recalcula con los intervalos medidos por latency.py.
+RUN_S = 6.0
+PERIODO_SKETCH_S = 0.15
+PERIODO_MIN_S = 0.12
+
 tuner = TwiddleTuner(
     base_params=base_params,
     keys=("kp", "kd", "corr_max"), # TRES llaves
@@ -59,17 +86,43 @@ tuner = TwiddleTuner(
         "kp": (0.5, 15.0),
         "kd": (0.0, 60.0),
         "corr_max": (20.0, 150.0),
-    }
+    },
+    racing=True,          # corta los RUN que ya no pueden ganar
+    muestras_max=math.ceil(RUN_S / PERIODO_MIN_S),
 )
 
-controller = WallFollowerP(
+# Control predictivo (mpc.py) en vez del PD; vuelve al PD si un ciclo excede el presupuesto
+USAR_MPC = False
+
+controller = (WallFollowerMPC if USAR_MPC else WallFollowerP)(
     setpoint_derecha=15.0,
     distancia_obstaculo=15.0,
     sin_pared_umbral=300.0,
     filtro_alpha=0.7,
 )
 
-runpause = RunPause(run_seconds=6.0, pause_seconds=10.0)
+runpause = RunPause(run_seconds=RUN_S, pause_seconds=10.0)
+
+# Ley PD tabulada (WallFollowerLUT) para los parámetros de cada RUN. Se compila
+# en la pausa, con el robot detenido; no aplica al MPC
+USAR_LUT = False
+_ctrl = controller
+
+# Histogramas de intervalo entre muestras, tiempo del handler y latencia a motores
+lazo = LoopInstrumentation()
+
+# Grabación de cada muestra para reproducir la sesión después (ver recorder.py)
+DIR_REGISTROS = os.path.join(os.path.dirname(os.path.abspath(__file__)), "registros")
+recorder = Recorder(os.path.join(DIR_REGISTROS, time.strftime("distancias_%Y%m%d_%H%M%S.bin")))
+atexit.register(recorder.close)
+
+# Estado de Twiddle en disco tras cada RUN; borrar el archivo para empezar de cero
+checkpoint = TunerCheckpoint(os.path.join(DIR_REGISTROS, "tuner_checkpoint.json"))
+atexit.register(checkpoint.close)
+
+# Historial de todas las sesiones; sirve para arrancar en caliente la siguiente
+archivo = TuningArchive(os.path.join(DIR_REGISTROS, "archivo_ajustes.db"))
+atexit.register(archivo.close)
 
 # --- Lógica Principal ---
 _prev_phase = None
@@ -78,21 +131,30 @@ _run_started = False
 def send_motors(l, r):
     Bridge.notify("motores", int(l), int(r))
 
+def controlador_del_run():
+    """El controlador a usar con tuner.bound; con USAR_LUT, una tabla por juego de parámetros."""
+    global _ctrl
+    if USAR_LUT and not USAR_MPC and getattr(_ctrl, "params", None) is not tuner.bound:
+        _ctrl = controller.compilar(tuner.bound)
+    return _ctrl
+
 import traceback
 
 def al_recibir_distancias(dC, dR):
     global _prev_phase, _run_started, _ciclo
 
+    # La latencia se mide desde que Bridge entregó la muestra, no desde que se tomó
+    t0 = lazo.llegada(runtime.t_llegada)
     try:
         if tuner.finished:
             send_motors(0, 0)
+            recorder.record(dC, dR, 0, 0, "fin")
             best_params, best_cost = tuner.best()
-            print("\n" + "!"*50)
-            print(f"OPTIMIZACIÓN COMPLETA")
-            print(f"MEJOR CONFIG: {label(best_params)}")
-            print(f"COSTO: {best_cost:.3f}")
-            print("!"*50)
-            sys.stdout.flush()
+            telemetria.mensaje("\n" + "!"*50)
+            telemetria.mensaje(f"OPTIMIZACIÓN COMPLETA")
+            telemetria.mensaje(f"MEJOR CONFIG: {label(best_params)}")
+            telemetria.mensaje(f"COSTO: {best_cost:.3f}")
+            telemetria.mensaje("!"*50)
             return
 
         runpause.update()
@@ -100,18 +162,32 @@ def al_recibir_distancias(dC, dR):
         # --- FASE DE PAUSA ---
         if runpause.phase == "pause":
             send_motors(0, 0)
+            recorder.record(dC, dR, 0, 0, "pausa")
 
             if _prev_phase != "pause":
                 if _run_started:
                     # Al terminar un RUN, mostramos resumen de desempeño
                     cost, mae, osc, sat, bad = tuner._score()
+                    m = tuner.metricas()
                     tuner.end_run()
+                    checkpoint.guardar(tuner)
+                    archivo.agregar(tuner.history[-1:], controller.setpoint, abortados=[tuner.abortado(-1)])
                     _run_started = False
 
-                    print("\n" + "-"*40)
-                    print(f"RESUMEN RUN: Costo={cost:.3f} | MAE={mae:.2f} | OSC={osc:.2f}")
-                    print(f"Próxima prueba: {label(tuner.params)}")
-                    print("-"*40)
+                    telemetria.mensaje("\n" + "-"*40)
+                    telemetria.mensaje(f"RESUMEN RUN: Costo={cost:.3f} | MAE={mae:.2f} | OSC={osc:.2f}")
+                    telemetria.mensaje(f"ERROR: p95={m['p95']:.2f} | max={m['max_abs']:.2f} | desvío={m['desvio']:.2f} | cruces={m['tasa_cruces']:.2f}")
+                    telemetria.mensaje(f"Próxima prueba: {label(tuner.params)}")
+                    telemetria.mensaje(_ctrl.fsm.texto())
+                    if USAR_MPC:
+                        telemetria.mensaje(controller.texto())
+                    telemetria.mensaje(lazo.texto())
+                    telemetria.mensaje(runtime.texto())
+                    telemetria.mensaje("-"*40)
+                    # Cota del modo carrera según la tasa de muestras medida
+                    tuner.muestras_max = lazo.muestras_max(RUN_S) or tuner.muestras_max
+                    lazo.reset()
+                    controlador_del_run()
 
             _prev_phase = "pause"
             return
@@ -120,31 +196,58 @@ def al_recibir_distancias(dC, dR):
         if _prev_phase != "run":
             _run_started = True
             _ciclo = 0
-            controller.reset()
-            print(f"\n\n[INICIANDO RUN] Probando: {label(tuner.params)}")
+            controlador_del_run().reset()
+            telemetria.mensaje(f"\n\n[INICIANDO RUN] Probando: {label(tuner.params)}")
             imprimir_cabecera()
             _prev_phase = "run"
 
         # 1. Calcular paso del controlador
-        pwm_izq, pwm_der, mode, info = controller.step(dC, dR, tuner.params)
+        if USAR_MPC:
+            # El modelo del MPC avanza con el intervalo medido, no con el nominal
+            pwm_izq, pwm_der, mode, info = controller.step(dC, dR, tuner.bound, dt=lazo.intervalo)
+        else:
+            pwm_izq, pwm_der, mode, info = _ctrl.step(dC, dR, tuner.bound)
         
         # 2. Enviar a motores
         send_motors(pwm_izq, pwm_der)
+        lazo.actuado(t0)
         
-        # 3. Registrar datos en el Tuner
+        # 3. Registrar datos en el Tuner y en el log binario
         tuner.observe(mode, info, pwm_izq, pwm_der)
+        recorder.record(dC, dR, pwm_izq, pwm_der, mode)
+
+        # Modo carrera: si el RUN ya no puede superar al mejor, se pasa a la pausa ya
+        if tuner.abortar:
+            send_motors(0, 0)
+            runpause.cortar()
+            telemetria.mensaje("[RUN ABORTADO] no puede superar al mejor costo")
+            return
         
         # 4. Monitoreo en tiempo real (Telemetría)
         log_ciclo(info, pwm_izq, pwm_der, mode)
         
     except Exception:
-        traceback.print_exc()
-        sys.stdout.flush()
+        telemetria.mensaje(traceback.format_exc())
+    finally:
+        lazo.fin(t0)
 
 
 # --- Inicio del Programa ---
 print("\nSISTEMA DE AUTO-AJUSTE PD INICIADO")
-tuner.start()
+telemetria.start()
+atexit.register(telemetria.close)
+if checkpoint.cargar(tuner):
+    print(f"Reanudando sesión: {len(tuner.history)} RUNs previos | siguiente: {label(tuner.params)}")
+elif archivo.warm_start(tuner, controller.setpoint):
+    print(f"Arranque en caliente desde el archivo: {label(tuner.params)} | deltas={[round(d, 3) for d in tuner.deltas]}")
+else:
+    tuner.start()
 runpause.start()
-Bridge.provide("distancias", al_recibir_distancias)
+# Bridge sólo deja la muestra más nueva en el buzón; el control corre en su propio
+# hilo, una vez por muestra (cada ~150 ms, ver PERIODO_SKETCH_S); una muestra que
+# esperó más de medio intervalo se descarta
+runtime = ControlRuntime(al_recibir_distancias, periodo=PERIODO_SKETCH_S, max_edad=PERIODO_SKETCH_S / 2)
+runtime.start()
+atexit.register(runtime.stop)
+Bridge.provide("distancias", runtime.recibir)
 App.run()
\ No newline at end of file
@@ -0,0 +1,253 @@
+"""
+Seguidor de pared con control predictivo (MPC) por muestreo de secuencias.
+
+En el modo "ok" cada ciclo se simulan a la vez unos cientos de secuencias
+candidatas de PWM sobre un horizonte corto con el modelo cinemático
+diferencial de simulator.py (vectorizado con NumPy) y se aplica el primer
+paso de la más barata: error lateral respecto al setpoint, cercanía al
+obstáculo frontal y cambios bruscos de corrección. Los modos "obst" y
+"buscar" son los mismos de WallFollowerP.
+
+El modelo avanza al ritmo del sketch (una muestra cada ~150 ms), integrado
+en subpasos igual que RobotSim.aplicar(). Si step() recibe `dt` (el
+intervalo medido entre muestras, ver latency.py), el PWM anterior se
+integra con ese intervalo en vez del nominal.
+
+Guarda de presupuesto: si un ciclo MPC tarda más que `presupuesto`, ese
+ciclo y los `enfriamiento` siguientes usan la ley PD de WallFollowerP.
+"""
+import math
+import time
+
+import numpy as np
+
+from controller import WallFollowerP
+from simulator import subpasos
+
+
+class WallFollowerMPC(WallFollowerP):
+    def __init__(
+        self,
+        setpoint_derecha=15.0,
+        distancia_obstaculo=20.0,
+        sin_pared_umbral=300.0,
+        filtro_alpha=0.7,
+        horizonte=6,
+        niveles=17,
+        cambio=1,
+        periodo=0.15,
+        ancho_ejes=14.0,
+        cm_s_por_pwm=0.30,
+        pwm_muerto=25,
+        tau_motor=0.08,
+        distancia_segura=35.0,
+        w_obst=4.0,
+        w_suave=0.002,
+        mezcla_rumbo=0.8,
+        presupuesto=0.015,
+        enfriamiento=10,
+    ):
+        super().__init__(setpoint_derecha, distancia_obstaculo, sin_pared_umbral, filtro_alpha)
+        # Secuencias: corrección a1 durante `cambio` muestras y luego a2 (niveles² candidatas)
+        self.horizonte = int(horizonte)
+        self.niveles = int(niveles)
+        self.cambio = int(cambio)
+
+        # Modelo (mismos nombres y valores por defecto que RobotSim)
+        self.dt = float(periodo)               # intervalo nominal entre muestras del sketch
+        self.ancho_ejes = float(ancho_ejes)
+        self.k_vel = float(cm_s_por_pwm)
+        self.pwm_muerto = float(pwm_muerto)
+        self.tau = float(tau_motor)
+        self.subpasos = subpasos(self.dt)
+        self.a_motor = 1.0 - math.exp(-self.dt / self.subpasos / self.tau)
+
+        self.distancia_segura = float(distancia_segura)
+        self.w_obst = float(w_obst)
+        self.w_suave = float(w_suave)
+        self.mezcla_rumbo = float(mezcla_rumbo)
+
+        self.presupuesto = float(presupuesto)
+        self.enfriamiento = int(enfriamiento)
+
+        self._candidatos = None
+        self._clave = None
+        self.ciclos_mpc = 0
+        self.ciclos_pd = 0
+        self.overruns = 0
+        self.reset()
+
+    def reset(self):
+        super().reset()
+        self.v_izq = 0.0
+        self.v_der = 0.0
+        self.rumbo = 0.0               # ángulo estimado respecto a la pared (rad, + = se aleja)
+        self.ajuste_prev = 0
+        self._pwm_prev = (0, 0)
+        self._dt_ciclo = self.dt
+        self._pd_restante = 0
+
+    # --- Modelo ---
+
+    def _vel_objetivo(self, pwm):
+        """Velocidad de rueda en régimen (cm/s) para un PWM; acepta escalares o arreglos."""
+        pwm = np.clip(pwm, -255.0, 255.0)
+        mag = np.maximum(np.abs(pwm) - self.pwm_muerto, 0.0)
+        return np.sign(pwm) * mag * self.k_vel
+
+    def _preparar(self, p):
+        """Secuencias candidatas y sus velocidades objetivo; se recalculan sólo si cambian base o corr_max."""
+        clave = (p.base, p.corr_max)
+        if clave == self._clave:
+            return self._candidatos
+        niveles = np.linspace(-p.corr_max, p.corr_max, self.niveles).round().astype(np.int64)
+        a1, a2 = np.meshgrid(niveles, niveles, indexing="ij")
+        ajustes = np.empty((a1.size, self.horizonte), dtype=np.int64)
+        ajustes[:, :self.cambio] = a1.reshape(-1, 1)
+        ajustes[:, self.cambio:] = a2.reshape(-1, 1)
+        pwm_izq = np.clip(p.base + ajustes, 0, 255)
+        pwm_der = np.clip(p.base - ajustes, 0, 255)
+        # Columnas contiguas: en el rollout se toma un paso de todas las candidatas a la vez
+        self._candidatos = (
+            ajustes[:, 0].copy(),
+            pwm_izq[:, 0].copy(),
+            pwm_der[:, 0].copy(),
+            np.ascontiguousarray(self._vel_objetivo(pwm_izq).T),
+            np.ascontiguousarray(self._vel_objetivo(pwm_der).T),
+        )
+        self._clave = clave
+        return self._candidatos
+
+    def _integrar(self, pwm_izq, pwm_der, dt):
+        """Avanza las velocidades de rueda y el rumbo estimado con el PWM aplicado durante dt."""
+        n = subpasos(dt)
+        h = dt / n
+        a = 1.0 - math.exp(-h / self.tau)
+        obj_izq = float(self._vel_objetivo(pwm_izq))
+        obj_der = float(self._vel_objetivo(pwm_der))
+        for _ in range(n):
+            self.v_izq += (obj_izq - self.v_izq) * a
+            self.v_der += (obj_der - self.v_der) * a
+            self.rumbo += (self.v_der - self.v_izq) / self.ancho_ejes * h
+
+    def _corregir_rumbo(self, d_dist, dt):
+        """Filtro complementario: integra el giro y corrige con la variación de la distancia."""
+        v = 0.5 * (self.v_izq + self.v_der)
+        if v > 1.0:
+            s = max(-0.8, min(0.8, d_dist / (v * dt)))
+            m = self.mezcla_rumbo
+            self.rumbo = m * self.rumbo + (1.0 - m) * math.asin(s)
+
+    def rollout(self, y0, rumbo0, frontal0, p):
+        """Costo de cada secuencia candidata desde el estado dado; devuelve (costos, candidatos)."""
+        cands = self._preparar(p)
+        ajustes0, _, _, vel_izq, vel_der = cands
+        n = ajustes0.size
+        a = self.a_motor
+        dt = self.dt / self.subpasos
+        k_giro = dt / self.ancho_ejes
+
+        vi = np.full(n, self.v_izq)
+        vd = np.full(n, self.v_der)
+        y = np.full(n, y0)
+        th = np.full(n, rumbo0)
+        fx = np.full(n, frontal0 * math.cos(rumbo0))
+        fr = np.empty(n)
+        costo = np.zeros(n)
+        v = np.empty(n)
+        tmp = np.empty(n)
+        for t in range(self.horizonte * self.subpasos):
+            # Cada muestra del horizonte son `subpasos` pasos del modelo
+            k = t // self.subpasos
+            vi += (vel_izq[k] - vi) * a
+            vd += (vel_der[k] - vd) * a
+            np.add(vi, vd, out=v)
+            v *= 0.5
+            th += (vd - vi) * k_giro
+            np.sin(th, out=tmp)
+            y += v * tmp * dt
+            np.cos(th, out=tmp)
+            fx -= v * tmp * dt
+            # Distancia al frente medida sobre el rumbo (obstáculo perpendicular a la pared)
+            np.maximum(tmp, 0.2, out=tmp)
+            np.divide(fx, tmp, out=fr)
+            np.subtract(y, self.setpoint, out=tmp)
+            costo += tmp * tmp
+            np.subtract(self.distancia_segura, fr, out=tmp)
+            np.maximum(tmp, 0.0, out=tmp)
+            costo += self.w_obst * tmp * tmp
+        d = ajustes0 - self.ajuste_prev
+        costo += self.w_suave * d * d
+        return costo, cands
+
+    # --- Estado "ok" ---
+
+    def step(self, dC, dR, params, dt=None):
+        """
+        `dt`: segundos desde la muestra anterior (LoopInstrumentation.intervalo).
+        Sin medición, o si es más de 3 veces el nominal (la pausa entre RUNs),
+        se usa `periodo`.
+        """
+        if dt is None or not 0.0 < dt <= 3.0 * self.dt:
+            dt = self.dt
+        # El PWM anterior estuvo aplicado desde la muestra previa hasta ésta
+        self._integrar(self._pwm_prev[0], self._pwm_prev[1], dt)
+        self._dt_ciclo = dt
+        out = super().step(dC, dR, params)
+        self._pwm_prev = (out[0], out[1])
+        return out
+
+    def _seguir(self, dC, dR, p):
+        if self._pd_restante > 0:
+            self._pd_restante -= 1
+            self.ciclos_pd += 1
+            out = super()._seguir(dC, dR, p)
+            self.ajuste_prev = out[3][3]
+            return out
+
+        t0 = time.perf_counter()
+        dR_prev = self.dR_f
+        error_prev = self.prev_error
+        if self.dR_f is None:
+            self.dR_f = dR
+        self.dR_f = self.alpha * self.dR_f + (1.0 - self.alpha) * dR
+
+        error = self.dR_f - self.setpoint
+        if self.prev_error is None:
+            self.prev_error = error
+        derivative = error - self.prev_error
+        self.prev_error = error
+        if dR_prev is not None:
+            self._corregir_rumbo(self.dR_f - dR_prev, self._dt_ciclo)
+
+        if abs(error) <= p.zona_muerta and abs(derivative) <= p.zona_muerta:
+            ajuste = 0
+            pwm_izq = max(0, min(255, p.base))
+            pwm_der = pwm_izq
+        else:
+            frontal = dC if 0.0 < dC < self.sin_pared else self.sin_pared
+            costo, (ajustes0, izq0, der0, _, _) = self.rollout(self.dR_f, self.rumbo, frontal, p)
+            k = int(np.argmin(costo))
+            ajuste = int(ajustes0[k])
+            pwm_izq = int(izq0[k])
+            pwm_der = int(der0[k])
+
+        if time.perf_counter() - t0 > self.presupuesto:
+            # Ciclo fuera de presupuesto: su salida ya llega tarde, así que se
+            # descarta y se aplica la del PD (con el filtro como estaba), que
+            # sigue por un rato antes de reintentar
+            self.overruns += 1
+            self.ciclos_pd += 1
+            self._pd_restante = self.enfriamiento
+            self.dR_f = dR_prev
+            self.prev_error = error_prev
+            out = super()._seguir(dC, dR, p)
+            self.ajuste_prev = out[3][3]
+            return out
+
+        self.ajuste_prev = ajuste
+        self.ciclos_mpc += 1
+        return pwm_izq, pwm_der, "ok", (self.dR_f, error, derivative, ajuste)
+
+    def texto(self):
+        return f"MPC ciclos={self.ciclos_mpc} pd={self.ciclos_pd} overruns={self.overruns}"
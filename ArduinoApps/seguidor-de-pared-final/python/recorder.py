@@ -0,0 +1,117 @@
+"""
+Grabación binaria del flujo `distancias` y reproducción a máxima velocidad.
+
+Cada muestra se guarda como un registro de ancho fijo (21 bytes):
+t_ns (int64), dC (float32), dR (float32), pwm_izq (int16), pwm_der (int16), modo (uint8).
+"""
+import os
+import struct
+import time
+
+MAGIC = b"DIST"
+VERSION = 1
+_CABECERA = struct.Struct("<4sH")
+_REGISTRO = struct.Struct("<qffhhB")
+
+MODOS = ("ok", "obst", "buscar", "pausa", "fin")
+_CODIGO = {m: i for i, m in enumerate(MODOS)}
+_DESCONOCIDO = 255
+
+
+class Recorder:
+    def __init__(self, path, registros_por_bloque=256):
+        os.makedirs(os.path.dirname(os.path.abspath(path)), exist_ok=True)
+        self.path = path
+        self._f = open(path, "ab")
+        if self._f.tell() == 0:
+            self._f.write(_CABECERA.pack(MAGIC, VERSION))
+        # Búfer preasignado: record() sólo empaqueta, la escritura va por bloques
+        self._buf = bytearray(_REGISTRO.size * int(registros_por_bloque))
+        self._cap = int(registros_por_bloque)
+        self._n = 0
+        self.total = 0
+
+    def record(self, dC, dR, pwm_izq, pwm_der, mode, t_ns=None):
+        if t_ns is None:
+            t_ns = time.time_ns()
+        _REGISTRO.pack_into(
+            self._buf, self._n * _REGISTRO.size,
+            t_ns, dC, dR, int(pwm_izq), int(pwm_der), _CODIGO.get(mode, _DESCONOCIDO),
+        )
+        self._n += 1
+        self.total += 1
+        if self._n >= self._cap:
+            self.flush()
+
+    def flush(self):
+        if self._n:
+            self._f.write(memoryview(self._buf)[:self._n * _REGISTRO.size])
+            self._n = 0
+        self._f.flush()
+
+    def close(self):
+        if self._f.closed:
+            return
+        self.flush()
+        self._f.close()
+
+    def __enter__(self):
+        return self
+
+    def __exit__(self, *exc):
+        self.close()
+
+
+def leer_log(path):
+    """Devuelve la lista de registros (t_ns, dC, dR, pwm_izq, pwm_der, modo)."""
+    with open(path, "rb") as f:
+        datos = f.read()
+    magic, version = _CABECERA.unpack_from(datos, 0)
+    if magic != MAGIC or version != VERSION:
+        raise ValueError(f"{path}: no es un log de distancias v{VERSION}")
+
+    # Un corte de energía puede dejar un registro a medias al final
+    cuerpo = memoryview(datos)[_CABECERA.size:]
+    cuerpo = cuerpo[:len(cuerpo) - len(cuerpo) % _REGISTRO.size]
+    return [
+        (t, dC, dR, pi, pd, MODOS[m] if m < len(MODOS) else "?")
+        for t, dC, dR, pi, pd, m in _REGISTRO.iter_unpack(cuerpo)
+    ]
+
+
+def reproducir(registros, controller, params):
+    """
+    Pasa un log por controller.step() sin esperas.
+
+    Genera (dt, registro, salida) donde dt es el tiempo original desde la
+    muestra anterior en segundos y salida es lo que devuelve step().
+    El controlador se reinicia en cada paso de PAUSA a RUN, como en main.py.
+    """
+    if isinstance(registros, (str, os.PathLike)):
+        registros = leer_log(registros)
+
+    controller.reset()
+    t_prev = None
+    en_pausa = False
+    for reg in registros:
+        t_ns, dC, dR, _, _, modo = reg
+        dt = 0.0 if t_prev is None else (t_ns - t_prev) * 1e-9
+        t_prev = t_ns
+        if modo in ("pausa", "fin"):
+            en_pausa = True
+            continue
+        if en_pausa:
+            controller.reset()
+            en_pausa = False
+        yield dt, reg, controller.step(dC, dR, params)
+
+
+def comparar(registros, controller, params):
+    """Reproduce el log y cuenta las muestras cuyo PWM o modo difiere del grabado."""
+    total = 0
+    difieren = 0
+    for _, reg, (pwm_izq, pwm_der, mode, _) in reproducir(registros, controller, params):
+        total += 1
+        if (pwm_izq, pwm_der, mode) != (reg[3], reg[4], reg[5]):
+            difieren += 1
+    return difieren, total
@@ -27,6 +27,14 @@ class RunPause:
 
         return None
 
+    def cortar(self):
+        """Termina el RUN actual ya (p. ej. el tuner lo abortó) y arranca la pausa."""
+        if self._phase == "run":
+            self._phase = "pause"
+            self._t0 = time.time()
+            return "to_pause"
+        return None
+
     @property
     def phase(self):
         return self._phase
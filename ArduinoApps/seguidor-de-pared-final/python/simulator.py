@@ -0,0 +1,263 @@
+"""
+Simulador sin cabeza del robot seguidor de pared.
+
+Modela la cinemática diferencial a partir del PWM, una pared a la derecha con
+un obstáculo frontal y lecturas tipo HC-SR04 (ruido, ecos perdidos, el
+SIN_ECO=400 y la cadencia del sketch: una muestra cada ~150 ms). Sirve para ejecutar WallFollowerP y los
+tuners mucho más rápido que en tiempo real, sin el robot físico.
+"""
+import math
+import random
+
+
+class Pista:
+    """Paredes del escenario como segmentos (x1, y1, x2, y2) en cm."""
+
+    def __init__(self, segmentos):
+        self.segmentos = [tuple(float(v) for v in s) for s in segmentos]
+
+    @classmethod
+    def pared_con_obstaculo(cls, largo=250.0, alto=200.0):
+        # Pared derecha sobre y=0 (el robot avanza hacia +x con la pared a su
+        # derecha) y un obstáculo frontal perpendicular en x=largo.
+        return cls([
+            (0.0, 0.0, largo, 0.0),
+            (largo, 0.0, largo, alto),
+        ])
+
+
+SUBPASO_MAX = 0.02   # s; paso máximo de integración dentro de un periodo
+
+
+def subpasos(periodo):
+    """Cantidad de subpasos de integración para un periodo de muestreo."""
+    return max(1, math.ceil(periodo / SUBPASO_MAX - 1e-9))
+
+
+class RobotSim:
+    def __init__(
+        self,
+        pista=None,
+        periodo=0.15,
+        ancho_ejes=14.0,
+        cm_s_por_pwm=0.30,
+        pwm_muerto=25,
+        tau_motor=0.08,
+        radio=9.0,
+        offset_frontal=8.0,
+        offset_derecho=6.0,
+        ruido_base=0.3,
+        ruido_rel=0.01,
+        prob_sin_eco=0.01,
+        angulo_max_eco=35.0,
+        alcance_max=400.0,
+        sin_eco=400.0,
+        semilla=None,
+    ):
+        self.pista = pista or Pista.pared_con_obstaculo()
+        self.periodo = float(periodo)          # 2 medianas de 3 lecturas + 2x delay(50) -> ~150 ms
+        self.ancho_ejes = float(ancho_ejes)
+        self.k_vel = float(cm_s_por_pwm)
+        self.pwm_muerto = float(pwm_muerto)
+        self.tau = float(tau_motor)
+        self.radio = float(radio)
+        self.off_f = float(offset_frontal)
+        self.off_r = float(offset_derecho)
+        self.ruido_base = float(ruido_base)
+        self.ruido_rel = float(ruido_rel)
+        self.prob_sin_eco = float(prob_sin_eco)
+        self.cos_max = math.cos(math.radians(angulo_max_eco))
+        self.alcance = float(alcance_max)
+        self.sin_eco = float(sin_eco)         # SIN_ECO del sketch: valor sin eco
+        self.rng = random.Random(semilla)
+        self.reset()
+
+    def reset(self, x=0.0, y=15.0, theta=0.0):
+        self.x = float(x)
+        self.y = float(y)
+        self.theta = float(theta)
+        self.v_izq = 0.0
+        self.v_der = 0.0
+        self.t = 0.0
+        self.choque = False
+
+    def reset_aleatorio(self, setpoint=15.0, desvio=5.0, angulo=10.0, x_max=50.0):
+        """Pose inicial cerca del setpoint, como al soltar el robot a mano."""
+        r = self.rng
+        self.reset(
+            x=r.uniform(0.0, x_max),
+            y=setpoint + r.uniform(-desvio, desvio),
+            theta=math.radians(r.uniform(-angulo, angulo)),
+        )
+
+    # --- Sensores ---
+
+    def _rayo(self, ox, oy, ang):
+        """Distancia real del rayo a la pared más cercana o None si no hay eco."""
+        dx = math.cos(ang)
+        dy = math.sin(ang)
+        mejor = None
+        for x1, y1, x2, y2 in self.pista.segmentos:
+            sx = x2 - x1
+            sy = y2 - y1
+            den = dx * sy - dy * sx
+            if den == 0.0:
+                continue
+            qx = x1 - ox
+            qy = y1 - oy
+            t = (qx * sy - qy * sx) / den
+            u = (qx * dy - qy * dx) / den
+            if t <= 0.0 or u < 0.0 or u > 1.0:
+                continue
+            if mejor is None or t < mejor[0]:
+                mejor = (t, abs(den) / math.hypot(sx, sy))
+        if mejor is None:
+            return None
+        t, cos_inc = mejor
+        # Con incidencia muy oblicua el eco rebota lejos y no vuelve
+        if cos_inc < self.cos_max or t > self.alcance:
+            return None
+        return t
+
+    def _medir(self, ox, oy, ang):
+        d = self._rayo(ox, oy, ang)
+        if d is None or self.rng.random() < self.prob_sin_eco:
+            return self.sin_eco
+        d += self.rng.gauss(0.0, self.ruido_base + self.ruido_rel * d)
+        return max(2.0, d)
+
+    def leer_sensores(self):
+        """Devuelve (dC, dR) igual que Bridge.notify("distancias", dC, dR)."""
+        c = math.cos(self.theta)
+        s = math.sin(self.theta)
+        dC = self._medir(self.x + self.off_f * c, self.y + self.off_f * s, self.theta)
+        dR = self._medir(self.x + self.off_r * s, self.y - self.off_r * c, self.theta - math.pi / 2)
+        return dC, dR
+
+    # --- Actuadores ---
+
+    def _vel_objetivo(self, pwm):
+        pwm = max(-255.0, min(255.0, float(pwm)))
+        mag = abs(pwm) - self.pwm_muerto
+        if mag <= 0.0:
+            return 0.0
+        return math.copysign(mag * self.k_vel, pwm)
+
+    def _dist_pared(self):
+        dmin = float("inf")
+        for x1, y1, x2, y2 in self.pista.segmentos:
+            sx = x2 - x1
+            sy = y2 - y1
+            u = ((self.x - x1) * sx + (self.y - y1) * sy) / (sx * sx + sy * sy)
+            u = max(0.0, min(1.0, u))
+            dmin = min(dmin, math.hypot(self.x - (x1 + u * sx), self.y - (y1 + u * sy)))
+        return dmin
+
+    def aplicar(self, pwm_izq, pwm_der):
+        """Aplica el PWM durante un periodo de muestreo y avanza la pose."""
+        # Con ~150 ms por muestra un solo paso de Euler se saltaría el retardo
+        # del motor y podría atravesar la pared: se integra en subpasos.
+        n = subpasos(self.periodo)
+        h = self.periodo / n
+        a = 1.0 - math.exp(-h / self.tau)
+        obj_izq = self._vel_objetivo(pwm_izq)
+        obj_der = self._vel_objetivo(pwm_der)
+        for _ in range(n):
+            self.v_izq += (obj_izq - self.v_izq) * a
+            self.v_der += (obj_der - self.v_der) * a
+            if self.choque:
+                continue
+            v = 0.5 * (self.v_izq + self.v_der)
+            w = (self.v_der - self.v_izq) / self.ancho_ejes
+            self.x += v * math.cos(self.theta) * h
+            self.y += v * math.sin(self.theta) * h
+            self.theta += w * h
+            if self._dist_pared() < self.radio:
+                self.choque = True
+                self.v_izq = self.v_der = 0.0
+
+        self.t += self.periodo
+
+
+def correr_episodio(sim, controller, params, segundos=6.0, tuner=None):
+    """Ejecuta un RUN en lazo cerrado; opcionalmente alimenta al tuner. Devuelve los pasos ejecutados."""
+    controller.reset()
+    pasos = int(round(segundos / sim.periodo))
+    for i in range(pasos):
+        dC, dR = sim.leer_sensores()
+        pwm_izq, pwm_der, mode, info = controller.step(dC, dR, params)
+        if tuner is not None:
+            tuner.observe(mode, info, pwm_izq, pwm_der)
+            if getattr(tuner, "abortar", False):
+                # El tuner ya descartó este RUN (modo carrera): se corta aquí
+                return i + 1
+        sim.aplicar(pwm_izq, pwm_der)
+    return pasos
+
+
+def sesion_twiddle(tuner, controller, sim, run_seconds=6.0, max_runs=100000):
+    """Reproduce el ciclo RUN/PAUSA de main.py sin esperas hasta que el tuner termina."""
+    tuner.start()
+    runs = 0
+    while not tuner.finished and runs < max_runs:
+        sim.reset_aleatorio(controller.setpoint)
+        correr_episodio(sim, controller, tuner.bound, run_seconds, tuner)
+        tuner.end_run()
+        runs += 1
+    return runs
+
+
+class EvaluadorSim:
+    """Evaluación de un RUN simulado con el costo de TwiddleTuner; usable en un pool de procesos."""
+
+    def __init__(self, controller, run_seconds=6.0, **sim_kwargs):
+        self.controller = controller
+        self.run_seconds = float(run_seconds)
+        self.sim_kwargs = sim_kwargs
+
+    def __call__(self, params, semilla=None):
+        from tuner import TwiddleTuner
+
+        sim = RobotSim(semilla=semilla, **self.sim_kwargs)
+        sim.reset_aleatorio(self.controller.setpoint)
+        metricas = TwiddleTuner(params)
+        correr_episodio(sim, self.controller, metricas.bound, self.run_seconds, metricas)
+        return metricas._score()
+
+
+if __name__ == "__main__":
+    import time
+    from controller import WallFollowerP
+    from tuner import ParallelTwiddleTuner, TwiddleTuner
+
+    # Misma configuración que main.py, pero contra el simulador
+    config = dict(
+        base_params={
+            "base": 150, "kp": 1.5, "kd": 10.0, "corr_max": 100, "zona_muerta": 1.0,
+            "obst_izq": -80, "obst_der": 80, "busc_izq": 140, "busc_der": 80,
+        },
+        keys=("kp", "kd", "corr_max"),
+        deltas=(0.5, 5.0, 20.0),
+        tol=0.2,
+        reps=2,
+        bounds={"kp": (0.5, 15.0), "kd": (0.0, 60.0), "corr_max": (20.0, 150.0)},
+    )
+    tuner = TwiddleTuner(**config)
+    controller = WallFollowerP(setpoint_derecha=15.0, distancia_obstaculo=15.0, sin_pared_umbral=300.0, filtro_alpha=0.7)
+    sim = RobotSim(sin_eco=400.0, semilla=1)  # SIN_ECO de sketch.ino
+
+    t0 = time.perf_counter()
+    runs = sesion_twiddle(tuner, controller, sim, run_seconds=6.0)
+    dt = time.perf_counter() - t0
+
+    best_params, best_cost = tuner.best()
+    print(f"Runs simulados: {runs} en {dt:.2f}s ({runs * 6.0 / dt:.0f}x tiempo real)")
+    print(f"MEJOR: kp={best_params['kp']:.2f} kd={best_params['kd']:.2f} corr={int(best_params['corr_max'])} | costo={best_cost:.3f}")
+
+    # Mismo problema con las sondas +d/-d de cada llave en paralelo
+    paralelo = ParallelTwiddleTuner(**config)
+    t0 = time.perf_counter()
+    best_params, best_cost = paralelo.run(EvaluadorSim(controller, run_seconds=6.0, sin_eco=400.0))
+    dt = time.perf_counter() - t0
+    print(f"Paralelo: {len(paralelo.history)} runs en {paralelo.rondas} rondas, {dt:.2f}s")
+    print(f"MEJOR: kp={best_params['kp']:.2f} kd={best_params['kd']:.2f} corr={int(best_params['corr_max'])} | costo={best_cost:.3f}")
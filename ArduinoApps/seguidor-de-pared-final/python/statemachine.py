@@ -0,0 +1,153 @@
+"""
+Máquina de estados compilada a partir de una tabla.
+
+Los estados (nombre -> acción) y las transiciones (desde, guarda, hacia) se
+declaran como datos. Al construirla, los umbrales se resuelven a números y
+las transiciones de cada estado de origen se compilan a una sola función con
+los umbrales como literales, así cada paso sólo revisa las salidas del estado
+actual: agregar estados no encarece el camino caliente.
+
+Variables de guarda:
+    "dC", "dR"  distancias recibidas en step()
+    "t"         segundos que lleva el estado actual (permanencia)
+
+Ejemplo de tabla (la del seguidor de pared):
+
+    TRANSICIONES = (
+        ("*", ("dC", "<=", "obst"), "obst"),
+        ("*", ("dR", ">=", "sin_pared"), "buscar"),
+        ("*", None, "ok"),
+    )
+
+"*" aplica a todos los estados; None es una guarda que siempre se cumple.
+Las transiciones se evalúan en el orden de la tabla y gana la primera.
+"""
+import time
+
+_COMPARADORES = ("<", "<=", ">", ">=")
+_VARIABLES = ("dC", "dR", "t")
+
+
+def _compilar_guardas(estado, salidas):
+    """
+    Genera la función de guardas de un estado: una cadena de if con los
+    umbrales como literales. Devuelve el índice del estado siguiente.
+    """
+    lineas = ["def guardas(dC, dR, m):"]
+    if any(var == "t" for var, _, _, _ in salidas):
+        lineas.append("    t = m.reloj() - m._desde")
+    for var, op, umbral, destino in salidas:
+        if var is None:
+            lineas.append(f"    return {destino}")
+            break
+        lineas.append(f"    if {var} {op} {umbral!r}: return {destino}")
+    else:
+        lineas.append(f"    return {estado}")
+    espacio = {"inf": float("inf")}       # repr() de un umbral infinito
+    exec("\n".join(lineas), espacio)
+    return espacio["guardas"]
+
+
+class StateMachine:
+    def __init__(self, estados, transiciones, umbrales=None, inicial=None, reloj=time.perf_counter):
+        """
+        estados: dict nombre -> acción(dC, dR, ctx) cuyo resultado devuelve step().
+        umbrales: dict nombre -> valor para las guardas que usan un nombre en vez de un número.
+        """
+        self.nombres = tuple(estados)
+        indice = {n: i for i, n in enumerate(self.nombres)}
+        self._acciones = tuple(estados[n] for n in self.nombres)
+        self.reloj = reloj
+        umbrales = umbrales or {}
+
+        salidas = [[] for _ in self.nombres]
+        for desde, guarda, hacia in transiciones:
+            if hacia not in indice:
+                raise ValueError(f"estado destino desconocido: {hacia}")
+            if guarda is None:
+                compilada = (None, None, None, indice[hacia])
+            else:
+                var, op, umbral = guarda
+                if var not in _VARIABLES or op not in _COMPARADORES:
+                    raise ValueError(f"guarda inválida: {guarda}")
+                if isinstance(umbral, str):
+                    umbral = umbrales[umbral]
+                compilada = (var, op, float(umbral), indice[hacia])
+            origenes = range(len(self.nombres)) if desde == "*" else (indice[desde],)
+            for i in origenes:
+                salidas[i].append(compilada)
+        self.tabla = tuple(tuple(s) for s in salidas)
+        self._guardas = tuple(_compilar_guardas(i, s) for i, s in enumerate(self.tabla))
+
+        self._inicial = indice[inicial] if inicial is not None else 0
+        self.reset()
+
+    def reset(self):
+        """Vuelve al estado inicial y limpia la contabilidad de tiempos y transiciones."""
+        n = len(self.nombres)
+        self.actual = self._inicial
+        self.ciclos = [0] * n
+        self.tiempo = [0.0] * n
+        self.entradas = [0] * n
+        self.transiciones = [[0] * n for _ in range(n)]
+        self.entradas[self.actual] = 1
+        self._desde = self.reloj()          # instante de entrada al estado actual
+
+    def __getstate__(self):
+        # Las funciones generadas no se serializan; se recompilan desde la tabla
+        estado = self.__dict__.copy()
+        del estado["_guardas"]
+        return estado
+
+    def __setstate__(self, estado):
+        self.__dict__.update(estado)
+        self._guardas = tuple(_compilar_guardas(i, s) for i, s in enumerate(self.tabla))
+
+    @property
+    def estado(self):
+        return self.nombres[self.actual]
+
+    def step(self, dC, dR, ctx=None):
+        siguiente = self._guardas[self.actual](dC, dR, self)
+        if siguiente != self.actual:
+            self.entrar(siguiente)
+        self.ciclos[siguiente] += 1
+        return self._acciones[siguiente](dC, dR, ctx)
+
+    def entrar(self, siguiente):
+        """Contabiliza el cambio al estado `siguiente` (índice); no cuenta el ciclo."""
+        # El reloj sólo se consulta al cambiar de estado (o si una guarda usa "t")
+        actual = self.actual
+        ahora = self.reloj()
+        self.tiempo[actual] += ahora - self._desde
+        self.transiciones[actual][siguiente] += 1
+        self.entradas[siguiente] += 1
+        self._desde = ahora
+        self.actual = siguiente
+
+    def permanencia(self):
+        """{estado: segundos acumulados}, incluyendo lo que lleva el estado actual."""
+        tiempo = list(self.tiempo)
+        tiempo[self.actual] += self.reloj() - self._desde
+        return dict(zip(self.nombres, tiempo))
+
+    def resumen(self):
+        """{estado: {ciclos, tiempo, entradas}} y {(desde, hacia): n} de las transiciones ocurridas."""
+        tiempo = self.permanencia()
+        estados = {
+            n: {"ciclos": self.ciclos[i], "tiempo": tiempo[n], "entradas": self.entradas[i]}
+            for i, n in enumerate(self.nombres)
+        }
+        pasos = {
+            (self.nombres[i], self.nombres[j]): c
+            for i, fila in enumerate(self.transiciones)
+            for j, c in enumerate(fila)
+            if c
+        }
+        return estados, pasos
+
+    def texto(self):
+        """Una línea con permanencia y ciclos por estado, para el resumen de cada RUN."""
+        estados, pasos = self.resumen()
+        partes = [f"{n}={r['tiempo']:.1f}s/{r['ciclos']}" for n, r in estados.items()]
+        return f"ESTADOS {' '.join(partes)} | transiciones={sum(pasos.values())}"
@@ -0,0 +1,154 @@
+"""
+Estadísticas en streaming con memoria constante para puntuar RUNs.
+
+- Welford: media y varianza del error sin guardar muestras.
+- P²: cuantiles (p. ej. p95 de |e|) con 5 marcadores por cuantil.
+- Máximo |e| y tasa de cruces por cero del error.
+"""
+import math
+
+
+class Welford:
+    def __init__(self):
+        self.reset()
+
+    def reset(self):
+        self.n = 0
+        self.media = 0.0
+        self._m2 = 0.0
+
+    def add(self, x):
+        self.n += 1
+        d = x - self.media
+        self.media += d / self.n
+        self._m2 += d * (x - self.media)
+
+    @property
+    def varianza(self):
+        return self._m2 / (self.n - 1) if self.n > 1 else 0.0
+
+    @property
+    def desvio(self):
+        return math.sqrt(self.varianza)
+
+
+class P2Quantile:
+    """Estimador P² de Jain y Chlamtac para un cuantil p."""
+
+    def __init__(self, p):
+        self.p = float(p)
+        self.reset()
+
+    def reset(self):
+        p = self.p
+        self.n = 0
+        self.q = []
+        self.pos = [1.0, 2.0, 3.0, 4.0, 5.0]
+        self.des = [1.0, 1.0 + 2.0 * p, 1.0 + 4.0 * p, 3.0 + 2.0 * p, 5.0]
+        self.inc = [0.0, p / 2.0, p, (1.0 + p) / 2.0, 1.0]
+
+    def add(self, x):
+        self.n += 1
+        q = self.q
+        if self.n <= 5:
+            q.append(x)
+            if self.n == 5:
+                q.sort()
+            return
+
+        if x < q[0]:
+            q[0] = x
+            k = 0
+        elif x >= q[4]:
+            q[4] = x
+            k = 3
+        else:
+            k = 0
+            while x >= q[k + 1]:
+                k += 1
+
+        pos = self.pos
+        for i in range(k + 1, 5):
+            pos[i] += 1.0
+        for i in range(5):
+            self.des[i] += self.inc[i]
+
+        for i in (1, 2, 3):
+            d = self.des[i] - pos[i]
+            if (d >= 1.0 and pos[i + 1] - pos[i] > 1.0) or (d <= -1.0 and pos[i - 1] - pos[i] < -1.0):
+                s = 1.0 if d > 0 else -1.0
+                # Interpolación parabólica; si se sale del orden, lineal
+                qp = q[i] + s / (pos[i + 1] - pos[i - 1]) * (
+                    (pos[i] - pos[i - 1] + s) * (q[i + 1] - q[i]) / (pos[i + 1] - pos[i])
+                    + (pos[i + 1] - pos[i] - s) * (q[i] - q[i - 1]) / (pos[i] - pos[i - 1])
+                )
+                if not q[i - 1] < qp < q[i + 1]:
+                    j = i + int(s)
+                    qp = q[i] + s * (q[j] - q[i]) / (pos[j] - pos[i])
+                q[i] = qp
+                pos[i] += s
+
+    def valor(self):
+        if self.n == 0:
+            return 0.0
+        if self.n < 5:
+            orden = sorted(self.q)
+            return orden[min(len(orden) - 1, int(round(self.p * (len(orden) - 1))))]
+        return self.q[2]
+
+
+class StreamingStats:
+    """Resumen O(1) por muestra del error de un RUN."""
+
+    def __init__(self, cuantiles=(0.95,)):
+        self.welford = Welford()
+        self.cuantiles = {p: P2Quantile(p) for p in cuantiles}
+        self.reset()
+
+    def reset(self):
+        self.welford.reset()
+        for est in self.cuantiles.values():
+            est.reset()
+        self.max_abs = 0.0
+        self.cruces = 0
+        self._signo = 0
+
+    def add(self, e):
+        # Escalares de NumPy (trazas grabadas) no admiten la resta de bools de abajo
+        e = float(e)
+        self.welford.add(e)
+        a = abs(e)
+        for est in self.cuantiles.values():
+            est.add(a)
+        if a > self.max_abs:
+            self.max_abs = a
+        signo = (e > 0) - (e < 0)
+        if signo:
+            if self._signo and signo != self._signo:
+                self.cruces += 1
+            self._signo = signo
+
+    @property
+    def n(self):
+        return self.welford.n
+
+    def cuantil(self, p):
+        """Cuantil p de |e| (p debe estar entre los configurados)."""
+        return self.cuantiles[p].valor()
+
+    @property
+    def tasa_cruces(self):
+        """Fracción de muestras en que el error cambia de signo."""
+        return self.cruces / (self.n - 1) if self.n > 1 else 0.0
+
+    def resumen(self):
+        out = {
+            "n": self.n,
+            "media": self.welford.media,
+            "desvio": self.welford.desvio,
+            "max_abs": self.max_abs,
+            "tasa_cruces": self.tasa_cruces,
+        }
+        for p in self.cuantiles:
+            out[f"p{int(round(p * 100))}"] = self.cuantil(p)
+        return out
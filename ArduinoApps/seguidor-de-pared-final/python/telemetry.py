@@ -0,0 +1,154 @@
+"""
+Telemetría asíncrona con búfer circular.
+
+El callback de control sólo copia un registro de tamaño fijo en un búfer
+preasignado; un hilo en segundo plano formatea los registros pendientes y
+los envía en lotes a consola, archivo o WebSocket a la cadencia configurada.
+Así el costo del callback no depende de la velocidad de la terminal.
+
+Un sink o un formato que lanza una excepción no detiene al escritor: el
+error se cuenta, se informa como mucho una vez por segundo y el resto de los
+registros y sinks se sigue procesando.
+"""
+import sys
+import threading
+import time
+
+_DATOS = 0
+_MENSAJE = 1
+
+
+def consola():
+    """Sink que escribe el lote completo en stdout con un solo flush."""
+    def escribir(lineas):
+        sys.stdout.write("\n".join(lineas) + "\n")
+        sys.stdout.flush()
+    return escribir
+
+
+def archivo(path):
+    """Sink que agrega el lote a un archivo de texto."""
+    f = open(path, "a", buffering=1 << 16)
+
+    def escribir(lineas):
+        f.write("\n".join(lineas) + "\n")
+        f.flush()
+    escribir.close = f.close
+    return escribir
+
+
+def _stderr(texto):
+    print(texto, file=sys.stderr, flush=True)
+
+
+def websocket(web_ui, evento="telemetria"):
+    """Sink que manda el lote como un solo mensaje por WebUI."""
+    def escribir(lineas):
+        web_ui.send_message(evento, {"lineas": lineas})
+    return escribir
+
+
+class Telemetry:
+    def __init__(self, formato, sinks=None, capacidad=2048, campos=8, periodo=0.1, log=_stderr):
+        self.formato = formato                  # registro (tupla) -> línea de texto
+        self.sinks = list(sinks) if sinks is not None else [consola()]
+        self.log = log                          # log(mensaje) para errores de sinks y formato
+        self.periodo = float(periodo)
+        self.capacidad = int(capacidad)
+        self.campos = int(campos)
+
+        # Cada ranura: [tipo, v0, v1, ...]; se reutilizan, nunca se reasignan
+        self._slots = [[_DATOS] + [None] * self.campos for _ in range(self.capacidad)]
+        self._escritos = 0                      # total de push()
+        self._leidos = 0                        # total drenado por el hilo
+        self.perdidos = 0
+        self.errores = 0                        # llamadas a un sink o al formato que fallaron
+        self._t_log = 0.0
+        self._errores_log = 0                   # errores desde el último mensaje
+        self._lock = threading.Lock()
+        self._parar = threading.Event()
+        self._hilo = None
+
+    # --- Lado del lazo de control ---
+
+    def push(self, *valores):
+        with self._lock:
+            slot = self._slots[self._escritos % self.capacidad]
+            slot[0] = _DATOS
+            slot[1:1 + len(valores)] = valores
+            self._escritos += 1
+
+    def mensaje(self, texto):
+        """Texto libre (cabeceras, resúmenes) en orden con los registros."""
+        with self._lock:
+            slot = self._slots[self._escritos % self.capacidad]
+            slot[0] = _MENSAJE
+            slot[1] = texto
+            self._escritos += 1
+
+    # --- Lado del escritor ---
+
+    def _drenar(self):
+        with self._lock:
+            pendientes = self._escritos - self._leidos
+            if pendientes > self.capacidad:
+                # El escritor se atrasó: se descartan los más viejos
+                self.perdidos += pendientes - self.capacidad
+                self._leidos = self._escritos - self.capacidad
+            lote = [
+                tuple(self._slots[i % self.capacidad][:1 + self.campos])
+                for i in range(self._leidos, self._escritos)
+            ]
+            self._leidos = self._escritos
+
+        lineas = []
+        for reg in lote:
+            if reg[0] == _MENSAJE:
+                lineas.append(reg[1])
+                continue
+            try:
+                lineas.append(self.formato(reg[1:]))
+            except Exception as e:
+                self._error("formato", e)
+        if lineas:
+            for i, sink in enumerate(self.sinks):
+                try:
+                    sink(lineas)
+                except Exception as e:
+                    self._error(f"sink {i}", e)
+
+    def _error(self, origen, e):
+        """Cuenta el error y lo registra como mucho una vez por segundo."""
+        self.errores += 1
+        self._errores_log += 1
+        ahora = time.perf_counter()
+        if ahora - self._t_log >= 1.0:
+            extra = f" (+{self._errores_log - 1} más)" if self._errores_log > 1 else ""
+            try:
+                self.log(f"[telemetria] error en {origen}: {e!r}{extra}")
+            except Exception:
+                pass
+            self._t_log = ahora
+            self._errores_log = 0
+
+    def _bucle(self):
+        while not self._parar.wait(self.periodo):
+            self._drenar()
+        self._drenar()
+
+    def start(self):
+        if self._hilo is None:
+            self._hilo = threading.Thread(target=self._bucle, name="telemetria", daemon=True)
+            self._hilo.start()
+        return self
+
+    def close(self):
+        """Detiene el hilo tras escribir lo pendiente."""
+        if self._hilo is not None:
+            self._parar.set()
+            self._hilo.join()
+            self._hilo = None
+        for sink in self.sinks:
+            cerrar = getattr(sink, "close", None)
+            if cerrar is not None:
+                cerrar()
@@ -0,0 +1,19 @@
+"""Pruebas de archive.py: los RUN abortados se guardan marcados y no cuentan para mejores()."""
+from archive import TuningArchive
+
+BASE = {"base": 150, "kp": 1.5, "kd": 10.0, "corr_max": 100, "zona_muerta": 1.0}
+
+
+def test_abortados_fuera_de_mejores(tmp_path):
+    archivo = TuningArchive(str(tmp_path / "archivo.db"))
+    completo = dict(BASE, kp=2.0)
+    cortado = dict(BASE, kp=3.0)
+    entradas = [(completo, 2.0, 1.5, 0.1, 0.0, 0), (cortado, 0.4, 0.4, 0.0, 0.0, 0)]
+    archivo.agregar(entradas, 15.0, abortados=[False, True])
+    # Sin marcas, todas las entradas cuentan como completas
+    archivo.agregar(entradas[:1], 15.0)
+
+    mejores = archivo.mejores(15.0, 150)
+    assert [(p["kp"], c, n) for p, c, n in mejores] == [(2.0, 2.0, 2)]
+    assert archivo.db.execute("SELECT COUNT(*) FROM runs WHERE abortado = 1").fetchone() == (1,)
+    archivo.close()
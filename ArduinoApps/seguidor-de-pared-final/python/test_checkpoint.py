@@ -0,0 +1,153 @@
+"""Pruebas de checkpoint.py: recuperación desde instantánea + WAL con la última línea cortada."""
+import json
+
+from checkpoint import TunerCheckpoint
+from tuner import TwiddleTuner
+
+BASE = {"base": 150, "kp": 1.5, "kd": 10.0, "corr_max": 100, "zona_muerta": 1.0}
+
+
+def correr(tuner, checkpoint, runs):
+    for r in range(runs):
+        for i in range(50):
+            e = (1.0 + tuner.params["kp"] * 0.1) * (-1) ** i + r * 0.01
+            tuner.observe("ok", (0.0, e, 0.0, 0.0), 120, 130)
+        tuner.end_run()
+        checkpoint.guardar(tuner)
+
+
+def como_json(tuner):
+    return json.loads(json.dumps({"estado": tuner.estado(), "hist": tuner.history}))
+
+
+def test_reanuda_con_instantanea_y_wal(tmp_path):
+    path = str(tmp_path / "tuner.json")
+    tuner = TwiddleTuner(BASE)
+    tuner.start()
+    cp = TunerCheckpoint(path, compactar_cada=4)
+    correr(tuner, cp, 7)                    # Una compactación y tres líneas en el WAL
+    cp.close()
+
+    otro = TwiddleTuner(BASE)
+    otro.start()
+    assert TunerCheckpoint(path).cargar(otro)
+    assert como_json(otro) == como_json(tuner)
+    assert len(otro.history) == 7
+
+
+def test_ultima_linea_cortada_se_ignora(tmp_path):
+    path = str(tmp_path / "tuner.json")
+    tuner = TwiddleTuner(BASE)
+    tuner.start()
+    cp = TunerCheckpoint(path, compactar_cada=100)
+    correr(tuner, cp, 3)
+    esperado = como_json(tuner)
+    correr(tuner, cp, 1)
+    cp.close()
+
+    # Corte de energía a mitad de la cuarta línea
+    with open(cp.wal, encoding="utf-8") as f:
+        lineas = f.readlines()
+    with open(cp.wal, "w", encoding="utf-8") as f:
+        f.writelines(lineas[:3])
+        f.write(lineas[3][: len(lineas[3]) // 2])
+
+    otro = TwiddleTuner(BASE)
+    otro.start()
+    assert TunerCheckpoint(path).cargar(otro)
+    assert como_json(otro) == esperado
+
+
+def test_sin_checkpoint(tmp_path):
+    tuner = TwiddleTuner(BASE)
+    tuner.start()
+    assert not TunerCheckpoint(str(tmp_path / "tuner.json")).cargar(tuner)
+
+
+def test_corte_entre_instantanea_y_vaciado_del_wal(tmp_path):
+    path = str(tmp_path / "tuner.json")
+    tuner = TwiddleTuner(BASE)
+    tuner.start()
+    cp = TunerCheckpoint(path, compactar_cada=100)
+    correr(tuner, cp, 3)
+    cp.sync()
+    with open(cp.wal, encoding="utf-8") as f:
+        viejo = f.read()
+
+    # Corte justo después de os.replace(): la instantánea ya tiene los 3 RUNs
+    # pero el WAL conserva sus líneas
+    cp.compactar(tuner)
+    cp.close()
+    with open(cp.wal, "w", encoding="utf-8") as f:
+        f.write(viejo)
+
+    otro = TwiddleTuner(BASE)
+    otro.start()
+    cp2 = TunerCheckpoint(path, compactar_cada=100)
+    assert cp2.cargar(otro)
+    assert len(otro.history) == 3
+    assert como_json(otro) == como_json(tuner)
+
+    # La numeración sigue después de la recarga: un RUN más y otra recarga
+    correr(otro, cp2, 1)
+    cp2.close()
+    tercero = TwiddleTuner(BASE)
+    tercero.start()
+    assert TunerCheckpoint(path).cargar(tercero)
+    assert len(tercero.history) == 4
+    assert como_json(tercero) == como_json(otro)
+
+
+def test_reinicio_del_tuner_reemplaza_el_historial(tmp_path):
+    path = str(tmp_path / "tuner.json")
+    tuner = TwiddleTuner(BASE)
+    tuner.start()
+    cp = TunerCheckpoint(path, compactar_cada=100)
+    correr(tuner, cp, 3)
+    tuner.start()
+    correr(tuner, cp, 2)
+    cp.close()
+
+    otro = TwiddleTuner(BASE)
+    otro.start()
+    assert TunerCheckpoint(path).cargar(otro)
+    assert como_json(otro) == como_json(tuner)
+    assert len(otro.history) == 2
+
+
+def test_runs_abortados_aparte_del_historial(tmp_path):
+    path = str(tmp_path / "tuner.json")
+    tuner = TwiddleTuner(BASE, racing=True, muestras_max=50)
+    tuner.start()
+    cp = TunerCheckpoint(path, compactar_cada=3)
+    correr(tuner, cp, 2)
+    # Un RUN mucho peor: el modo carrera lo corta a la mitad
+    for i in range(25):
+        tuner.observe("ok", (0.0, 50.0 * (-1) ** i, 0.0, 0.0), 120, 130)
+    assert tuner.abortar
+    tuner.end_run()
+    cp.guardar(tuner)
+    correr(tuner, cp, 2)
+    cp.close()
+
+    # Cada entrada conserva los seis campos; la marca va en runs_abortados
+    assert {len(h) for h in tuner.history} == {6}
+    assert tuner.runs_abortados == {2} and tuner.abortado(2) and not tuner.abortado(-1)
+    assert len(tuner.runs_completos()) == 4
+
+    otro = TwiddleTuner(BASE)
+    otro.start()
+    assert TunerCheckpoint(path).cargar(otro)
+    assert otro.runs_abortados == {2}
+    assert como_json(otro) == como_json(tuner)
+
+
+def test_checkpoint_con_marca_en_el_historial(tmp_path):
+    # Formato anterior: la marca de abortado como séptimo campo de cada entrada
+    tuner = TwiddleTuner(BASE)
+    estado = tuner.estado()
+    del estado["runs_abortados"]
+    viejo = [(dict(BASE), 1.0, 1.0, 0.0, 0.0, 0, False), (dict(BASE), 0.5, 0.5, 0.0, 0.0, 0, True)]
+    tuner.cargar_estado(estado, viejo)
+    assert [len(h) for h in tuner.history] == [6, 6]
+    assert tuner.runs_abortados == {1}
@@ -0,0 +1,63 @@
+"""Pruebas de controller.py: la ley tabulada de WallFollowerLUT contra WallFollowerP."""
+import random
+
+from controller import PDParams, WallFollowerP
+from simulator import RobotSim
+
+PARAMS = {"base": 150, "kp": 1.5, "kd": 10.0, "corr_max": 100, "zona_muerta": 1.0}
+
+
+def traza(n=3000, semilla=1):
+    sim = RobotSim(sin_eco=400.0, semilla=semilla)
+    ctrl = WallFollowerP(distancia_obstaculo=15.0)
+    sim.reset_aleatorio()
+    muestras = []
+    for _ in range(n):
+        dC, dR = sim.leer_sensores()
+        muestras.append((dC, dR))
+        pwm_izq, pwm_der, _, _ = ctrl.step(dC, dR, PARAMS)
+        sim.aplicar(pwm_izq, pwm_der)
+        if sim.choque:
+            sim.reset_aleatorio()
+    return muestras
+
+
+def test_tabla_sigue_a_la_ley_exacta():
+    muestras = traza()
+    lut = WallFollowerP(distancia_obstaculo=15.0).compilar(PARAMS)
+    informe = lut.informe_precision(muestras)
+    assert informe["mismo_modo"] == 1.0
+    assert informe["dif_max_pwm"] <= min(1, informe["cota_pwm"])
+    assert informe["exactas"] > 0.5
+    assert informe["borde_zona_muerta"] <= 0.01 * informe["muestras"]
+
+
+def test_misma_contabilidad_de_estados():
+    muestras = traza()
+    exacto = WallFollowerP(distancia_obstaculo=15.0)
+    lut = exacto.compilar(PARAMS)
+    p = PDParams(PARAMS)
+    for dC, dR in muestras:
+        exacto.step(dC, dR, p)
+        lut.step(dC, dR)
+    assert lut.fsm.ciclos == exacto.fsm.ciclos
+    assert lut.fsm.transiciones == exacto.fsm.transiciones
+
+    # reset() vuelve a empezar el filtro y los contadores
+    lut.reset()
+    assert sum(lut.fsm.ciclos) == 0
+    primera = lut.step(*muestras[0])
+    lut.reset()
+    assert lut.step(*muestras[0]) == primera
+
+
+def test_derivadas_grandes_y_ganancias_extremas():
+    """Saltos bruscos de dR (derivada recortada en la tabla) con kd chico y grande."""
+    rng = random.Random(2)
+    saltos = [(100.0, rng.choice((2.0, 40.0, 120.0, 290.0)) + rng.uniform(-1.0, 1.0)) for _ in range(2000)]
+    for kd in (0.0, 0.5, 60.0):
+        params = dict(PARAMS, kd=kd, kp=15.0 if kd else 0.5)
+        lut = WallFollowerP(distancia_obstaculo=15.0).compilar(params)
+        informe = lut.informe_precision(saltos)
+        assert informe["mismo_modo"] == 1.0
+        assert informe["dif_max_pwm"] <= informe["cota_pwm"]
@@ -0,0 +1,36 @@
+"""Pruebas de mpc.py: guarda de presupuesto e intervalo medido."""
+from controller import PDParams, WallFollowerP
+from mpc import WallFollowerMPC
+
+PARAMS = PDParams({"base": 150, "kp": 1.5, "kd": 10.0, "corr_max": 100, "zona_muerta": 1.0})
+# Se aleja de la pared: fuera de la zona muerta, así cada ciclo corre el rollout
+MUESTRAS = [(200.0, 15.0 + 0.8 * k) for k in range(30)]
+
+
+def test_ciclo_fuera_de_presupuesto_aplica_el_pd():
+    mpc = WallFollowerMPC(distancia_obstaculo=15.0, presupuesto=0.0, enfriamiento=3)
+    pd = WallFollowerP(distancia_obstaculo=15.0)
+    for dC, dR in MUESTRAS:
+        # Ningún ciclo entra en presupuesto: la salida es siempre la del PD
+        assert mpc.step(dC, dR, PARAMS) == pd.step(dC, dR, PARAMS)
+    assert mpc.ciclos_mpc == 0
+    assert mpc.ciclos_pd == len(MUESTRAS)
+    # Un overrun y 3 ciclos de enfriamiento, una y otra vez
+    assert mpc.overruns == (len(MUESTRAS) + 3) // 4
+
+
+def test_intervalo_medido_y_pausas():
+    a = WallFollowerMPC(distancia_obstaculo=15.0)
+    b = WallFollowerMPC(distancia_obstaculo=15.0)
+    for dC, dR in MUESTRAS[:5]:
+        a.step(dC, dR, PARAMS)
+        b.step(dC, dR, PARAMS, dt=0.3)
+    # Con el doble de tiempo el mismo PWM gira el doble
+    assert abs(b.rumbo) > abs(a.rumbo)
+
+    # Un intervalo que incluye la pausa entre RUNs se toma como el nominal
+    c = WallFollowerMPC(distancia_obstaculo=15.0)
+    d = WallFollowerMPC(distancia_obstaculo=15.0)
+    for (dC, dR), dt in zip(MUESTRAS[:5], (10.0, None, None, None, None)):
+        assert c.step(dC, dR, PARAMS, dt=dt) == d.step(dC, dR, PARAMS)
+    assert c.rumbo == d.rumbo
@@ -0,0 +1,61 @@
+"""Pruebas de runtime.py: buzón de último valor, lazo por eventos y un handler que lanza excepciones."""
+import time
+
+from runtime import ControlRuntime, Mailbox
+
+
+def esperar(condicion, timeout=1.0):
+    fin = time.perf_counter() + timeout
+    while not condicion() and time.perf_counter() < fin:
+        time.sleep(0.005)
+    return condicion()
+
+
+def test_buzon_guarda_solo_el_ultimo():
+    buzon = Mailbox()
+    for i in range(5):
+        buzon.put(i)
+    valor, _ = buzon.take(0.1)
+    assert valor == 4
+    assert buzon.sobrescritas == 4
+    assert buzon.take(0.01) is None
+
+
+def test_hilo_sobrevive_a_un_handler_que_lanza():
+    vistas = []
+    mensajes = []
+
+    def handler(x):
+        if x < 0:
+            raise ValueError("muestra inválida")
+        vistas.append(x)
+
+    rt = ControlRuntime(handler, periodo=0.01, max_edad=1.0, log=mensajes.append).start()
+    try:
+        rt.recibir(-1)
+        assert esperar(lambda: rt.errores == 1)
+        rt.recibir(-2)
+        assert esperar(lambda: rt.errores == 2)
+        rt.recibir(7)
+        assert esperar(lambda: vistas == [7])
+        assert rt._hilo.is_alive()
+        # Dos errores dentro del mismo segundo: un solo mensaje
+        assert len(mensajes) == 1
+        assert rt.stats()["procesadas"] == 3
+    finally:
+        rt.stop()
+
+
+def test_lazo_por_eventos():
+    llegadas = []
+    # Con el intervalo de los seguidores de pared: cada muestra se procesa al
+    # llegar, sin esperar a que se cumpla `periodo`
+    rt = ControlRuntime(lambda x: llegadas.append(time.perf_counter()), periodo=0.15, max_edad=0.075).start()
+    try:
+        for i in range(3):
+            t = time.perf_counter()
+            rt.recibir(i)
+            assert esperar(lambda: len(llegadas) == i + 1)
+            assert llegadas[-1] - t < 0.05
+    finally:
+        rt.stop()
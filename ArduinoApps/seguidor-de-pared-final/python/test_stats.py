@@ -0,0 +1,59 @@
+"""Pruebas de stats.py: StreamingStats contra NumPy sobre las mismas muestras."""
+import numpy as np
+
+from stats import StreamingStats
+
+
+def test_coincide_con_numpy():
+    rng = np.random.default_rng(0)
+    errores = rng.normal(0.5, 3.0, size=20000)
+    stats = StreamingStats(cuantiles=(0.5, 0.95))
+    for e in errores.tolist():
+        stats.add(e)
+
+    r = stats.resumen()
+    assert r["n"] == len(errores)
+    assert np.isclose(r["media"], errores.mean())
+    assert np.isclose(r["desvio"], errores.std(ddof=1))
+    assert r["max_abs"] == np.abs(errores).max()
+    signos = np.sign(errores)
+    assert np.isclose(r["tasa_cruces"], np.count_nonzero(signos[1:] != signos[:-1]) / (len(errores) - 1))
+    # P² es aproximado: dentro del 2 % del cuantil exacto
+    a = np.abs(errores)
+    assert abs(r["p50"] - np.quantile(a, 0.5)) < 0.02 * np.quantile(a, 0.5)
+    assert abs(r["p95"] - np.quantile(a, 0.95)) < 0.02 * np.quantile(a, 0.95)
+
+
+def test_pocas_muestras_y_reset():
+    stats = StreamingStats()
+    for e in (1.0, -2.0, 0.0, 3.0):
+        stats.add(e)
+    assert stats.cuantil(0.95) == 3.0
+    assert stats.cruces == 2                # El cero no cuenta como cambio de signo
+    stats.reset()
+    assert stats.resumen() == {"n": 0, "media": 0.0, "desvio": 0.0, "max_abs": 0.0,
+                               "tasa_cruces": 0.0, "p95": 0.0}
+
+
+def test_acepta_escalares_de_numpy():
+    errores = np.array([1.5, -2.0, 0.0, 3.25, -0.5])
+    desde_numpy = StreamingStats()
+    desde_lista = StreamingStats()
+    for e in errores:                      # numpy.float64, sin .tolist()
+        desde_numpy.add(e)
+    for e in errores.tolist():
+        desde_lista.add(e)
+    assert desde_numpy.resumen() == desde_lista.resumen()
+    assert desde_numpy.cruces == 3
+
+
+def test_sweep_tuner_con_traza_de_numpy():
+    from tuner import SweepTuner
+
+    tuner = SweepTuner([{"base": 150, "kp": 1.5, "kd": 10.0, "corr_max": 100, "zona_muerta": 1.0}])
+    tuner.start()
+    for e in np.linspace(-3.0, 3.0, 50):
+        tuner.observe("ok", (15.0 + e, e, np.float64(0.1), 0), 150, 150)
+    assert tuner.metricas()["n"] == 50
+    tuner.end_run()
+    assert np.isclose(tuner.results[0][2], np.abs(np.linspace(-3.0, 3.0, 50)).mean())
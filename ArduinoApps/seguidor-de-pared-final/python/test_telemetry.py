@@ -0,0 +1,34 @@
+"""Pruebas de telemetry.py: un sink o un formato que lanzan no detienen al escritor."""
+from telemetry import Telemetry
+
+
+def test_sink_que_lanza_no_corta_el_drenado():
+    recibidas = []
+    mensajes = []
+
+    def roto(lineas):
+        raise OSError("socket cerrado")
+
+    tel = Telemetry(lambda r: f"{r[0]}", sinks=[roto, recibidas.extend], campos=1, log=mensajes.append)
+    tel.push(1)
+    tel._drenar()
+    tel.mensaje("hola")
+    tel.push(2)
+    tel._drenar()
+
+    assert recibidas == ["1", "hola", "2"]
+    assert tel.errores == 2
+    # Dos errores dentro del mismo segundo: un solo mensaje
+    assert len(mensajes) == 1 and "sink 0" in mensajes[0]
+
+
+def test_formato_que_lanza_descarta_solo_ese_registro():
+    recibidas = []
+    tel = Telemetry(lambda r: f"{1 / r[0]:.1f}", sinks=[recibidas.extend], campos=1, log=lambda m: None)
+    tel.start()
+    tel.push(0)
+    tel.push(2)
+    tel.close()
+
+    assert recibidas == ["0.5"]
+    assert tel.errores == 1
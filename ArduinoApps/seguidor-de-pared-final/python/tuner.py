@@ -1,10 +1,18 @@
+from controller import PDParams
+from stats import StreamingStats
+
+
 class SweepTuner:
+    W_P95 = 0.0   # peso opcional del p95 de |e| en el costo
+
     def __init__(self, candidates):
         self.candidates = list(candidates)
         self.idx = 0
         self.params = self.candidates[0]
         self.finished = False
         self.results = []
+        self._bound = None
+        self.stats = StreamingStats()
 
         self._prev_e = None
         self._sum_abs_e = 0.0
@@ -16,9 +24,17 @@ class SweepTuner:
     def start(self):
         self.idx = 0
         self.params = self.candidates[self.idx]
+        self._bound = None
         self.finished = False
         self._reset_metrics()
 
+    @property
+    def bound(self):
+        """Parámetros del candidato actual como PDParams, convertidos una vez por RUN."""
+        if self._bound is None:
+            self._bound = PDParams(self.params)
+        return self._bound
+
     def _reset_metrics(self):
         self._prev_e = None
         self._sum_abs_e = 0.0
@@ -26,6 +42,7 @@ class SweepTuner:
         self._sat = 0
         self._n = 0
         self._bad = 0
+        self.stats.reset()
 
     def observe(self, mode, info, pwm_izq, pwm_der):
         if mode != "ok" or info is None: # Añadimos protección contra None
@@ -35,6 +52,7 @@ class SweepTuner:
         # CAMBIO: Ahora desempacamos 4 valores (añadimos _ para ignorar la derivada aquí)
         dR_f, e, derivative, ajuste = info 
         
+        self.stats.add(e)
         self._sum_abs_e += abs(e)
         if self._prev_e is not None:
             self._sum_abs_de += abs(e - self._prev_e)
@@ -54,6 +72,7 @@ class SweepTuner:
             return
 
         self.params = self.candidates[self.idx]
+        self._bound = None
         self._reset_metrics()
 
     def _score(self):
@@ -66,15 +85,27 @@ class SweepTuner:
         bad = self._bad                      # Veces que perdió la pared o chocó
         
         cost = mae + 2.0 * osc + 10.0 * sat + 50.0 * bad
+        if self.W_P95:
+            cost += self.W_P95 * self.stats.cuantil(0.95)
         return (cost, mae, osc, sat, bad)
 
+    def metricas(self):
+        """Estadísticas completas del RUN en curso (media, desvío, p95, max, cruces)."""
+        return self.stats.resumen()
+
     def best(self):
         if not self.results:
             return None
         return min(self.results, key=lambda x: x[1])
 
 class TwiddleTuner:
-    def __init__(self, base_params, keys=("kp", "kd", "corr_max"), deltas=(0.5, 2.0, 10.0), tol=0.05, reps=2, bounds=None):
+    # Pesos de la función de costo (ver _score)
+    W_OSC = 3.0
+    W_SAT = 10.0
+    W_BAD = 100.0
+    W_P95 = 0.0   # p. ej. 0.5 para penalizar los picos de error además del promedio
+
+    def __init__(self, base_params, keys=("kp", "kd", "corr_max"), deltas=(0.5, 2.0, 10.0), tol=0.05, reps=2, bounds=None, racing=False, muestras_max=None):
         self.params = dict(base_params)
         self.best_params = dict(self.params)
         self.base_params = dict(base_params)
@@ -93,6 +124,19 @@ class TwiddleTuner:
         self._rep_cost_sum = 0.0
         self.finished = False
         self.history = []
+        self._bound = None
+
+        # Modo carrera: corta el RUN en cuanto no puede superar a best_cost.
+        # muestras_max debe ser una cota superior de muestras por RUN; sin ella
+        # sólo se usa el término de fallos, que nunca decrece.
+        self.racing = bool(racing)
+        self.muestras_max = muestras_max
+        self.abortar = False
+        self.abortados = 0
+        # Índices de `history` de los RUN abortados. Va aparte para que cada
+        # entrada siga siendo (params, cost, mae, osc, sat, bad)
+        self.runs_abortados = set()
+        self.stats = StreamingStats()
         
         self._reset_metrics()
 
@@ -104,6 +148,8 @@ class TwiddleTuner:
         self._sat = 0
         self._n = 0
         self._bad = 0
+        self.abortar = False
+        self.stats.reset()
 
     def start(self):
         """Reinicia el tuner al estado inicial."""
@@ -116,17 +162,30 @@ class TwiddleTuner:
         self._rep_count = 0
         self._rep_cost_sum = 0.0
         self.history.clear()
+        self._bound = None
+        self.abortados = 0
+        self.runs_abortados.clear()
         self._reset_metrics()
 
+    @property
+    def bound(self):
+        """Parámetros actuales como PDParams; se reconstruyen sólo cuando Twiddle los cambia."""
+        if self._bound is None:
+            self._bound = PDParams(self.params)
+        return self._bound
+
     def observe(self, mode, info, pwm_izq, pwm_der):
         """Recibe datos del controlador y actualiza las estadísticas del RUN."""
         if mode != "ok" or info is None:
             self._bad += 1
+            if self.racing:
+                self._revisar_carrera()
             return
 
 
         dR_f, e, derivative, ajuste = info
         
+        self.stats.add(e)
         self._sum_abs_e += abs(e)
         if self._prev_e is not None:
             # Esto calcula la oscilación (cambio del error)
@@ -138,6 +197,25 @@ class TwiddleTuner:
         if pwm_izq <= 5 or pwm_izq >= 250 or pwm_der <= 5 or pwm_der >= 250:
             self._sat += 1
 
+        if self.racing:
+            self._revisar_carrera()
+
+    def cota_inferior(self):
+        """Costo mínimo que puede alcanzar el RUN actual, pase lo que pase en lo que queda."""
+        cota = self.W_BAD * self._bad
+        if self.muestras_max:
+            n_max = max(self.muestras_max, self._n)
+            suma = self._sum_abs_e + self.W_OSC * self._sum_abs_de + self.W_SAT * self._sat
+            cota += suma / n_max
+        return cota
+
+    def _revisar_carrera(self):
+        # Las repeticiones que faltan cuestan como mínimo 0
+        if self.abortar or self.best_cost == float("inf"):
+            return
+        if (self._rep_cost_sum + self.cota_inferior()) / self.reps >= self.best_cost:
+            self.abortar = True
+
     def _score(self):
         """Calcula el costo del desempeño actual."""
         if self._n == 0:
@@ -150,9 +228,15 @@ class TwiddleTuner:
         
         # FUNCIÓN DE COSTO: Ajustamos pesos para velocidad 150
         # mae (precisión) + osc (estabilidad) + sat (esfuerzo motor) + bad (seguridad)
-        cost = mae + 3.0 * osc + 10.0 * sat + 100.0 * bad
+        cost = mae + self.W_OSC * osc + self.W_SAT * sat + self.W_BAD * bad
+        if self.W_P95:
+            cost += self.W_P95 * self.stats.cuantil(0.95)
         return (cost, mae, osc, sat, bad)
 
+    def metricas(self):
+        """Estadísticas completas del RUN en curso (media, desvío, p95, max, cruces)."""
+        return self.stats.resumen()
+
     def _apply_bounds(self, k):
         """Mantiene los parámetros dentro de los límites definidos."""
         if k in self.bounds:
@@ -164,22 +248,31 @@ class TwiddleTuner:
         """Modifica un parámetro específico."""
         self.params[k] = float(self.params[k]) + float(amount)
         self._apply_bounds(k)
+        self._bound = None
 
     def end_run(self):
         """Finaliza un RUN y decide el siguiente paso de Twiddle."""
         cost, mae, osc, sat, bad = self._score()
+        abortado = self.abortar
 
         self._rep_cost_sum += cost
         self._rep_count += 1
         
-        # Guardamos en el historial para análisis posterior
+        # Guardamos en el historial para análisis posterior; un RUN abortado por
+        # el modo carrera queda en runs_abortados porque su costo es parcial
+        if abortado:
+            self.runs_abortados.add(len(self.history))
         self.history.append((dict(self.params), cost, mae, osc, sat, bad))
         self._reset_metrics()
 
-        if self._rep_count < self.reps:
+        if abortado:
+            # Ya no puede ganar: se saltan las repeticiones y cuenta como peor
+            self.abortados += 1
+            avg_cost = float("inf")
+        elif self._rep_count < self.reps:
             return "repeat"
-
-        avg_cost = self._rep_cost_sum / self.reps
+        else:
+            avg_cost = self._rep_cost_sum / self.reps
         self._rep_cost_sum = 0.0
         self._rep_count = 0
 
@@ -234,3 +327,142 @@ class TwiddleTuner:
     def best(self):
         return dict(self.best_params), self.best_cost
 
+    def abortado(self, i):
+        """True si history[i] es un RUN abortado (costo parcial); acepta índices negativos."""
+        if i < 0:
+            i += len(self.history)
+        return i in self.runs_abortados
+
+    def runs_completos(self):
+        """Entradas de history sin los RUN abortados, para mínimos y promedios."""
+        return [h for i, h in enumerate(self.history) if i not in self.runs_abortados]
+
+    def sembrar(self, base_params, deltas):
+        """Arranque en caliente: nuevo punto de partida y deltas, y start()."""
+        self.base_params = dict(base_params)
+        self.deltas = [float(d) for d in deltas]
+        self.start()
+
+    # Campos que definen dónde va la búsqueda (sin las métricas del RUN en curso)
+    _ESTADO = ("params", "best_params", "best_cost", "deltas", "i", "phase", "_rep_count", "_rep_cost_sum", "finished", "abortados", "runs_abortados")
+
+    def estado(self):
+        """Copia serializable (JSON) del estado de la búsqueda, sin el historial."""
+        out = {}
+        for k in self._ESTADO:
+            v = getattr(self, k)
+            if isinstance(v, set):
+                v = sorted(v)
+            out[k] = dict(v) if isinstance(v, dict) else list(v) if isinstance(v, list) else v
+        return out
+
+    def cargar_estado(self, estado, history=()):
+        """Restaura un estado de estado(); el RUN en curso empieza de cero."""
+        self.runs_abortados = set()
+        for k in self._ESTADO:
+            if k in estado:
+                v = estado[k]
+                if k == "runs_abortados":
+                    v = set(v)
+                setattr(self, k, dict(v) if isinstance(v, dict) else list(v) if isinstance(v, list) else v)
+        # Algunos checkpoints guardaron la marca de abortado como séptimo campo
+        for i, h in enumerate(history):
+            if len(h) > 6 and h[6]:
+                self.runs_abortados.add(i)
+        self.history = [(dict(h[0]),) + tuple(h[1:6]) for h in history]
+        self._bound = None
+        self._reset_metrics()
+
+
+class ParallelTwiddleTuner(TwiddleTuner):
+    """
+    Twiddle por lotes para evaluación fuera del robot (simulador o trazas).
+
+    En cada ronda prueba +d y -d para todas las llaves, con todas sus
+    repeticiones, en un pool de procesos. Después aplica las reglas de Twiddle
+    a la vez: las llaves que mejoran crecen su delta (x1.1), las demás lo
+    encogen (x0.9), y el centro se mueve a la mejor prueba si supera a best_cost.
+
+    `evaluar(params, semilla)` debe devolver (cost, mae, osc, sat, bad) y ser
+    serializable con pickle (función de módulo o instancia de clase).
+    """
+
+    def __init__(self, base_params, keys=("kp", "kd", "corr_max"), deltas=(0.5, 2.0, 10.0), tol=0.05, reps=2, bounds=None, procesos=None):
+        super().__init__(base_params, keys, deltas, tol, reps, bounds)
+        self.procesos = procesos
+        self.rondas = 0
+
+    def _acotar(self, k, v):
+        if k in self.bounds:
+            lo, hi = self.bounds[k]
+            v = max(lo, min(hi, v))
+        return v
+
+    def _evaluar_lote(self, pool, evaluar, candidatos):
+        """Evalúa cada candidato `reps` veces y devuelve su costo promedio."""
+        # Misma semilla por repetición para todos los candidatos de la ronda
+        semillas = [self.rondas * self.reps + r for r in range(self.reps)]
+        trabajos = [(p, s) for p in candidatos for s in semillas]
+        resultados = list(pool.map(evaluar, *zip(*trabajos)))
+
+        promedios = []
+        for j, p in enumerate(candidatos):
+            reps = resultados[j * self.reps:(j + 1) * self.reps]
+            for cost, mae, osc, sat, bad in reps:
+                self.history.append((dict(p), cost, mae, osc, sat, bad))
+            promedios.append(sum(r[0] for r in reps) / self.reps)
+        return promedios
+
+    def ronda(self, pool, evaluar):
+        """Ejecuta una ronda completa; devuelve "done" o "next" como end_run()."""
+        if sum(self.deltas) < self.tol:
+            self.finished = True
+            return "done"
+
+        candidatos = []
+        if self.best_cost == float("inf"):
+            candidatos.append(dict(self.params))
+        sondas = []
+        for i, k in enumerate(self.keys):
+            for signo in (+1, -1):
+                p = dict(self.params)
+                p[k] = self._acotar(k, float(p[k]) + signo * self.deltas[i])
+                sondas.append(i)
+                candidatos.append(p)
+
+        costos = self._evaluar_lote(pool, evaluar, candidatos)
+        if len(costos) > len(sondas):
+            self.best_cost = costos.pop(0)
+            self.best_params = dict(self.params)
+            candidatos.pop(0)
+
+        mejoro = [False] * len(self.keys)
+        mejor_j = None
+        for j, (i, cost) in enumerate(zip(sondas, costos)):
+            if cost < self.best_cost:
+                mejoro[i] = True
+                if mejor_j is None or cost < costos[mejor_j]:
+                    mejor_j = j
+
+        for i in range(len(self.keys)):
+            self.deltas[i] *= 1.1 if mejoro[i] else 0.9
+
+        if mejor_j is not None:
+            self.best_cost = costos[mejor_j]
+            self.best_params = dict(candidatos[mejor_j])
+            self.params = dict(candidatos[mejor_j])
+            self._bound = None
+
+        self.rondas += 1
+        return "next"
+
+    def run(self, evaluar, max_rondas=1000):
+        """Corre rondas hasta que la suma de deltas baja de `tol`."""
+        from concurrent.futures import ProcessPoolExecutor
+
+        self.start()
+        self.rondas = 0
+        with ProcessPoolExecutor(max_workers=self.procesos) as pool:
+            while not self.finished and self.rondas < max_rondas:
+                self.ronda(pool, evaluar)
+        return self.best()
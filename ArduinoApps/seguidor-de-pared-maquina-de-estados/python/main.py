@@ -1,7 +1,14 @@
+import atexit
+import os
 import time
 import sys
 from arduino.app_utils import App, Bridge
 
+from recorder import Recorder
+from runtime import ControlRuntime
+from statemachine import StateMachine
+from telemetry import Telemetry, consola
+
 print("--- Robot Seguidor de Pared (Control P) ---")
 sys.stdout.flush()
 
@@ -16,19 +23,33 @@ ZONA_MUERTA = 1.0
 
 dR_f = None
 
+DIR_REGISTROS = os.path.join(os.path.dirname(os.path.abspath(__file__)), "registros")
+recorder = Recorder(os.path.join(DIR_REGISTROS, time.strftime("distancias_%Y%m%d_%H%M%S.bin")))
+atexit.register(recorder.close)
+
+def formato_muestra(reg):
+    dC, dR, dR_f, error, pwm_izq, pwm_der = reg
+    return f">> C: {dC:5.1f} | R: {dR:5.1f} | FILTRO: {dR_f:5.1f} | ERROR: {error:5.1f} | M: {pwm_izq}/{pwm_der}"
+
+# El callback sólo encola la muestra; un hilo imprime en lotes a 10 Hz
+telemetria = Telemetry(formato_muestra, sinks=[consola()], capacidad=1024, campos=6, periodo=0.1).start()
+atexit.register(telemetria.close)
+
 def clip(x, lo, hi):
     return max(lo, min(hi, x))
 
-def al_recibir_distancias(dC, dR):
-    global dR_f
+# --- Estados: cada acción devuelve (pwm_izq, pwm_der, modo) ---
+PWM_OBSTACULO = (-80, 80)     # giro en el lugar a la izquierda
+PWM_BUSCAR = (140, 80)        # curva a la derecha buscando la pared
 
-    if dC <= DISTANCIA_OBSTACULO:
-        Bridge.notify("motores", -80, 80)
-        return
+def girar_obstaculo(dC, dR, ctx):
+    return PWM_OBSTACULO[0], PWM_OBSTACULO[1], "obst"
 
-    if dR >= SIN_PARED_UMBRAL:
-        Bridge.notify("motores", 140, 80)
-        return
+def buscar_pared(dC, dR, ctx):
+    return PWM_BUSCAR[0], PWM_BUSCAR[1], "buscar"
+
+def seguir_pared(dC, dR, ctx):
+    global dR_f
 
     if dR_f is None:
         dR_f = dR
@@ -44,12 +65,37 @@ def al_recibir_distancias(dC, dR):
     pwm_izq = int(clip(VELOCIDAD_BASE + ajuste, 0, 255))
     pwm_der = int(clip(VELOCIDAD_BASE - ajuste, 0, 255))
 
+    telemetria.push(dC, dR, dR_f, error, pwm_izq, pwm_der)
+    return pwm_izq, pwm_der, "ok"
+
+# Transiciones en orden de prioridad; "*" = desde cualquier estado
+maquina = StateMachine(
+    {"ok": seguir_pared, "obst": girar_obstaculo, "buscar": buscar_pared},
+    (
+        ("*", ("dC", "<=", "obst"), "obst"),
+        ("*", ("dR", ">=", "sin_pared"), "buscar"),
+        ("*", None, "ok"),
+    ),
+    umbrales={"obst": DISTANCIA_OBSTACULO, "sin_pared": SIN_PARED_UMBRAL},
+    inicial="ok",
+)
+
+def al_recibir_distancias(dC, dR):
+    pwm_izq, pwm_der, modo = maquina.step(dC, dR)
     Bridge.notify("motores", pwm_izq, pwm_der)
-    
-    # Estilo medicion-distancia: print + flush
-    print(f">> C: {dC:5.1f} | R: {dR:5.1f} | FILTRO: {dR_f:5.1f} | ERROR: {error:5.1f} | M: {pwm_izq}/{pwm_der}")
-    sys.stdout.flush()
+    recorder.record(dC, dR, pwm_izq, pwm_der, modo)
+
+# Permanencia y transiciones por estado al salir
+atexit.register(lambda: print(maquina.texto()))
 
-Bridge.provide("distancias", al_recibir_distancias)
+# Bridge sólo deja la muestra más nueva en el buzón; el control corre en su propio
+# hilo, una vez por muestra. El sketch manda una cada ~150 ms (dos medianas de 3
+# lecturas con delay(10) más dos delay(50)); una muestra que esperó más de medio
+# intervalo se descarta
+PERIODO_SKETCH_S = 0.15
+runtime = ControlRuntime(al_recibir_distancias, periodo=PERIODO_SKETCH_S, max_edad=PERIODO_SKETCH_S / 2)
+runtime.start()
+atexit.register(runtime.stop)
+Bridge.provide("distancias", runtime.recibir)
 
 App.run()
\ No newline at end of file
@@ -0,0 +1,138 @@
+"""
+Runtime de control: desacopla el callback de Bridge del trabajo de control.
+
+El provider de Bridge sólo deja la muestra más nueva en un buzón de último
+valor. Un hilo de control dedicado la toma y ejecuta el handler. Si llega una
+muestra nueva antes de procesar la anterior, la anterior se descarta
+(sobrescrita); si la muestra ya es vieja al tomarla, también se descarta.
+
+El lazo es por eventos, no de cadencia fija: el hilo despierta con cada
+muestra que llega y la procesa en el acto, así que el ritmo lo pone el
+sketch. `periodo` es el intervalo entre muestras del sketch de cada app: el
+handler que tarda más que eso cuenta como overrun (la siguiente muestra ya
+llegó), y es también el tope de la espera en el buzón, que sin muestras sólo
+sirve para revisar stop(). Cada main.py lo fija según su sketch.
+Si el handler lanza una excepción se cuenta y se registra (a lo sumo una
+vez por segundo) y el hilo sigue con la siguiente muestra, igual que cuando
+cada callback de Bridge era independiente. Las cuentas quedan disponibles en
+stats().
+"""
+import threading
+import time
+
+
+class Mailbox:
+    """Buzón de un solo valor: put() nunca bloquea más que un lock breve."""
+
+    def __init__(self):
+        self._cond = threading.Condition()
+        self._valor = None
+        self._t = 0.0
+        self.sobrescritas = 0
+
+    def put(self, valor):
+        t = time.perf_counter()
+        with self._cond:
+            if self._valor is not None:
+                self.sobrescritas += 1
+            self._valor = valor
+            self._t = t
+            self._cond.notify()
+
+    def take(self, timeout):
+        """Devuelve (valor, t_llegada) o None si no llegó nada en `timeout` s."""
+        with self._cond:
+            if self._valor is None:
+                self._cond.wait(timeout)
+            if self._valor is None:
+                return None
+            valor, t = self._valor, self._t
+            self._valor = None
+            return valor, t
+
+
+class ControlRuntime:
+    def __init__(self, handler, periodo, max_edad, nombre="control", log=print):
+        self.handler = handler
+        self.log = log                      # log(mensaje) para errores del handler
+        self.periodo = float(periodo)       # intervalo entre muestras del sketch (s)
+        self.max_edad = float(max_edad)     # más vieja que esto se descarta
+        self.nombre = nombre
+        self.buzon = Mailbox()
+        self.t_llegada = 0.0                # llegada de la muestra en proceso
+        self.recibidas = 0
+        self.procesadas = 0
+        self.viejas = 0
+        self.overruns = 0
+        self.errores = 0
+        self._t_log = 0.0
+        self._errores_log = 0               # errores desde el último mensaje
+        self._parar = threading.Event()
+        self._hilo = None
+
+    def recibir(self, *muestra):
+        """Registrar con Bridge.provide(...): sólo guarda la muestra."""
+        self.recibidas += 1
+        self.buzon.put(muestra)
+
+    def _bucle(self):
+        while not self._parar.is_set():
+            item = self.buzon.take(self.periodo)
+            if item is None:
+                continue
+            muestra, t = item
+            inicio = time.perf_counter()
+            if inicio - t > self.max_edad:
+                self.viejas += 1
+                continue
+            self.t_llegada = t
+            try:
+                self.handler(*muestra)
+            except Exception as e:
+                self._error(e)
+            finally:
+                self.procesadas += 1
+                if time.perf_counter() - inicio > self.periodo:
+                    self.overruns += 1
+
+    def _error(self, e):
+        """Cuenta el error y lo registra como mucho una vez por segundo."""
+        self.errores += 1
+        self._errores_log += 1
+        ahora = time.perf_counter()
+        if ahora - self._t_log >= 1.0:
+            extra = f" (+{self._errores_log - 1} más)" if self._errores_log > 1 else ""
+            try:
+                self.log(f"[{self.nombre}] error en el handler: {e!r}{extra}")
+            except Exception:
+                pass
+            self._t_log = ahora
+            self._errores_log = 0
+
+    def start(self):
+        if self._hilo is None:
+            self._parar.clear()
+            self._hilo = threading.Thread(target=self._bucle, name=self.nombre, daemon=True)
+            self._hilo.start()
+        return self
+
+    def stop(self):
+        if self._hilo is not None:
+            self._parar.set()
+            self._hilo.join()
+            self._hilo = None
+
+    def stats(self):
+        return {
+            "recibidas": self.recibidas,
+            "procesadas": self.procesadas,
+            "sobrescritas": self.buzon.sobrescritas,
+            "viejas": self.viejas,
+            "overruns": self.overruns,
+            "errores": self.errores,
+        }
+
+    def texto(self):
+        s = self.stats()
+        return (f"MUESTRAS recibidas={s['recibidas']} procesadas={s['procesadas']} "
+                f"sobrescritas={s['sobrescritas']} viejas={s['viejas']} overruns={s['overruns']} errores={s['errores']}")